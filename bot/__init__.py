@@ -32,6 +32,10 @@ from pyrogram import enums
 from qbittorrentapi import Client as qbClient
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 
+from bot.helper.ext_utils.executors import start_process_pool
+
+# fork the CPU workers before any client or logging thread exists
+start_process_pool()
 faulthandler_enable()
 install()
 setdefaulttimeout(600)
@@ -260,9 +264,23 @@ QUEUE_DOWNLOAD = "" if len(QUEUE_DOWNLOAD) == 0 else int(QUEUE_DOWNLOAD)
 QUEUE_UPLOAD = environ.get("QUEUE_UPLOAD", "")
 QUEUE_UPLOAD = "" if len(QUEUE_UPLOAD) == 0 else int(QUEUE_UPLOAD)
 
+QUEUE_DISK = environ.get("QUEUE_DISK", "")
+QUEUE_DISK = "" if len(QUEUE_DISK) == 0 else int(QUEUE_DISK)
+
+QUEUE_SJF = environ.get("QUEUE_SJF", "")
+QUEUE_SJF = QUEUE_SJF.lower() == "true"
+
 STOP_DUPLICATE = environ.get("STOP_DUPLICATE", "")
 STOP_DUPLICATE = STOP_DUPLICATE.lower() == "true"
 
+LOOP_PROFILER = environ.get("LOOP_PROFILER", "")
+LOOP_PROFILER = LOOP_PROFILER.lower() == "true"
+
+LOOP_PROFILER_THRESHOLD = environ.get("LOOP_PROFILER_THRESHOLD", "")
+LOOP_PROFILER_THRESHOLD = (
+    200 if len(LOOP_PROFILER_THRESHOLD) == 0 else int(LOOP_PROFILER_THRESHOLD)
+)
+
 USE_SERVICE_ACCOUNTS = environ.get("USE_SERVICE_ACCOUNTS", "")
 USE_SERVICE_ACCOUNTS = USE_SERVICE_ACCOUNTS.lower() == "true"
 
@@ -275,6 +293,29 @@ SHOW_MEDIAINFO = SHOW_MEDIAINFO.lower() == "true"
 MEDIA_GROUP = environ.get("MEDIA_GROUP", "")
 MEDIA_GROUP = MEDIA_GROUP.lower() == "true"
 
+LEECH_UPLOAD_WORKERS = environ.get("LEECH_UPLOAD_WORKERS", "")
+LEECH_UPLOAD_WORKERS = (
+    "" if len(LEECH_UPLOAD_WORKERS) == 0 else int(LEECH_UPLOAD_WORKERS)
+)
+
+LEECH_PIPELINE_BUFFER = environ.get("LEECH_PIPELINE_BUFFER", "")
+LEECH_PIPELINE_BUFFER = (
+    "" if len(LEECH_PIPELINE_BUFFER) == 0 else int(LEECH_PIPELINE_BUFFER)
+)
+
+LEECH_VIRTUAL_SPLIT = environ.get("LEECH_VIRTUAL_SPLIT", "")
+LEECH_VIRTUAL_SPLIT = LEECH_VIRTUAL_SPLIT.lower() == "true"
+
+TG_DOWNLOAD_WORKERS = environ.get("TG_DOWNLOAD_WORKERS", "")
+TG_DOWNLOAD_WORKERS = (
+    "" if len(TG_DOWNLOAD_WORKERS) == 0 else int(TG_DOWNLOAD_WORKERS)
+)
+
+DIRECT_DOWNLOAD_WORKERS = environ.get("DIRECT_DOWNLOAD_WORKERS", "")
+DIRECT_DOWNLOAD_WORKERS = (
+    "" if len(DIRECT_DOWNLOAD_WORKERS) == 0 else int(DIRECT_DOWNLOAD_WORKERS)
+)
+
 BASE_URL = environ.get("BASE_URL", "").rstrip("/")
 if len(BASE_URL) == 0:
     warning("BASE_URL not provided!")
@@ -300,9 +341,19 @@ YTDLP_LIMIT = "" if len(YTDLP_LIMIT) == 0 else float(YTDLP_LIMIT)
 GDRIVE_LIMIT = environ.get("GDRIVE_LIMIT", "")
 GDRIVE_LIMIT = "" if len(GDRIVE_LIMIT) == 0 else float(GDRIVE_LIMIT)
 
+GDRIVE_UPLOAD_WORKERS = environ.get("GDRIVE_UPLOAD_WORKERS", "")
+GDRIVE_UPLOAD_WORKERS = (
+    "" if len(GDRIVE_UPLOAD_WORKERS) == 0 else int(GDRIVE_UPLOAD_WORKERS)
+)
+
 CLONE_LIMIT = environ.get("CLONE_LIMIT", "")
 CLONE_LIMIT = "" if len(CLONE_LIMIT) == 0 else float(CLONE_LIMIT)
 
+GDRIVE_CLONE_WORKERS = environ.get("GDRIVE_CLONE_WORKERS", "")
+GDRIVE_CLONE_WORKERS = (
+    "" if len(GDRIVE_CLONE_WORKERS) == 0 else int(GDRIVE_CLONE_WORKERS)
+)
+
 MEGA_LIMIT = environ.get("MEGA_LIMIT", "")
 MEGA_LIMIT = "" if len(MEGA_LIMIT) == 0 else float(MEGA_LIMIT)
 
@@ -367,9 +418,16 @@ config_dict = {
     "IMAGES": IMAGES,
     "EXTENSION_FILTER": EXTENSION_FILTER,
     "GDRIVE_ID": GDRIVE_ID,
+    "GDRIVE_UPLOAD_WORKERS": GDRIVE_UPLOAD_WORKERS,
+    "GDRIVE_CLONE_WORKERS": GDRIVE_CLONE_WORKERS,
     "ATTACHMENT_URL": ATTACHMENT_URL,
     "INDEX_URL": INDEX_URL,
     "LEECH_LOG_ID": LEECH_LOG_ID,
+    "LEECH_UPLOAD_WORKERS": LEECH_UPLOAD_WORKERS,
+    "LEECH_PIPELINE_BUFFER": LEECH_PIPELINE_BUFFER,
+    "LEECH_VIRTUAL_SPLIT": LEECH_VIRTUAL_SPLIT,
+    "TG_DOWNLOAD_WORKERS": TG_DOWNLOAD_WORKERS,
+    "DIRECT_DOWNLOAD_WORKERS": DIRECT_DOWNLOAD_WORKERS,
     "TOKEN_TIMEOUT": TOKEN_TIMEOUT,
     "MEDIA_GROUP": MEDIA_GROUP,
     "MEGA_EMAIL": MEGA_EMAIL,
@@ -379,6 +437,8 @@ config_dict = {
     "QUEUE_ALL": QUEUE_ALL,
     "QUEUE_DOWNLOAD": QUEUE_DOWNLOAD,
     "QUEUE_UPLOAD": QUEUE_UPLOAD,
+    "QUEUE_DISK": QUEUE_DISK,
+    "QUEUE_SJF": QUEUE_SJF,
     "RCLONE_FLAGS": RCLONE_FLAGS,
     "RCLONE_PATH": RCLONE_PATH,
     "SEARCH_API_LINK": SEARCH_API_LINK,
@@ -386,6 +446,8 @@ config_dict = {
     "SET_COMMANDS": SET_COMMANDS,
     "SHOW_MEDIAINFO": SHOW_MEDIAINFO,
     "STOP_DUPLICATE": STOP_DUPLICATE,
+    "LOOP_PROFILER": LOOP_PROFILER,
+    "LOOP_PROFILER_THRESHOLD": LOOP_PROFILER_THRESHOLD,
     "STREAMWISH_API": STREAMWISH_API,
     "TELEGRAM_API": TELEGRAM_API,
     "TELEGRAM_HASH": TELEGRAM_HASH,
@@ -456,7 +518,16 @@ with open("a2c.conf", "a+") as a:
     if TORRENT_TIMEOUT is not None:
         a.write(f"bt-stop-timeout={TORRENT_TIMEOUT}\n")
     a.write(f"bt-tracker=[{trackers}]")
-srun(["xria", "--conf-path=/usr/src/app/a2c.conf"], check=False)
+aria2_session = "/usr/src/app/aria2.session"
+aria2_args = [
+    "xria",
+    "--conf-path=/usr/src/app/a2c.conf",
+    f"--save-session={aria2_session}",
+    "--save-session-interval=30",
+]
+if ospath.exists(aria2_session):
+    aria2_args.append(f"--input-file={aria2_session}")
+srun(aria2_args, check=False)
 
 if ospath.exists("accounts.zip"):
     if ospath.exists("accounts"):
@@ -492,9 +563,11 @@ def aria2c_init():
     try:
         link = "https://linuxmint.com/torrents/lmde-5-cinnamon-64bit.iso.torrent"
         dire = "/usr/src/app/downloads/".rstrip("/")
-        aria2.add_uris([link], {"dir": dire})
+        download = aria2.add_uris([link], {"dir": dire})
         sleep(3)
-        downloads = aria2.get_downloads()
+        download.update()
+        # only the probe download, downloads restored from the session stay
+        downloads = [download, *download.followed_by]
         sleep(10)
         aria2.remove(downloads, force=True, files=True, clean=True)
     except Exception as e:
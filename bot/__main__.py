@@ -21,6 +21,7 @@ from bot import (
     Interval,
     QbInterval,
     bot,
+    aria2,
     bot_name,
     scheduler,
     user_data,
@@ -49,6 +50,7 @@ from .modules import (
     torrent_select,
     users_settings,
 )
+from .helper.ext_utils.metrics import start_metrics
 from .helper.ext_utils.bot_utils import (
     new_task,
     new_thread,
@@ -59,6 +61,8 @@ from .helper.ext_utils.bot_utils import (
 )
 from .helper.ext_utils.db_handler import DbManager
 from .helper.ext_utils.files_utils import clean_all, exit_clean_up, start_cleanup
+from .helper.listeners.task_resume import resume_tasks
+from .helper.ext_utils.loop_profiler import profiler_report, start_loop_profiler
 from .helper.telegram_helper.filters import CustomFilters
 from .helper.listeners.aria2_listener import start_aria2_listener
 from .helper.telegram_helper.bot_commands import BotCommands
@@ -203,7 +207,9 @@ async def restart(_, message):
     for interval in [QbInterval, Interval]:
         if interval:
             interval[0].cancel()
-    await sync_to_async(clean_all)
+    # journaled tasks are resumed by the next start, see start_cleanup
+    with contextlib.suppress(Exception):
+        await sync_to_async(aria2.client.save_session)
     proc1 = await create_subprocess_exec(
         "pkill", "-9", "-f", "-e", "gunicorn|xria|xnox|xtra|xone"
     )
@@ -277,6 +283,14 @@ async def log(_, message):
     await five_minute_del(reply_message)
 
 
+@new_task
+async def profile(_, message):
+    report = f"<pre>{escape(profiler_report())}</pre>"
+    reply_message = await send_message(message, report)
+    await delete_message(message)
+    await one_minute_del(reply_message)
+
+
 @new_task
 async def bot_help(_, message):
     reply_message = await send_message(message, help_string)
@@ -302,7 +316,10 @@ async def main():
         restart_notification(),
         set_commands(bot),
     )
-    await sync_to_async(start_aria2_listener, wait=False)
+    await sync_to_async(start_aria2_listener, wait=False, purpose="transfer")
+    await resume_tasks()
+    start_metrics()
+    start_loop_profiler()
     bot.add_handler(MessageHandler(start, filters=command(BotCommands.StartCommand)))
     bot.add_handler(
         MessageHandler(
@@ -314,6 +331,11 @@ async def main():
             restart, filters=command(BotCommands.RestartCommand) & CustomFilters.sudo
         )
     )
+    bot.add_handler(
+        MessageHandler(
+            profile, filters=command(BotCommands.ProfileCommand) & CustomFilters.sudo
+        )
+    )
     bot.add_handler(
         MessageHandler(
             ping, filters=command(BotCommands.PingCommand) & CustomFilters.authorized
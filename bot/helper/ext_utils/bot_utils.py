@@ -6,14 +6,16 @@ from time import time
 from uuid import uuid4
 from asyncio import (
     sleep,
+    wrap_future,
     create_subprocess_exec,
     create_subprocess_shell,
     run_coroutine_threadsafe,
 )
+from weakref import WeakKeyDictionary
 from functools import wraps, partial
 from urllib.parse import urlparse
 from asyncio.subprocess import PIPE
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 
 from psutil import disk_usage
 from aiohttp import ClientSession as aioClientSession
@@ -35,6 +37,12 @@ from bot import (
     download_dict_lock,
 )
 from bot.helper.aeon_utils.tinyfy import tinyfy
+from bot.helper.ext_utils.metrics import subprocess_started
+from bot.helper.ext_utils.executors import (
+    submit,
+    reset_executor,
+    process_pool_running,
+)
 from bot.helper.ext_utils.db_handler import DbManager
 from bot.helper.ext_utils.shorteners import short_url
 from bot.helper.ext_utils.telegraph_helper import telegraph
@@ -59,6 +67,7 @@ if config_dict.get("GDRIVE_ID"):
         "HelpCommand",
         "BotSetCommand",
         "LogCommand",
+        "ProfileCommand",
         "RestartCommand",
     ]
 else:
@@ -74,6 +83,7 @@ else:
         "HelpCommand",
         "BotSetCommand",
         "LogCommand",
+        "ProfileCommand",
         "RestartCommand",
     ]
 
@@ -94,11 +104,11 @@ command_descriptions = {
     "HelpCommand": "- Get detailed help",
     "BotSetCommand": "- [ADMIN] Open Bot settings",
     "LogCommand": "- [ADMIN] View log",
+    "ProfileCommand": "- [ADMIN] Event loop profiler report",
     "RestartCommand": "- [ADMIN] Restart the bot",
 }
 
 
-THREADPOOL = ThreadPoolExecutor(max_workers=1000)
 MAGNET_REGEX = r"magnet:\?xt=urn:(btih|btmh):[a-zA-Z0-9]*\s*"
 URL_REGEX = r"^(?!\/)(rtmps?:\/\/|mms:\/\/|rtsp:\/\/|https?:\/\/|ftp:\/\/)?([^\/:]+:[^\/@]+@)?(www\.)?(?=[^\/:\s]+\.[^\/:\s]+)([^\/:\s]+\.[^\/:\s]+)(:\d+)?(\/[^#\s]*[\s\S]*)?(\?[^#\s]*)?(#.*)?$"
 SIZE_UNITS = ["B", "KB", "MB", "GB", "TB", "PB"]
@@ -106,6 +116,7 @@ STATUS_START = 0
 PAGES = 1
 PAGE_NO = 1
 STATUS_LIMIT = 4
+status_fragments = WeakKeyDictionary()
 
 
 class MirrorStatus:
@@ -247,52 +258,85 @@ def source(self):
     )
 
 
-def get_readable_message():
-    msg = "<b>Powered by <a href='https://t.me/ASA_MIKATA1'>ASA MIKATA</a></b>\n\n"
-    button = None
+def get_status_snapshot():
     tasks = len(download_dict)
-    current_time = get_readable_time(time() - bot_start_time)
-    if config_dict["BOT_MAX_TASKS"]:
-        bmax_task = f"/{config_dict['BOT_MAX_TASKS']}"
-    else:
-        bmax_task = ""
     globals()["PAGES"] = (tasks + STATUS_LIMIT - 1) // STATUS_LIMIT
     if PAGE_NO > PAGES and PAGES != 0:
         globals()["STATUS_START"] = STATUS_LIMIT * (PAGES - 1)
         globals()["PAGE_NO"] = PAGES
-    for download in list(download_dict.values())[
-        STATUS_START : STATUS_LIMIT + STATUS_START
-    ]:
-        msg += f"<b>{download.status()}:</b> {escape(f'{download.name()}')}\n"
+    downloads = tuple(
+        list(download_dict.values())[STATUS_START : STATUS_LIMIT + STATUS_START]
+    )
+    return tasks, PAGE_NO, PAGES, downloads
+
+
+def __peers(download):
+    if hasattr(download, "seeders_num"):
+        with contextlib.suppress(Exception):
+            return download.seeders_num(), download.leechers_num()
+    return None
+
+
+def __task_fragment(download):
+    status = download.status()
+    # only the progress values key the cache, the rest is read on a miss
+    if status == MirrorStatus.STATUS_SEEDING:
+        progress = (download.uploaded_bytes(), download.upload_speed())
+    elif status in [MirrorStatus.STATUS_SPLITTING, MirrorStatus.STATUS_PROCESSING]:
+        progress = (download.size(),)
+    else:
+        progress = (
+            download.progress(),
+            download.processed_bytes(),
+            download.speed(),
+        )
+    state = (status, download.name(), download.gid()[:8], *progress)
+    if (cached := status_fragments.get(download)) and cached[0] == state:
+        msg = cached[1]
+    else:
+        msg = f"<b>{status}:</b> {escape(f'{state[1]}')}\n"
         msg += f"by {source(download)}\n"
-        if download.status() not in [
-            MirrorStatus.STATUS_SPLITTING,
-            MirrorStatus.STATUS_SEEDING,
-            MirrorStatus.STATUS_PROCESSING,
-        ]:
-            msg += f"<blockquote><code>{progress_bar(download.progress())}</code> {download.progress()}"
-            msg += f"\n{download.processed_bytes()} of {download.size()}"
-            msg += f"\nSpeed: {download.speed()}"
-            msg += f"\nEstimated: {download.eta()}"
-            if hasattr(download, "seeders_num"):
-                with contextlib.suppress(Exception):
-                    msg += f"\nSeeders: {download.seeders_num()} | Leechers: {download.leechers_num()}"
-        elif download.status() == MirrorStatus.STATUS_SEEDING:
+        if status == MirrorStatus.STATUS_SEEDING:
+            uploaded, up_speed = progress
             msg += f"<blockquote>Size: {download.size()}"
-            msg += f"\nSpeed: {download.upload_speed()}"
-            msg += f"\nUploaded: {download.uploaded_bytes()}"
+            msg += f"\nSpeed: {up_speed}"
+            msg += f"\nUploaded: {uploaded}"
             msg += f"\nRatio: {download.ratio()}"
-            msg += f"\nTime: {download.seeding_time()}"
+        elif len(progress) == 1:
+            msg += f"<blockquote>Size: {progress[0]}"
         else:
-            msg += f"<blockquote>Size: {download.size()}"
-        msg += f"\nElapsed: {get_readable_time(time() - download.message.date.timestamp())}</blockquote>"
-        msg += f"\n<blockquote>/stop_{download.gid()[:8]}</blockquote>\n\n"
-    if len(msg) == 0:
-        return None, None
+            pct, processed, speed = progress
+            msg += f"<blockquote><code>{progress_bar(pct)}</code> {pct}"
+            msg += f"\n{processed} of {download.size()}"
+            msg += f"\nSpeed: {speed}"
+            msg += f"\nEstimated: {download.eta()}"
+            if peers := __peers(download):
+                msg += f"\nSeeders: {peers[0]} | Leechers: {peers[1]}"
+        status_fragments[download] = (state, msg)
+    # clocks tick every second, keep them out of the cached fragment
+    if status == MirrorStatus.STATUS_SEEDING:
+        msg += f"\nTime: {download.seeding_time()}"
+    elapsed = get_readable_time(time() - download.message.date.timestamp())
+    msg += f"\nElapsed: {elapsed}</blockquote>"
+    msg += f"\n<blockquote>/stop_{state[2]}</blockquote>\n\n"
+    return msg
+
+
+def get_readable_message(snapshot):
+    tasks, page_no, pages, downloads = snapshot
+    msg = "<b>Powered by <a href='https://t.me/ASA_MIKATA1'>ASA MIKATA</a></b>\n\n"
+    button = None
+    current_time = get_readable_time(time() - bot_start_time)
+    if config_dict["BOT_MAX_TASKS"]:
+        bmax_task = f"/{config_dict['BOT_MAX_TASKS']}"
+    else:
+        bmax_task = ""
+    for download in downloads:
+        msg += __task_fragment(download)
     if tasks > STATUS_LIMIT:
         buttons = ButtonMaker()
         buttons.callback("Prev", "status pre")
-        buttons.callback(f"{PAGE_NO}/{PAGES}", "status ref")
+        buttons.callback(f"{page_no}/{pages}", "status ref")
         buttons.callback("Next", "status nex")
         button = buttons.column(3)
     msg += f"<b>• Tasks</b>: {tasks}{bmax_task}"
@@ -478,6 +522,7 @@ async def download_image_url(url):
 
 
 async def cmd_exec(cmd, shell=False):
+    subprocess_started()
     if shell:
         proc = await create_subprocess_shell(cmd, stdout=PIPE, stderr=PIPE)
     else:
@@ -496,12 +541,23 @@ def new_task(func):
     return wrapper
 
 
-async def sync_to_async(func, *args, wait=True, **kwargs):
+async def sync_to_async(func, *args, wait=True, purpose="io", **kwargs):
     pfunc = partial(func, *args, **kwargs)
-    future = bot_loop.run_in_executor(THREADPOOL, pfunc)
+    future = wrap_future(submit(purpose, pfunc), loop=bot_loop)
     return await future if wait else future
 
 
+async def run_cpu(func, *args, **kwargs):
+    if process_pool_running():
+        try:
+            return await sync_to_async(func, *args, purpose="process", **kwargs)
+        except BrokenProcessPool:
+            # never fork a new pool from the threaded bot, use the cpu threads
+            LOGGER.error("CPU worker pool broke, running CPU work on threads")
+            reset_executor("process")
+    return await sync_to_async(func, *args, purpose="cpu", **kwargs)
+
+
 def async_to_sync(func, *args, wait=True, **kwargs):
     future = run_coroutine_threadsafe(func(*args, **kwargs), bot_loop)
     return future.result() if wait else future
@@ -0,0 +1,52 @@
+# runs in the process pool forked at startup, keep this module free of bot
+# imports so the workers can load it before the bot package is initialised
+from os import getpid
+from hashlib import md5
+
+from PIL import Image
+from magic import Magic
+
+HASH_BUFFER = 8 * 1024 * 1024
+magic_handles = {}
+
+
+def __magic():
+    # libmagic handles are not fork safe, keep one per worker process
+    pid = getpid()
+    if (handle := magic_handles.get(pid)) is None:
+        handle = magic_handles[pid] = Magic(mime=True)
+    return handle
+
+
+def mime_type(path):
+    return __magic().from_file(path) or "text/plain"
+
+
+def md5_file(path, offset=0, length=None):
+    md5_hash = md5()
+    buffer = bytearray(HASH_BUFFER)
+    view = memoryview(buffer)
+    with open(path, "rb", buffering=0) as f:
+        f.seek(offset)
+        while size := f.readinto(buffer):
+            if length is not None:
+                size = min(size, length)
+                length -= size
+            md5_hash.update(view[:size])
+            if length == 0:
+                break
+    return md5_hash.hexdigest()
+
+
+def convert_image(src, des, size=None):
+    with Image.open(src) as img, img.convert("RGB") as rgb:
+        if size:
+            rgb.thumbnail(size)
+        rgb.save(des, "JPEG")
+    return des
+
+
+def image_size(path):
+    with Image.open(path) as img:
+        return img.size
+
@@ -191,6 +191,21 @@ class DbManager:
         await self.__db.access_token.delete_many({})
         self.__conn.close
 
+    async def get_probe(self, key):
+        if self.__err:
+            return None
+        doc = await self.__db.probes.find_one({"_id": key})
+        self.__conn.close
+        return doc["result"] if doc else None
+
+    async def update_probe(self, key, result):
+        if self.__err:
+            return
+        await self.__db.probes.update_one(
+            {"_id": key}, {"$set": {"result": result}}, upsert=True
+        )
+        self.__conn.close
+
 
 if DATABASE_URL:
     bot_loop.run_until_complete(DbManager().db_load())
@@ -0,0 +1,86 @@
+from os import getpid, cpu_count
+from threading import Lock
+from multiprocessing import get_context
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+CPU_COUNT = cpu_count() or 4
+EXECUTOR_LIMITS = {
+    "io": 32,
+    "transfer": 128,
+    "cpu": CPU_COUNT,
+    "process": CPU_COUNT,
+}
+executors = {}
+executor_stats = {
+    name: {"queued": 0, "active": 0, "done": 0} for name in EXECUTOR_LIMITS
+}
+stats_lock = Lock()
+
+
+def get_executor(purpose):
+    if purpose not in EXECUTOR_LIMITS:
+        raise ValueError(f"Unknown executor purpose: {purpose}")
+    if (executor := executors.get(purpose)) is None:
+        if purpose == "process":
+            # forking now would copy locks held by the bot's running threads
+            raise BrokenProcessPool("CPU worker pool is not running")
+        with stats_lock:
+            if (executor := executors.get(purpose)) is None:
+                executor = executors[purpose] = ThreadPoolExecutor(
+                    max_workers=EXECUTOR_LIMITS[purpose],
+                    thread_name_prefix=purpose,
+                )
+    return executor
+
+
+def start_process_pool():
+    # called while the bot is still single threaded, the workers are forked
+    # before pyrogram, pymongo, aria2p or the scheduler start any thread
+    executor = ProcessPoolExecutor(
+        max_workers=EXECUTOR_LIMITS["process"],
+        mp_context=get_context("fork"),
+    )
+    executor.submit(getpid).result()
+    executors["process"] = executor
+
+
+def process_pool_running():
+    return "process" in executors
+
+
+def reset_executor(purpose):
+    with stats_lock:
+        executor = executors.pop(purpose, None)
+    if executor is not None:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def __update_stats(purpose, queued=0, active=0, done=0):
+    with stats_lock:
+        stats = executor_stats[purpose]
+        stats["queued"] += queued
+        stats["active"] += active
+        stats["done"] += done
+
+
+def __tracked(purpose, func):
+    __update_stats(purpose, queued=-1, active=1)
+    try:
+        return func()
+    finally:
+        __update_stats(purpose, active=-1, done=1)
+
+
+def submit(purpose, func):
+    executor = get_executor(purpose)
+    __update_stats(purpose, queued=1)
+    if purpose == "process":
+        future = executor.submit(func)
+
+        def finished(_):
+            __update_stats(purpose, queued=-1, done=1)
+
+        future.add_done_callback(finished)
+        return future
+    return executor.submit(__tracked, purpose, func)
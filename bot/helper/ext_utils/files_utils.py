@@ -1,20 +1,28 @@
 import contextlib
+from io import RawIOBase
+from os import (
+    O_RDONLY,
+    SEEK_CUR,
+    SEEK_END,
+    SEEK_SET,
+    walk,
+    pread,
+)
+from os import open as osopen
 from os import path as ospath
-from os import walk
+from os import close as osclose
 from re import IGNORECASE
 from re import sub as re_sub
 from re import split as re_split
 from re import search as re_search
 from sys import exit as sexit
+from json import loads
 from time import time, gmtime, strftime
-from shlex import split as ssplit
 from shutil import rmtree, disk_usage
-from asyncio import gather, create_task, create_subprocess_exec
-from hashlib import md5
+from asyncio import Semaphore, gather, create_subprocess_exec
 from subprocess import run as srun
 from asyncio.subprocess import PIPE
 
-from magic import Magic
 from natsort import natsorted
 from aioshutil import rmtree as aiormtree
 from langcodes import Language
@@ -22,6 +30,7 @@ from telegraph import upload_file
 from aiofiles.os import path as aiopath
 from aiofiles.os import mkdir, rmdir, listdir, makedirs
 from aiofiles.os import remove as aioremove
+from aiofiles.os import rename as aiorename
 
 from bot import (
     LOGGER,
@@ -33,20 +42,27 @@ from bot import (
     xnox_client,
 )
 from bot.modules.mediainfo import parseinfo
+from bot.helper.ext_utils.metrics import subprocess_started
 from bot.helper.aeon_utils.metadata import change_metadata
 from bot.helper.ext_utils.bot_utils import (
     is_mkv,
+    run_cpu,
     cmd_exec,
     sync_to_async,
     get_readable_time,
     get_readable_file_size,
 )
+from bot.helper.ext_utils.cpu_workers import md5_file
+from bot.helper.ext_utils.cpu_workers import mime_type as get_mime_type
+from bot.helper.ext_utils.media_probe import get_mediainfo, get_media_probe
+from bot.helper.ext_utils.task_journal import journal_clear, journal_entries
 from bot.helper.ext_utils.telegraph_helper import telegraph
 
 from .exceptions import ExtractionArchiveError
 
 FIRST_SPLIT_REGEX = r"(\.|_)part0*1\.rar$|(\.|_)7z\.0*1$|(\.|_)zip\.0*1$|^(?!.*(\.|_)part\d+\.rar$).*\.rar$"
 SPLIT_REGEX = r"\.r\d+$|\.7z\.\d+$|\.z\d+$|\.zip\.\d+$"
+SPLIT_JOBS = 4
 ARCH_EXT = [
     ".tar.bz2",
     ".tar.gz",
@@ -90,27 +106,10 @@ ARCH_EXT = [
 
 
 async def is_multi_streams(path):
-    try:
-        result = await cmd_exec(
-            [
-                "ffprobe",
-                "-hide_banner",
-                "-loglevel",
-                "error",
-                "-print_format",
-                "json",
-                "-show_streams",
-                path,
-            ]
-        )
-        if res := result[1]:
-            LOGGER.warning(f"Get Video Streams: {res}")
-    except Exception as e:
-        LOGGER.error(f"Get Video Streams: {e}. Mostly File not found!")
-        return False
-    fields = eval(result[0]).get("streams")
-    if fields is None:
-        LOGGER.error(f"get_video_streams: {result}")
+    if (ffresult := await get_media_probe(path)) is None or (
+        fields := ffresult.get("streams")
+    ) is None:
+        LOGGER.error(f"get_video_streams: no streams found for {path}")
         return False
     videos = 0
     audios = 0
@@ -123,29 +122,11 @@ async def is_multi_streams(path):
 
 
 async def get_media_info(path, metadata=False):
-    try:
-        result = await cmd_exec(
-            [
-                "ffprobe",
-                "-hide_banner",
-                "-loglevel",
-                "error",
-                "-print_format",
-                "json",
-                "-show_format",
-                "-show_streams",
-                path,
-            ]
-        )
-        if res := result[1]:
-            LOGGER.warning(f"Get Media Info: {res}")
-    except Exception as e:
-        LOGGER.error(f"Media Info: {e}. Mostly File not found!")
+    if (ffresult := await get_media_probe(path)) is None:
         return (0, "", "", "") if metadata else (0, None, None)
-    ffresult = eval(result[0])
     fields = ffresult.get("format")
     if fields is None:
-        LOGGER.error(f"Media Info Sections: {result}")
+        LOGGER.error(f"Media Info Sections: no format found for {path}")
         return (0, "", "", "") if metadata else (0, None, None)
     duration = round(float(fields.get("duration", 0)))
     if metadata:
@@ -188,34 +169,17 @@ async def get_document_type(path):
         r".+(\.|_)(rar|7z|zip|bin)(\.0*\d+)?$", path
     ):
         return is_video, is_audio, is_image
-    mime_type = await sync_to_async(get_mime_type, path)
+    mime_type = await run_cpu(get_mime_type, path)
     if mime_type.startswith("audio"):
         return False, True, False
     if mime_type.startswith("image"):
         return False, False, True
     if not mime_type.startswith("video") and not mime_type.endswith("octet-stream"):
         return is_video, is_audio, is_image
-    try:
-        result = await cmd_exec(
-            [
-                "ffprobe",
-                "-hide_banner",
-                "-loglevel",
-                "error",
-                "-print_format",
-                "json",
-                "-show_streams",
-                path,
-            ]
-        )
-        if res := result[1]:
-            LOGGER.warning(f"Get Document Type: {res}")
-    except Exception as e:
-        LOGGER.error(f"Get Document Type: {e}. Mostly File not found!")
-        return is_video, is_audio, is_image
-    fields = eval(result[0]).get("streams")
-    if fields is None:
-        LOGGER.error(f"get_document_type: {result}")
+    if (ffresult := await get_media_probe(path)) is None or (
+        fields := ffresult.get("streams")
+    ) is None:
+        LOGGER.error(f"get_document_type: no streams found for {path}")
         return is_video, is_audio, is_image
     for stream in fields:
         if stream.get("codec_type") == "video":
@@ -242,6 +206,7 @@ async def get_audio_thumb(audio_file):
         "copy",
         des_dir,
     ]
+    subprocess_started()
     status = await create_subprocess_exec(*cmd, stderr=PIPE)
     if await status.wait() != 0 or not await aiopath.exists(des_dir):
         err = (await status.stderr.read()).decode().strip()
@@ -260,40 +225,234 @@ async def take_ss(video_file, duration=None, total=1, gen_ss=False):
     if duration == 0:
         duration = 3
     duration = duration - (duration * 2 / 100)
-    cmd = [
-        "xtra",
-        "-hide_banner",
-        "-loglevel",
-        "error",
-        "-ss",
-        "",
-        "-i",
-        video_file,
-        "-vf",
-        "thumbnail",
-        "-frames:v",
-        "1",
-        des_dir,
-    ]
-    tasks = []
+    cmd = ["xtra", "-hide_banner", "-loglevel", "error"]
+    outputs = []
     tstamps = {}
+    # one process, one fast input seek per frame
     for eq_thumb in range(1, total + 1):
-        cmd[5] = str((duration // total) * eq_thumb)
-        tstamps[f"aeon_{eq_thumb}.jpg"] = strftime("%H:%M:%S", gmtime(float(cmd[5])))
-        cmd[-1] = ospath.join(des_dir, f"aeon_{eq_thumb}.jpg")
-        tasks.append(create_task(create_subprocess_exec(*cmd, stderr=PIPE)))
-    status = await gather(*tasks)
-    for task, eq_thumb in zip(status, range(1, total + 1)):
-        if await task.wait() != 0 or not await aiopath.exists(
-            ospath.join(des_dir, f"aeon_{eq_thumb}.jpg")
-        ):
-            err = (await task.stderr.read()).decode().strip()
+        stamp = str((duration // total) * eq_thumb)
+        tstamps[f"aeon_{eq_thumb}.jpg"] = strftime("%H:%M:%S", gmtime(float(stamp)))
+        cmd.extend(["-ss", stamp, "-i", video_file])
+    for index in range(total):
+        out_path = ospath.join(des_dir, f"aeon_{index + 1}.jpg")
+        outputs.append(out_path)
+        cmd.extend(
+            ["-map", f"{index}:v:0", "-vf", "thumbnail", "-frames:v", "1", out_path]
+        )
+    subprocess_started()
+    status = await create_subprocess_exec(*cmd, stderr=PIPE)
+    _, stderr = await status.communicate()
+    for eq_thumb, out_path in enumerate(outputs, start=1):
+        if status.returncode != 0 or not await aiopath.exists(out_path):
+            err = stderr.decode().strip()
             LOGGER.error(
                 f"Error while extracting thumbnail no. {eq_thumb} from video. Name: {video_file} stderr: {err}"
             )
             await aiormtree(des_dir)
             return None
-    return (des_dir, tstamps) if gen_ss else ospath.join(des_dir, "aeon_1.jpg")
+    return (des_dir, tstamps) if gen_ss else outputs[0]
+
+
+class FilePart(RawIOBase):
+    def __init__(self, path, offset, length, name):
+        super().__init__()
+        self.name = name
+        self.__fd = osopen(path, O_RDONLY)
+        self.__offset = offset
+        self.__length = length
+        self.__pos = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self.__pos
+
+    def seek(self, pos, whence=SEEK_SET):
+        if whence == SEEK_CUR:
+            pos += self.__pos
+        elif whence == SEEK_END:
+            pos += self.__length
+        self.__pos = min(max(pos, 0), self.__length)
+        return self.__pos
+
+    def readinto(self, buffer):
+        size = min(len(buffer), self.__length - self.__pos)
+        if size <= 0:
+            return 0
+        data = pread(self.__fd, size, self.__offset + self.__pos)
+        buffer[: len(data)] = data
+        self.__pos += len(data)
+        return len(data)
+
+    def close(self):
+        if not self.closed:
+            osclose(self.__fd)
+        super().close()
+
+
+class ProcessGroup:
+    def __init__(self):
+        self.__procs = set()
+        self.returncode = None
+
+    def kill(self):
+        self.returncode = -9
+        for proc in list(self.__procs):
+            with contextlib.suppress(Exception):
+                proc.kill()
+
+    async def run(self, *cmd):
+        if self.returncode == -9:
+            return -9, "", ""
+        subprocess_started()
+        proc = await create_subprocess_exec(*cmd, stdout=PIPE, stderr=PIPE)
+        self.__procs.add(proc)
+        try:
+            stdout, stderr = await proc.communicate()
+        finally:
+            self.__procs.discard(proc)
+        code = -9 if self.returncode == -9 else proc.returncode
+        return code, stdout.decode().strip(), stderr.decode().strip()
+
+
+async def __keyframe_index(path, procs):
+    code, stdout, stderr = await procs.run(
+        "ffprobe",
+        "-hide_banner",
+        "-loglevel",
+        "error",
+        "-select_streams",
+        "v:0",
+        "-show_entries",
+        "packet=pts_time,pos,flags",
+        "-of",
+        "csv=p=0",
+        path,
+    )
+    if code != 0:
+        if code != -9:
+            LOGGER.warning(f"Unable to index keyframes: {stderr}. Path: {path}")
+        return []
+    keyframes = []
+    for line in stdout.splitlines():
+        fields = line.split(",")
+        if len(fields) < 3 or "K" not in fields[2]:
+            continue
+        with contextlib.suppress(ValueError):
+            keyframes.append((float(fields[0]), int(fields[1])))
+    keyframes.sort()
+    return keyframes
+
+
+def __cut_points(keyframes, split_size):
+    cuts = [0]
+    start_pos = keyframes[0][1]
+    for index, (_, pos) in enumerate(keyframes):
+        if pos - start_pos > split_size and index - 1 > cuts[-1]:
+            cuts.append(index - 1)
+            start_pos = keyframes[index - 1][1]
+    return cuts
+
+
+async def split_video_parallel(
+    path, file_, dirpath, split_size, listener, multi_streams
+):
+    procs = ProcessGroup()
+    listener.suproc = procs
+    keyframes = await __keyframe_index(path, procs)
+    if procs.returncode == -9:
+        return False
+    if len(keyframes) < 2:
+        return None
+    split_size -= 5000000
+    base_name, extension = ospath.splitext(file_)
+    jobs = Semaphore(SPLIT_JOBS)
+    outputs = []
+
+    async def cut(lo, hi, tag):
+        start = keyframes[lo][0]
+        out_path = ospath.join(dirpath, f".{base_name}.{tag}{extension}")
+        outputs.append(out_path)
+        cmd = [
+            "xtra",
+            "-hide_banner",
+            "-loglevel",
+            "error",
+            "-ss",
+            str(start),
+            "-i",
+            path,
+            "-map",
+            "0",
+            "-map_chapters",
+            "-1",
+            "-async",
+            "1",
+            "-strict",
+            "-2",
+            "-c",
+            "copy",
+            out_path,
+        ]
+        if hi is not None:
+            cmd[8:8] = ["-t", str(keyframes[hi][0] - start)]
+        if not multi_streams:
+            del cmd[cmd.index("-map") : cmd.index("-map") + 2]
+        async with jobs:
+            code, _, err = await procs.run(*cmd)
+        if code != 0:
+            if code != -9:
+                LOGGER.warning(f"{err}. Unable to split part. Path: {path}")
+            return None
+        if await aiopath.getsize(out_path) <= MAX_SPLIT_SIZE:
+            return [out_path]
+        last = len(keyframes) - 1 if hi is None else hi
+        if last - lo < 2:
+            LOGGER.warning(f"Part can't be cut below split size. Path: {path}")
+            return [out_path]
+        await aioremove(out_path)
+        middle = (keyframes[lo][1] + keyframes[last][1]) // 2
+        mid = next(
+            index
+            for index in range(lo + 1, last)
+            if keyframes[index][1] >= middle or index == last - 1
+        )
+        parts = await gather(cut(lo, mid, f"{tag}a"), cut(mid, hi, f"{tag}b"))
+        if None in parts:
+            return None
+        return parts[0] + parts[1]
+
+    cuts = __cut_points(keyframes, split_size)
+    bounds = [*cuts[1:], None]
+    results = await gather(
+        *(
+            cut(lo, hi, f"{index:05}")
+            for index, (lo, hi) in enumerate(zip(cuts, bounds))
+        )
+    )
+    if procs.returncode == -9 or None in results:
+        for out_path in outputs:
+            with contextlib.suppress(Exception):
+                await aioremove(out_path)
+        if procs.returncode == -9:
+            return False
+        if multi_streams:
+            LOGGER.warning(f"Retrying split without map. Path: {path}")
+            return await split_video_parallel(
+                path, file_, dirpath, split_size + 5000000, listener, False
+            )
+        return "errored"
+    parts = []
+    for i, out_path in enumerate(
+        (out_path for result in results for out_path in result), start=1
+    ):
+        parts.append(ospath.join(dirpath, f"{base_name}.part{i:03}{extension}"))
+        await aiorename(out_path, parts[-1])
+    return parts
 
 
 async def split_file(
@@ -306,6 +465,7 @@ async def split_file(
     start_time=0,
     i=1,
     multi_streams=True,
+    virtual=False,
 ):
     if listener.suproc == "cancelled" or (
         listener.suproc is not None and listener.suproc.returncode == -9
@@ -320,6 +480,12 @@ async def split_file(
     if (await get_document_type(path))[0]:
         if multi_streams:
             multi_streams = await is_multi_streams(path)
+        if start_time == 0 and i == 1:
+            res = await split_video_parallel(
+                path, file_, dirpath, split_size, listener, multi_streams
+            )
+            if res is not None:
+                return res
         duration = (await get_media_info(path))[0]
         base_name, extension = ospath.splitext(file_)
         split_size -= 5000000
@@ -356,6 +522,7 @@ async def split_file(
                 listener.suproc is not None and listener.suproc.returncode == -9
             ):
                 return False
+            subprocess_started()
             listener.suproc = await create_subprocess_exec(*cmd, stderr=PIPE)
             code = await listener.suproc.wait()
             if code == -9:
@@ -403,38 +570,54 @@ async def split_file(
                 LOGGER.error(
                     f"Something went wrong while splitting, mostly file is corrupted. Path: {path}"
                 )
+                i += 1
                 break
             if duration == lpd:
                 LOGGER.warning(
                     f"This file has been splitted with default stream and audio, so you will only see one part with less size from orginal one because it doesn't have all streams and audios. This happens mostly with MKV videos. Path: {path}"
                 )
+                i += 1
                 break
             if lpd <= 3:
                 await aioremove(out_path)
                 break
             start_time += lpd - 3
             i += 1
-    else:
-        out_path = ospath.join(dirpath, f"{file_}.")
-        listener.suproc = await create_subprocess_exec(
-            "split",
-            "--numeric-suffixes=1",
-            "--suffix-length=3",
-            f"--bytes={split_size}",
-            path,
-            out_path,
-            stderr=PIPE,
-        )
-        code = await listener.suproc.wait()
-        if code == -9:
-            return False
-        if code != 0:
-            err = (await listener.suproc.stderr.read()).decode().strip()
-            LOGGER.error(err)
-    return True
+        # parts of earlier attempts are kept, so this covers the retries too
+        return [
+            ospath.join(dirpath, f"{base_name}.part{n:03}{extension}")
+            for n in range(1, i)
+        ]
+    if virtual:
+        # parts are read from the original file at upload time
+        listener.virtual_parts[path] = [
+            (f"{file_}.{i:03}", offset, min(split_size, size - offset))
+            for i, offset in enumerate(range(0, size, split_size), start=1)
+        ]
+        return "virtual"
+    out_path = ospath.join(dirpath, f"{file_}.")
+    subprocess_started()
+    listener.suproc = await create_subprocess_exec(
+        "split",
+        "--numeric-suffixes=1",
+        "--suffix-length=3",
+        f"--bytes={split_size}",
+        path,
+        out_path,
+        stderr=PIPE,
+    )
+    code = await listener.suproc.wait()
+    if code == -9:
+        return False
+    parts = [f"{out_path}{i:03}" for i in range(1, -(-size // split_size) + 1)]
+    if code != 0:
+        err = (await listener.suproc.stderr.read()).decode().strip()
+        LOGGER.error(err)
+        parts = [part for part in parts if await aiopath.exists(part)]
+    return parts
 
 
-async def process_file(file_, user_id, dirpath=None, is_mirror=False):
+async def process_file(file_, user_id, dirpath=None, is_mirror=False, part=None):
     user_dict = user_data.get(user_id, {})
     prefix = user_dict.get("prefix", "")
     remname = user_dict.get("remname", "")
@@ -508,16 +691,27 @@ async def process_file(file_, user_id, dirpath=None, is_mirror=False):
         )
         slit = lcaption.split("|")
         slit[0] = re_sub(r"\{([^}]+)\}", lower_vars, slit[0])
-        up_path = ospath.join(dirpath, prefile_)
+        if part is None:
+            up_path = ospath.join(dirpath, prefile_)
+            f_size = await aiopath.getsize(up_path)
+            hash_range = ()
+        else:
+            # a virtual part is a byte range of its source, not a file on disk
+            up_path, offset, f_size = part
+            hash_range = (offset, f_size)
         dur, qual, lang, subs = await get_media_info(up_path, True)
         cap_mono = slit[0].format(
             filename=nfile_,
-            size=get_readable_file_size(await aiopath.getsize(up_path)),
+            size=get_readable_file_size(f_size),
             duration=get_readable_time(dur, True),
             quality=qual,
             languages=lang,
             subtitles=subs,
-            md5_hash=get_md5_hash(up_path),
+            md5_hash=(
+                await get_md5_hash(up_path, *hash_range)
+                if "{md5_hash}" in slit[0]
+                else ""
+            ),
         )
         if len(slit) > 1:
             for rep in range(1, len(slit)):
@@ -549,7 +743,7 @@ async def get_ss(up_path, ss_no):
 
 
 async def get_mediainfo_link(up_path):
-    stdout, __, _ = await cmd_exec(ssplit(f'mediainfo "{up_path}"'))
+    stdout = await get_mediainfo(up_path)
     tc = f"<h4>{ospath.basename(up_path)}</h4><br><br>"
     if len(stdout) != 0:
         tc += parseinfo(stdout)
@@ -557,12 +751,8 @@ async def get_mediainfo_link(up_path):
     return f"https://graph.org/{link_id}"
 
 
-def get_md5_hash(up_path):
-    md5_hash = md5()
-    with open(up_path, "rb") as f:
-        for byte_block in iter(lambda: f.read(4096), b""):
-            md5_hash.update(byte_block)
-        return md5_hash.hexdigest()
+async def get_md5_hash(up_path, offset=0, length=None):
+    return await run_cpu(md5_file, up_path, offset, length)
 
 
 def is_first_archive_split(file):
@@ -596,15 +786,45 @@ async def clean_download(path):
 
 
 async def start_cleanup():
-    xnox_client.torrents_delete(torrent_hashes="all")
+    # keep whatever the task journal can still resume
+    entries = await sync_to_async(journal_entries)
+    keep = {str(entry["uid"]) for entry in entries}
+    # only partial telegram downloads that a journaled task will resume
+    partials = {
+        loads(entry["ref"])["file"]
+        for entry in entries
+        if entry["engine"] == "telegram" and entry["ref"]
+    }
+    with contextlib.suppress(Exception):
+        if hashes := [
+            tor.hash
+            for tor in await sync_to_async(xnox_client.torrents_info)
+            if tor.tags not in keep
+        ]:
+            await sync_to_async(xnox_client.torrents_delete, torrent_hashes=hashes)
     with contextlib.suppress(Exception):
-        await aiormtree("/usr/src/app/downloads/")
-    await makedirs("/usr/src/app/downloads/", exist_ok=True)
+        if downloads := [
+            download
+            for download in await sync_to_async(aria2.get_downloads)
+            if download.dir.replace("/usr/src/app/downloads/", "").split("/")[0]
+            not in keep
+        ]:
+            await sync_to_async(aria2.remove, downloads, force=True, files=True)
+    await makedirs("/usr/src/app/downloads/.tgdl", exist_ok=True)
+    for item in await listdir("/usr/src/app/downloads/.tgdl"):
+        if item.removesuffix(".json") not in partials:
+            with contextlib.suppress(Exception):
+                await clean_target(f"/usr/src/app/downloads/.tgdl/{item}")
+    for item in await listdir("/usr/src/app/downloads/"):
+        if item not in keep and item != ".tgdl":
+            with contextlib.suppress(Exception):
+                await clean_target(f"/usr/src/app/downloads/{item}")
 
 
 def clean_all():
     aria2.remove_all(True)
     xnox_client.torrents_delete(torrent_hashes="all")
+    journal_clear()
     with contextlib.suppress(Exception):
         rmtree("/usr/src/app/downloads/")
 
@@ -669,12 +889,6 @@ def get_base_name(orig_path):
     raise ExtractionArchiveError("File format not supported for extraction")
 
 
-def get_mime_type(file_path):
-    mime = Magic(mime=True)
-    mime_type = mime.from_file(file_path)
-    return mime_type or "text/plain"
-
-
 def check_storage_threshold(size, threshold, arch=False, alloc=False):
     free = disk_usage("/usr/src/app/downloads/").free
     if not alloc:
@@ -696,7 +910,7 @@ async def join_files(path):
     for file_ in files:
         if (
             re_search(r"\.0+2$", file_)
-            and await sync_to_async(get_mime_type, f"{path}/{file_}")
+            and await run_cpu(get_mime_type, f"{path}/{file_}")
             == "application/octet-stream"
         ):
             final_name = file_.rsplit(".", 1)[0]
@@ -96,17 +96,28 @@ bset_display_dict = {
     "LEECH_DUMP_ID": "Chat ID where leeched files would be uploaded. Int. NOTE: Only available for superGroup/channel. Add -100 before the channel/superGroup ID. In short, don't add bot ID or your ID!",
     "MIRROR_LOG_ID": "Chat ID where mirror files would be sent. Int. NOTE: Only available for superGroup/channel. Add -100 before the channel/superGroup ID. In short, don't add bot ID or your ID! For multiple IDs, separate them by space.",
     "EXTENSION_FILTER": "File extensions that won't be uploaded/cloned. Separate them by space.",
+    "GDRIVE_UPLOAD_WORKERS": "Number of files uploaded to Google Drive at the same time when mirroring a folder. Each worker uses its own service account session. Empty or 1 uploads one file at a time. Int",
+    "GDRIVE_CLONE_WORKERS": "Number of workers copying files in parallel when cloning a Google Drive folder. Copies are sent as batch requests and each service account is rate limited separately. Empty or 1 clones one file at a time. Int",
     "GDRIVE_ID": "This is the Folder/TeamDrive ID of Google Drive or root to which you want to upload all the mirrors using google-api-python-client.",
     "INDEX_URL": "Refer to https://gitlab.com/ParveenBhadooOfficial/Google-Drive-Index.",
     "SHOW_MEDIAINFO": "Add a button to show MediaInfo in leeched files. Bool",
     "TOKEN_TIMEOUT": "Token timeout for each group member in seconds. Int",
     "MEDIA_GROUP": "View uploaded split file parts in media group. Default is False.",
+    "LEECH_UPLOAD_WORKERS": "Number of files uploaded to Telegram at the same time in a leech task. Uploads are spread over the bot and premium user client. With more than 1, files reply to the task start message instead of forming a reply chain and may appear out of order. Empty or 1 uploads one file at a time. Int",
+    "LEECH_PIPELINE_BUFFER": "Upload files of a single archive while it is still being extracted in leech tasks. The value is the maximum extracted data in GB kept on disk before extraction pauses for uploads to catch up. Not used for seeding or compress tasks. Empty disables it. Int",
+    "TG_DOWNLOAD_WORKERS": "Parallel connections per session used to download large Telegram files. When a premium user session can also see the message, the bot and user sessions download ranges of the file together. Default is 4. Int",
+    "DIRECT_DOWNLOAD_WORKERS": "Number of files of a direct link folder (gofile, mediafire, etc.) downloaded by aria2 at the same time. Downloads start while the folder is still being listed. Default is 4. Int",
+    "LEECH_VIRTUAL_SPLIT": "Upload non-video files bigger than the split size as byte ranges of the original file instead of writing part files to disk. Default is False.",
     "MEGA_EMAIL": "Email used to sign in on mega.nz for using a premium account. Str",
     "MEGA_PASSWORD": "Password for mega.nz account. Str",
     "OWNER_ID": "The Telegram User ID (not username) of the owner of the bot.",
     "QUEUE_ALL": "Number of parallel tasks for downloads and uploads. For example, if 20 tasks are added and QUEUE_ALL is 8, then the sum of uploading and downloading tasks is 8 and the rest are in the queue. Int. NOTE: If you want to fill QUEUE_DOWNLOAD or QUEUE_UPLOAD, then the QUEUE_ALL value must be greater than or equal to the largest one and less than or equal to the sum of QUEUE_UPLOAD and QUEUE_DOWNLOAD.",
     "QUEUE_DOWNLOAD": "Number of all parallel downloading tasks. Int",
     "QUEUE_UPLOAD": "Number of all parallel uploading tasks. Int",
+    "LOOP_PROFILER": "Watch the event loop from a background thread and log every callback that blocks it longer than LOOP_PROFILER_THRESHOLD, with its stack and source module. Use /profile for the top offenders. Default is False.",
+    "LOOP_PROFILER_THRESHOLD": "Blocking time in milliseconds after which LOOP_PROFILER reports a callback. Default is 200. Int",
+    "QUEUE_DISK": "Number of tasks allowed to extract, compress or join files at the same time. Other tasks wait for a free slot after their download finishes. Int",
+    "QUEUE_SJF": "Start queued tasks with a known smaller size first inside the same priority class and fair-share level. Default is False.",
     "RCLONE_FLAGS": "key:value|key|key|key:value. Check here all RcloneFlags.",
     "RCLONE_PATH": "Default rclone path to which you want to upload all the mirrors using rclone.",
     "SEARCH_API_LINK": "Search API app link. Get your API from deploying this repository. Supported sites: 1337x, Piratebay, Nyaasi, Torlock, Torrent Galaxy, Zooqle, Kickass, Bitsearch, MagnetDL, Libgen, YTS, Limetorrent, TorrentFunk, Glodls, TorrentProject, and YourBittorrent.",
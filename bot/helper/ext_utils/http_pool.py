@@ -0,0 +1,89 @@
+from copy import deepcopy
+from time import time
+from threading import Lock
+from contextlib import contextmanager
+from collections import OrderedDict
+
+from requests import Session
+from cloudscraper import create_scraper
+from urllib3.util.retry import Retry
+
+HTTP_POOL_HOSTS = 32
+HTTP_POOL_PER_HOST = 8
+RESOLVE_CACHE_TTL = 300
+RESOLVE_CACHE_LIMIT = 256
+sessions = {}
+sessions_lock = Lock()
+resolve_cache = OrderedDict()
+resolve_lock = Lock()
+
+
+def __resize_pools(session, retries):
+    # keep-alive pools, at most HTTP_POOL_PER_HOST sockets for every host.
+    # cloudscraper mounts its own cipher suite adapter, so resize in place
+    for adapter in session.adapters.values():
+        adapter._pool_connections = HTTP_POOL_HOSTS
+        adapter._pool_maxsize = HTTP_POOL_PER_HOST
+        adapter._pool_block = True
+        adapter.max_retries = retries
+        adapter.init_poolmanager(HTTP_POOL_HOSTS, HTTP_POOL_PER_HOST, block=True)
+    return session
+
+
+def __create(kind):
+    if kind == "mediafire":
+        # mediafire's cloudflare needs a desktop firefox and a slower solver
+        session = create_scraper(
+            browser={"browser": "firefox", "platform": "windows", "mobile": False},
+            delay=10,
+        )
+        return session, Retry(total=10, read=10, connect=10, backoff_factor=0.3)
+    # one cloudscraper, its challenge cookies are reused by every call
+    session = create_scraper() if kind == "scraper" else Session()
+    # pooled sockets may be closed by the server while idle
+    return session, Retry(total=5, backoff_factor=0.3)
+
+
+def __shared(kind):
+    with sessions_lock:
+        if (session := sessions.get(kind)) is None:
+            session = sessions[kind] = __resize_pools(*__create(kind))
+        return session
+
+
+def shared_session():
+    return __shared("requests")
+
+
+def shared_scraper():
+    return __shared("scraper")
+
+
+def mediafire_scraper():
+    return __shared("mediafire")
+
+
+@contextmanager
+def pooled_session():
+    # drop-in for `with Session()`, the shared session is never closed
+    yield shared_session()
+
+
+@contextmanager
+def pooled_scraper():
+    yield shared_scraper()
+
+
+def cached_resolve(link, resolver):
+    now = time()
+    with resolve_lock:
+        if (cached := resolve_cache.get(link)) and cached[0] > now:
+            resolve_cache.move_to_end(link)
+            return deepcopy(cached[1])
+        resolve_cache.pop(link, None)
+    result = resolver(link)
+    with resolve_lock:
+        resolve_cache[link] = (now + RESOLVE_CACHE_TTL, deepcopy(result))
+        while len(resolve_cache) > RESOLVE_CACHE_LIMIT:
+            resolve_cache.popitem(last=False)
+    return result
@@ -0,0 +1,100 @@
+from sys import _current_frames
+from time import sleep, monotonic
+from asyncio import sleep as asleep
+from threading import Thread, get_ident
+from traceback import format_stack
+
+from bot import LOGGER, bot_loop, config_dict
+
+PROFILER_TOP = 10
+PROFILER_REPORT_INTERVAL = 600
+heartbeat = {"beat": monotonic(), "thread": None}
+stall = {"start": 0.0, "site": None}
+slow_sites = {}
+loop_stats = {"max": 0.0, "stalls": 0}
+
+
+def __site_name(frame):
+    code = frame.f_code
+    return f"{frame.f_globals.get('__name__')}:{code.co_name}:{frame.f_lineno}"
+
+
+def __call_site(frame):
+    innermost = __site_name(frame)
+    while frame is not None:
+        if "/bot/" in frame.f_code.co_filename:
+            return __site_name(frame)
+        frame = frame.f_back
+    return innermost
+
+
+def __end_stall(end):
+    elapsed = end - stall["start"]
+    site = stall["site"]
+    stall["site"] = None
+    record = slow_sites.setdefault(site, {"count": 0, "total": 0.0, "max": 0.0})
+    record["count"] += 1
+    record["total"] += elapsed
+    record["max"] = max(record["max"], elapsed)
+    loop_stats["max"] = max(loop_stats["max"], elapsed)
+    loop_stats["stalls"] += 1
+    LOGGER.warning(f"Event loop was blocked for {elapsed:.3f}s by {site}")
+
+
+def __watchdog():
+    while True:
+        threshold = (config_dict["LOOP_PROFILER_THRESHOLD"] or 200) / 1000
+        if not config_dict["LOOP_PROFILER"]:
+            stall["site"] = None
+            sleep(1)
+            continue
+        beat = heartbeat["beat"]
+        blocked = monotonic() - beat
+        if stall["site"] is None and blocked > threshold:
+            if (frame := _current_frames().get(heartbeat["thread"])) is not None:
+                stall["start"] = beat
+                stall["site"] = __call_site(frame)
+                stack = "".join(format_stack(frame))
+                LOGGER.warning(
+                    f"Event loop blocked over {threshold:.3f}s in {stall['site']}"
+                    f"\n{stack}"
+                )
+        elif stall["site"] is not None and blocked <= threshold:
+            __end_stall(beat)
+        sleep(min(threshold / 4, 0.05))
+
+
+async def __heartbeat():
+    while True:
+        heartbeat["beat"] = monotonic()
+        await asleep(0.02 if config_dict["LOOP_PROFILER"] else 0.5)
+
+
+async def __periodic_report():
+    while True:
+        await asleep(PROFILER_REPORT_INTERVAL)
+        if config_dict["LOOP_PROFILER"] and slow_sites:
+            LOGGER.info(profiler_report())
+
+
+def profiler_report(top=PROFILER_TOP):
+    report = (
+        f"Loop stalls: {loop_stats['stalls']} | "
+        f"Longest: {loop_stats['max']:.3f}s\n"
+    )
+    sites = sorted(slow_sites.items(), key=lambda x: x[1]["total"], reverse=True)
+    for index, (site, record) in enumerate(sites[:top], start=1):
+        report += (
+            f"\n{index}. {site}\n"
+            f"   {record['count']}x, total {record['total']:.3f}s, "
+            f"max {record['max']:.3f}s"
+        )
+    return report
+
+
+def start_loop_profiler():
+    heartbeat["thread"] = get_ident()
+    heartbeat["beat"] = monotonic()
+    bot_loop.create_task(__heartbeat())
+    bot_loop.create_task(__periodic_report())
+    Thread(target=__watchdog, name="loop-profiler", daemon=True).start()
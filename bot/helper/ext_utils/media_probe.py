@@ -0,0 +1,211 @@
+from re import MULTILINE
+from re import sub as re_sub
+from copy import deepcopy
+from json import JSONDecodeError, loads
+from time import time
+from asyncio import Lock
+from hashlib import md5
+from sqlite3 import Error as SqliteError
+from sqlite3 import connect
+from threading import Lock as ThreadLock
+from collections import OrderedDict
+
+from aiofiles.os import stat as aiostat
+
+from bot import LOGGER, DATABASE_URL
+from bot.helper.ext_utils.bot_utils import cmd_exec, sync_to_async
+from bot.helper.ext_utils.db_handler import DbManager
+
+PROBE_CACHE_LIMIT = 512
+PROBE_STORE = "probe_cache.db"
+PROBE_STORE_LIMIT = 20000
+FINGERPRINT_BLOCK = 64 * 1024
+probe_cache = OrderedDict()
+probe_locks = {}
+probe_store = {"conn": None, "writes": 0}
+store_lock = ThreadLock()
+
+
+def fingerprint_file(path, size):
+    digest = md5()
+    with open(path, "rb") as f:
+        digest.update(f.read(FINGERPRINT_BLOCK))
+        if size > FINGERPRINT_BLOCK:
+            f.seek(max(size - FINGERPRINT_BLOCK, FINGERPRINT_BLOCK))
+            digest.update(f.read(FINGERPRINT_BLOCK))
+    return f"{size}-{digest.hexdigest()}"
+
+
+def __connection():
+    if probe_store["conn"] is None:
+        conn = connect(PROBE_STORE, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS probes "
+            "(key TEXT PRIMARY KEY, result TEXT NOT NULL, used REAL NOT NULL)"
+        )
+        probe_store["conn"] = conn
+    return probe_store["conn"]
+
+
+def __store_get(key):
+    with store_lock:
+        conn = __connection()
+        row = conn.execute(
+            "SELECT result FROM probes WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        conn.execute("UPDATE probes SET used = ? WHERE key = ?", (time(), key))
+        conn.commit()
+        return row[0]
+
+
+def __store_put(key, result):
+    with store_lock:
+        conn = __connection()
+        conn.execute(
+            "INSERT OR REPLACE INTO probes VALUES (?, ?, ?)", (key, result, time())
+        )
+        probe_store["writes"] += 1
+        if probe_store["writes"] % 100 == 0:
+            conn.execute(
+                "DELETE FROM probes WHERE key IN (SELECT key FROM probes "
+                "ORDER BY used DESC LIMIT -1 OFFSET ?)",
+                (PROBE_STORE_LIMIT,),
+            )
+        conn.commit()
+
+
+async def probe_lookup(key):
+    try:
+        if (result := await sync_to_async(__store_get, key)) is not None:
+            return result
+    except SqliteError as e:
+        LOGGER.error(f"Probe Store: {e}")
+    if DATABASE_URL:
+        try:
+            if (result := await DbManager().get_probe(key)) is not None:
+                await sync_to_async(__store_put, key, result)
+                return result
+        except Exception as e:
+            LOGGER.error(f"Probe Store: {e}")
+    return None
+
+
+async def probe_save(key, result):
+    try:
+        await sync_to_async(__store_put, key, result)
+    except SqliteError as e:
+        LOGGER.error(f"Probe Store: {e}")
+    if DATABASE_URL:
+        try:
+            await DbManager().update_probe(key, result)
+        except Exception as e:
+            LOGGER.error(f"Probe Store: {e}")
+
+
+async def __run_ffprobe(path):
+    try:
+        stdout, stderr, code = await cmd_exec(
+            [
+                "ffprobe",
+                "-hide_banner",
+                "-loglevel",
+                "error",
+                "-print_format",
+                "json",
+                "-show_format",
+                "-show_streams",
+                path,
+            ]
+        )
+        if stderr:
+            LOGGER.warning(f"Media Probe: {stderr}")
+    except Exception as e:
+        LOGGER.error(f"Media Probe: {e}. Mostly File not found!")
+        return None
+    if code != 0:
+        LOGGER.error(f"Media Probe: ffprobe exited with {code} for {path}")
+        return None
+    if __parse_probe(stdout) is None:
+        LOGGER.error(f"Media Probe: invalid ffprobe output for {path}")
+        return None
+    return stdout
+
+
+def __parse_probe(result):
+    try:
+        probe = loads(result)
+    except JSONDecodeError:
+        return None
+    # an empty object means ffprobe could not read the file at all
+    if not isinstance(probe, dict) or not ("streams" in probe or "format" in probe):
+        return None
+    return probe
+
+
+async def __run_mediainfo(path):
+    try:
+        stdout, _, _ = await cmd_exec(["mediainfo", path])
+    except Exception as e:
+        LOGGER.error(f"MediaInfo: {e}. Mostly File not found!")
+        return None
+    return stdout or None
+
+
+async def __cached_probe(kind, path, runner, parser=None):
+    try:
+        st = await aiostat(path)
+    except OSError as e:
+        LOGGER.error(f"Media Probe: {e}. Mostly File not found!")
+        return None
+    key = (kind, path, st.st_size, st.st_mtime_ns)
+    if key in probe_cache:
+        probe_cache.move_to_end(key)
+        return probe_cache[key]
+    lock = probe_locks.setdefault(key, Lock())
+    async with lock:
+        if key not in probe_cache:
+            try:
+                fingerprint = await sync_to_async(fingerprint_file, path, st.st_size)
+            except OSError as e:
+                LOGGER.error(f"Media Probe: {e}. Mostly File not found!")
+                probe_locks.pop(key, None)
+                return None
+            store_key = f"{kind}:{fingerprint}"
+            result = await probe_lookup(store_key)
+            if result is not None and parser is not None:
+                result = parser(result)
+            if result is None:
+                if (result := await runner(path)) is None:
+                    probe_locks.pop(key, None)
+                    return None
+                await probe_save(store_key, result)
+                if parser is not None:
+                    result = parser(result)
+            # cache the parsed value, the stores only ever hold text
+            probe_cache[key] = result
+            while len(probe_cache) > PROBE_CACHE_LIMIT:
+                probe_cache.popitem(last=False)
+    probe_locks.pop(key, None)
+    return probe_cache.get(key)
+
+
+async def get_media_probe(path):
+    result = await __cached_probe("ffprobe", path, __run_ffprobe, __parse_probe)
+    # callers are free to mutate the dict they get back
+    return None if result is None else deepcopy(result)
+
+
+async def get_mediainfo(path):
+    if not (result := await __cached_probe("mediainfo", path, __run_mediainfo)):
+        return ""
+    # stored output may come from an identical file under another name
+    return re_sub(
+        r"^(Complete name\s*:).*$",
+        lambda match: f"{match.group(1)} {path}",
+        result,
+        count=1,
+        flags=MULTILINE,
+    )
@@ -0,0 +1,220 @@
+from os import replace as osreplace
+from time import monotonic
+from asyncio import sleep
+from contextlib import contextmanager
+from collections import OrderedDict
+from contextvars import ContextVar
+
+from aiofiles import open as aiopen
+
+from bot import (
+    LOGGER,
+    bot_loop,
+    queued_dl,
+    queued_up,
+    download_dict,
+    non_queued_dl,
+    non_queued_up,
+)
+from bot.helper.ext_utils.executors import EXECUTOR_LIMITS, executor_stats
+
+METRICS_FILE = "metrics.prom"
+METRICS_INTERVAL = 5
+TASK_METRICS_LIMIT = 50
+current_stage = ContextVar("current_stage", default=None)
+stage_totals = {}
+task_metrics = OrderedDict()
+running_stages = {}
+loop_lag = {"last": 0.0, "max": 0.0}
+
+
+def __stage_record(uid, stage):
+    if uid not in task_metrics:
+        task_metrics[uid] = {}
+        while len(task_metrics) > TASK_METRICS_LIMIT:
+            task_metrics.popitem(last=False)
+    return task_metrics[uid].setdefault(
+        stage, {"seconds": 0.0, "bytes": 0, "subprocs": 0}
+    )
+
+
+def __record(uid, stage, elapsed, size):
+    record = __stage_record(uid, stage)
+    record["seconds"] += elapsed
+    record["bytes"] += size
+    totals = stage_totals.setdefault(
+        stage, {"runs": 0, "seconds": 0.0, "bytes": 0, "subprocs": 0}
+    )
+    totals["runs"] += 1
+    totals["seconds"] += elapsed
+    totals["bytes"] += size
+
+
+def stage_started(uid, stage):
+    running_stages[(uid, stage)] = (monotonic(), current_stage.set((uid, stage)))
+
+
+def stage_finished(uid, stage, size=0):
+    if (started := running_stages.pop((uid, stage), None)) is None:
+        return
+    start, token = started
+    try:
+        current_stage.reset(token)
+    except ValueError:
+        current_stage.set(None)
+    __record(uid, stage, monotonic() - start, size)
+
+
+@contextmanager
+def measure_stage(uid, stage, size=0):
+    start = monotonic()
+    token = current_stage.set((uid, stage))
+    try:
+        yield
+    finally:
+        current_stage.reset(token)
+        __record(uid, stage, monotonic() - start, size)
+
+
+def subprocess_started():
+    if (stage := current_stage.get()) is None:
+        return
+    uid, name = stage
+    __stage_record(uid, name)["subprocs"] += 1
+    stage_totals.setdefault(
+        name, {"runs": 0, "seconds": 0.0, "bytes": 0, "subprocs": 0}
+    )["subprocs"] += 1
+
+
+def render_metrics():
+    lines = []
+
+    def metric(name, kind, help_, samples):
+        lines.append(f"# HELP {name} {help_}")
+        lines.append(f"# TYPE {name} {kind}")
+        for labels, value in samples:
+            label = ",".join(f'{k}="{v}"' for k, v in labels.items())
+            label = f"{{{label}}}" if label else ""
+            lines.append(f"{name}{label} {value}")
+
+    for key, kind, help_ in [
+        ("runs", "counter", "Finished runs of a task stage"),
+        ("seconds", "counter", "Seconds spent in a task stage"),
+        ("bytes", "counter", "Bytes handled by a task stage"),
+        ("subprocs", "counter", "Subprocesses spawned by a task stage"),
+    ]:
+        metric(
+            f"asa_stage_{key}_total",
+            kind,
+            help_,
+            [
+                ({"stage": stage}, totals[key])
+                for stage, totals in stage_totals.items()
+            ],
+        )
+    for key, help_ in [
+        ("seconds", "Seconds spent in a stage by a recent task"),
+        ("bytes", "Bytes handled in a stage by a recent task"),
+        ("subprocs", "Subprocesses spawned in a stage by a recent task"),
+    ]:
+        metric(
+            f"asa_task_stage_{key}",
+            "gauge",
+            help_,
+            [
+                ({"task": uid, "stage": stage}, record[key])
+                for uid, stages in list(task_metrics.items())
+                for stage, record in stages.items()
+            ],
+        )
+    metric(
+        "asa_tasks",
+        "gauge",
+        "Tasks in download_dict",
+        [({}, len(download_dict))],
+    )
+    metric(
+        "asa_queue_depth",
+        "gauge",
+        "Tasks waiting in a queue",
+        [
+            ({"queue": "download"}, len(queued_dl)),
+            ({"queue": "upload"}, len(queued_up)),
+        ],
+    )
+    metric(
+        "asa_running_tasks",
+        "gauge",
+        "Tasks holding a queue slot",
+        [
+            ({"queue": "download"}, len(non_queued_dl)),
+            ({"queue": "upload"}, len(non_queued_up)),
+        ],
+    )
+    for key, help_ in [
+        ("queued", "Calls waiting for an executor worker"),
+        ("active", "Calls running on an executor worker"),
+    ]:
+        metric(
+            f"asa_executor_{key}",
+            "gauge",
+            help_,
+            [
+                ({"executor": name}, stats[key])
+                for name, stats in executor_stats.items()
+            ],
+        )
+    metric(
+        "asa_executor_completed_total",
+        "counter",
+        "Calls completed by an executor",
+        [
+            ({"executor": name}, stats["done"])
+            for name, stats in executor_stats.items()
+        ],
+    )
+    metric(
+        "asa_executor_workers",
+        "gauge",
+        "Worker limit of an executor",
+        [({"executor": name}, limit) for name, limit in EXECUTOR_LIMITS.items()],
+    )
+    metric(
+        "asa_event_loop_lag_seconds",
+        "gauge",
+        "Latest event loop scheduling lag",
+        [({}, round(loop_lag["last"], 6))],
+    )
+    metric(
+        "asa_event_loop_lag_max_seconds",
+        "gauge",
+        "Largest event loop scheduling lag since the last export",
+        [({}, round(loop_lag["max"], 6))],
+    )
+    return "\n".join(lines) + "\n"
+
+
+async def __probe_loop_lag():
+    while True:
+        start = monotonic()
+        await sleep(0.5)
+        lag = max(monotonic() - start - 0.5, 0)
+        loop_lag["last"] = lag
+        loop_lag["max"] = max(loop_lag["max"], lag)
+
+
+async def __export_metrics():
+    while True:
+        await sleep(METRICS_INTERVAL)
+        try:
+            async with aiopen(f"{METRICS_FILE}.tmp", "w") as f:
+                await f.write(render_metrics())
+            osreplace(f"{METRICS_FILE}.tmp", METRICS_FILE)
+            loop_lag["max"] = loop_lag["last"]
+        except Exception as e:
+            LOGGER.error(f"Metrics export: {e}")
+
+
+def start_metrics():
+    bot_loop.create_task(__probe_loop_lag())
+    bot_loop.create_task(__export_metrics())
@@ -0,0 +1,134 @@
+from json import dumps, loads
+from time import time
+from sqlite3 import Error as SqliteError
+from sqlite3 import connect
+from threading import Lock
+
+from bot import LOGGER
+from bot.helper.ext_utils.bot_utils import sync_to_async
+
+JOURNAL_FILE = "tasks.db"
+JOURNAL_OPTIONS = [
+    "compress",
+    "extract",
+    "is_qbit",
+    "is_leech",
+    "tag",
+    "select",
+    "seed",
+    "rc_flags",
+    "upPath",
+    "is_clone",
+    "join",
+    "is_ytdlp",
+    "drive_id",
+    "index_link",
+    "attachment",
+    "files_utils",
+    "same_dir",
+]
+journal = {"conn": None}
+journal_lock = Lock()
+
+
+def __connection():
+    if journal["conn"] is None:
+        conn = connect(JOURNAL_FILE, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS tasks (uid INTEGER PRIMARY KEY, "
+            "chat_id INTEGER NOT NULL, stage TEXT, engine TEXT, ref TEXT, "
+            "name TEXT, options TEXT NOT NULL, updated REAL NOT NULL)"
+        )
+        journal["conn"] = conn
+    return journal["conn"]
+
+
+def __upsert(uid, chat_id, options, stage, engine, ref, name):
+    with journal_lock:
+        conn = __connection()
+        conn.execute(
+            "INSERT INTO tasks VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT(uid) DO UPDATE SET "
+            "stage = COALESCE(excluded.stage, stage), "
+            "engine = COALESCE(excluded.engine, engine), "
+            "ref = COALESCE(excluded.ref, ref), "
+            "name = COALESCE(excluded.name, name), "
+            "options = excluded.options, updated = excluded.updated",
+            (uid, chat_id, stage, engine, ref, name, options, time()),
+        )
+        conn.commit()
+
+
+def __delete(uid):
+    with journal_lock:
+        conn = __connection()
+        conn.execute("DELETE FROM tasks WHERE uid = ?", (uid,))
+        conn.commit()
+
+
+def journal_clear():
+    try:
+        with journal_lock:
+            conn = __connection()
+            conn.execute("DELETE FROM tasks")
+            conn.commit()
+    except SqliteError as e:
+        LOGGER.error(f"Task Journal: {e}")
+
+
+def journal_entries():
+    try:
+        with journal_lock:
+            rows = (
+                __connection()
+                .execute(
+                    "SELECT uid, chat_id, stage, engine, ref, name, options "
+                    "FROM tasks"
+                )
+                .fetchall()
+            )
+    except SqliteError as e:
+        LOGGER.error(f"Task Journal: {e}")
+        return []
+    return [
+        {
+            "uid": uid,
+            "chat_id": chat_id,
+            "stage": stage,
+            "engine": engine,
+            "ref": ref,
+            "name": name,
+            "options": loads(options),
+        }
+        for uid, chat_id, stage, engine, ref, name, options in rows
+    ]
+
+
+def __encode(value):
+    # same_dir keeps its task ids in a set
+    return sorted(value) if isinstance(value, set) else str(value)
+
+
+async def journal_task(listener, stage=None, engine=None, ref=None, name=None):
+    options = {key: getattr(listener, key, None) for key in JOURNAL_OPTIONS}
+    try:
+        await sync_to_async(
+            __upsert,
+            listener.uid,
+            listener.message.chat.id,
+            dumps(options, default=__encode),
+            stage,
+            engine,
+            ref,
+            name,
+        )
+    except SqliteError as e:
+        LOGGER.error(f"Task Journal: {e}")
+
+
+async def journal_remove(uid):
+    try:
+        await sync_to_async(__delete, uid)
+    except SqliteError as e:
+        LOGGER.error(f"Task Journal: {e}")
@@ -1,4 +1,6 @@
-from asyncio import Event
+import contextlib
+from asyncio import Event, Condition
+from itertools import count
 
 from bot import (
     LOGGER,
@@ -23,6 +25,11 @@ from bot.helper.ext_utils.files_utils import get_base_name, check_storage_thresh
 from bot.helper.telegram_helper.message_utils import BotPm_check, isAdmin, forcesub
 from bot.helper.mirror_leech_utils.upload_utils.gdriveTools import GoogleDriveHelper
 
+queue_meta = {}
+queue_seq = count()
+disk_tasks = set()
+disk_stage = Condition()
+
 
 async def stop_duplicate_check(name, listener):
     if (
@@ -51,7 +58,66 @@ async def stop_duplicate_check(name, listener):
     return False, None
 
 
-async def is_queued(uid):
+def __priority(user_id):
+    if user_id == OWNER_ID:
+        return 0
+    if user_id in user_data and user_data[user_id].get("is_sudo"):
+        return 1
+    return 2
+
+
+def add_to_queue(queue, listener, size=0):
+    user_id = listener.message.from_user.id
+    event = Event()
+    queue[listener.uid] = event
+    queue_meta[listener.uid] = {
+        "user_id": user_id,
+        "priority": __priority(user_id),
+        "size": size or 0,
+        "seq": next(queue_seq),
+    }
+    return event
+
+
+def __running_per_user():
+    running = {}
+    for uid in non_queued_dl | non_queued_up:
+        if (task := download_dict.get(uid)) is None:
+            continue
+        with contextlib.suppress(Exception):
+            user_id = task.listener().message.from_user.id
+            running[user_id] = running.get(user_id, 0) + 1
+    return running
+
+
+def __pick(queue, slots):
+    if slots <= 0 or not queue:
+        return []
+    sjf = config_dict["QUEUE_SJF"]
+    running = __running_per_user()
+
+    def sort_key(uid):
+        if (meta := queue_meta.get(uid)) is None:
+            return (2, 0, 0, 0)
+        return (
+            meta["priority"],
+            running.get(meta["user_id"], 0),
+            (meta["size"] or float("inf")) if sjf else 0,
+            meta["seq"],
+        )
+
+    candidates = list(queue.keys())
+    picked = []
+    while candidates and len(picked) < slots:
+        uid = min(candidates, key=sort_key)
+        candidates.remove(uid)
+        picked.append(uid)
+        if meta := queue_meta.get(uid):
+            running[meta["user_id"]] = running.get(meta["user_id"], 0) + 1
+    return picked
+
+
+async def is_queued(listener, size=0):
     all_limit = config_dict["QUEUE_ALL"]
     dl_limit = config_dict["QUEUE_DOWNLOAD"]
     event = None
@@ -66,74 +132,60 @@ async def is_queued(uid):
                 and (not dl_limit or dl >= dl_limit)
             ) or (dl_limit and dl >= dl_limit):
                 added_to_queue = True
-                event = Event()
-                queued_dl[uid] = event
+                event = add_to_queue(queued_dl, listener, size)
     return added_to_queue, event
 
 
 def start_dl_from_queued(uid):
     queued_dl[uid].set()
     del queued_dl[uid]
+    queue_meta.pop(uid, None)
 
 
 def start_up_from_queued(uid):
     queued_up[uid].set()
     del queued_up[uid]
+    queue_meta.pop(uid, None)
 
 
 async def start_from_queued():
-    if all_limit := config_dict["QUEUE_ALL"]:
-        dl_limit = config_dict["QUEUE_DOWNLOAD"]
-        up_limit = config_dict["QUEUE_UPLOAD"]
-        async with queue_dict_lock:
-            dl = len(non_queued_dl)
-            up = len(non_queued_up)
-            all_ = dl + up
-            if all_ < all_limit:
-                f_tasks = all_limit - all_
-                if queued_up and (not up_limit or up < up_limit):
-                    for index, uid in enumerate(list(queued_up.keys()), start=1):
-                        f_tasks = all_limit - all_
-                        start_up_from_queued(uid)
-                        f_tasks -= 1
-                        if f_tasks == 0 or (up_limit and index >= up_limit - up):
-                            break
-                if queued_dl and (not dl_limit or dl < dl_limit) and f_tasks != 0:
-                    for index, uid in enumerate(list(queued_dl.keys()), start=1):
-                        start_dl_from_queued(uid)
-                        if (dl_limit and index >= dl_limit - dl) or index == f_tasks:
-                            break
-        return
-
-    if up_limit := config_dict["QUEUE_UPLOAD"]:
-        async with queue_dict_lock:
-            up = len(non_queued_up)
-            if queued_up and up < up_limit:
-                f_tasks = up_limit - up
-                for index, uid in enumerate(list(queued_up.keys()), start=1):
-                    start_up_from_queued(uid)
-                    if index == f_tasks:
-                        break
-    else:
-        async with queue_dict_lock:
-            if queued_up:
-                for uid in list(queued_up.keys()):
-                    start_up_from_queued(uid)
+    all_limit = config_dict["QUEUE_ALL"]
+    dl_limit = config_dict["QUEUE_DOWNLOAD"]
+    up_limit = config_dict["QUEUE_UPLOAD"]
+    async with queue_dict_lock:
+        dl = len(non_queued_dl)
+        up = len(non_queued_up)
+        free = all_limit - dl - up if all_limit else None
+        up_slots = up_limit - up if up_limit else len(queued_up)
+        if free is not None:
+            up_slots = min(up_slots, free)
+        for uid in __pick(queued_up, up_slots):
+            start_up_from_queued(uid)
+            if free is not None:
+                free -= 1
+        dl_slots = dl_limit - dl if dl_limit else len(queued_dl)
+        if free is not None:
+            dl_slots = min(dl_slots, free)
+        for uid in __pick(queued_dl, dl_slots):
+            start_dl_from_queued(uid)
+    async with disk_stage:
+        disk_stage.notify_all()
 
-    if dl_limit := config_dict["QUEUE_DOWNLOAD"]:
-        async with queue_dict_lock:
-            dl = len(non_queued_dl)
-            if queued_dl and dl < dl_limit:
-                f_tasks = dl_limit - dl
-                for index, uid in enumerate(list(queued_dl.keys()), start=1):
-                    start_dl_from_queued(uid)
-                    if index == f_tasks:
-                        break
-    else:
-        async with queue_dict_lock:
-            if queued_dl:
-                for uid in list(queued_dl.keys()):
-                    start_dl_from_queued(uid)
+
+async def start_disk_stage(uid):
+    async with disk_stage:
+        await disk_stage.wait_for(
+            lambda: not (disk_limit := config_dict["QUEUE_DISK"])
+            or len(disk_tasks) < disk_limit
+        )
+        disk_tasks.add(uid)
+
+
+async def finish_disk_stage(uid):
+    async with disk_stage:
+        if uid in disk_tasks:
+            disk_tasks.remove(uid)
+            disk_stage.notify_all()
 
 
 async def limit_checker(
@@ -0,0 +1,112 @@
+import contextlib
+from os import path as ospath
+from re import sub as re_sub
+from asyncio import Lock
+from collections import OrderedDict
+
+from aiofiles.os import path as aiopath
+from aiofiles.os import rmdir, listdir, makedirs
+from aiofiles.os import remove as aioremove
+from aiofiles.os import rename as aiorename
+
+from bot import LOGGER
+from bot.helper.ext_utils.bot_utils import sync_to_async
+from bot.helper.ext_utils.files_utils import take_ss, get_audio_thumb
+from bot.helper.ext_utils.media_probe import fingerprint_file
+
+THUMB_CACHE_DIR = "Thumbnails/cache"
+THUMB_CACHE_LIMIT = 256
+thumb_cache = OrderedDict()
+source_thumbs = OrderedDict()
+thumb_locks = {}
+cache_state = {"loaded": False}
+
+
+def is_cached_thumb(path):
+    return path is not None and path.startswith(f"{THUMB_CACHE_DIR}/")
+
+
+def __source(path):
+    # all .partNNN pieces of one split video share a thumbnail
+    return re_sub(r"\.part\d{3}(\.[^./]+)?$", "", path)
+
+
+async def __load_cache():
+    cache_state["loaded"] = True
+    await makedirs(THUMB_CACHE_DIR, exist_ok=True)
+    files = []
+    for file_ in await listdir(THUMB_CACHE_DIR):
+        path = ospath.join(THUMB_CACHE_DIR, file_)
+        with contextlib.suppress(OSError):
+            files.append((await aiopath.getmtime(path), file_, path))
+    for _, file_, path in sorted(files):
+        thumb_cache[ospath.splitext(file_)[0]] = path
+    await __evict()
+
+
+async def __evict():
+    while len(thumb_cache) > THUMB_CACHE_LIMIT:
+        key, path = thumb_cache.popitem(last=False)
+        for source, skey in list(source_thumbs.items()):
+            if skey == key:
+                del source_thumbs[source]
+        with contextlib.suppress(OSError):
+            await aioremove(path)
+
+
+async def __cached_thumb(kind, path, producer):
+    if not cache_state["loaded"]:
+        await __load_cache()
+    source = (kind, __source(path))
+    if (key := source_thumbs.get(source)) in thumb_cache and await aiopath.exists(
+        thumb_cache[key]
+    ):
+        source_thumbs.move_to_end(source)
+        thumb_cache.move_to_end(key)
+        return thumb_cache[key]
+    try:
+        size = await aiopath.getsize(path)
+        key = f"{kind}_{await sync_to_async(fingerprint_file, path, size)}"
+    except OSError as e:
+        LOGGER.error(f"Thumbnail: {e}. Mostly File not found!")
+        return None
+    lock = thumb_locks.setdefault(key, Lock())
+    async with lock:
+        if key not in thumb_cache or not await aiopath.exists(thumb_cache[key]):
+            thumb_cache.pop(key, None)
+            des_path = ospath.join(THUMB_CACHE_DIR, f"{key}.jpg")
+            if not await producer(des_path):
+                thumb_locks.pop(key, None)
+                return None
+            thumb_cache[key] = des_path
+            await __evict()
+        thumb_cache.move_to_end(key)
+    thumb_locks.pop(key, None)
+    source_thumbs[source] = key
+    source_thumbs.move_to_end(source)
+    # every leech of the same content adds a source, keep them bounded too
+    while len(source_thumbs) > THUMB_CACHE_LIMIT:
+        source_thumbs.popitem(last=False)
+    return thumb_cache.get(key)
+
+
+async def get_video_thumb(video_file, duration=None):
+    async def producer(des_path):
+        if (thumb := await take_ss(video_file, duration)) is None:
+            return False
+        await aiorename(thumb, des_path)
+        with contextlib.suppress(OSError):
+            await rmdir(ospath.dirname(thumb))
+        return True
+
+    return await __cached_thumb("video", video_file, producer)
+
+
+async def get_cover_thumb(audio_file):
+    async def producer(des_path):
+        if (thumb := await get_audio_thumb(audio_file)) is None:
+            return False
+        await aiorename(thumb, des_path)
+        return True
+
+    return await __cached_thumb("audio", audio_file, producer)
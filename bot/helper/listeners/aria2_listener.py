@@ -14,7 +14,9 @@ from bot.helper.ext_utils.bot_utils import (
     bt_selection_buttons,
 )
 from bot.helper.ext_utils.files_utils import get_base_name, clean_unwanted
+from bot.helper.ext_utils.task_journal import journal_task
 from bot.helper.ext_utils.task_manager import limit_checker
+from bot.helper.listeners.direct_listener import direct_gids
 from bot.helper.telegram_helper.message_utils import (
     delete_links,
     send_message,
@@ -124,6 +126,9 @@ async def __on_download_started(api, gid):
 
 @new_thread
 async def __on_download_complete(api, gid):
+    if direct := direct_gids.get(gid):
+        direct.on_download_finished(gid)
+        return
     try:
         download = await sync_to_async(api.get_download, gid)
     except Exception:
@@ -135,6 +140,7 @@ async def __on_download_complete(api, gid):
         LOGGER.info(f"Gid changed from {gid} to {new_gid}")
         if dl := await get_task_by_gid(new_gid):
             listener = dl.listener()
+            await journal_task(listener, ref=new_gid)
             if config_dict["BASE_URL"] and listener.select:
                 if not dl.queued:
                     await sync_to_async(api.client.force_pause, new_gid)
@@ -230,6 +236,9 @@ async def __on_download_stopped(_, gid):
 
 @new_thread
 async def __on_download_error(api, gid):
+    if direct := direct_gids.get(gid):
+        direct.on_download_finished(gid, failed=True)
+        return
     LOGGER.info(f"onDownloadError: {gid}")
     error = "None"
     try:
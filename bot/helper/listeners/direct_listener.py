@@ -1,7 +1,19 @@
-from time import sleep
+import contextlib
+from asyncio import Event, wait_for
 
-from bot import LOGGER, aria2
-from bot.helper.ext_utils.bot_utils import async_to_sync, sync_to_async
+from bot import LOGGER, aria2, config_dict
+from bot.helper.ext_utils.bot_utils import sync_to_async
+from bot.helper.ext_utils.task_manager import limit_checker
+from bot.helper.mirror_leech_utils.status_utils.aria2_status import (
+    get_download,
+    aria2_downloads,
+    start_aria2_poller,
+)
+
+DIRECT_WORKERS = 4
+# missed websocket notifications are caught from the poller snapshot
+DIRECT_RECHECK = 5
+direct_gids = {}
 
 
 class DirectListener:
@@ -10,73 +22,181 @@ class DirectListener:
         self.__listener = listener
         self.__is_cancelled = False
         self.__a2c_opt = a2c_opt
-        self.task = None
+        self.__gids = {}
+        self.__finished = {}
+        self.__wakeup = Event()
         self.name = foldername
         self.total_size = total_size
         self.proc_bytes = 0
         self.failed = 0
+        self.added = 0
 
     @property
     def processed_bytes(self):
-        if self.task:
-            return self.proc_bytes + self.task.completed_length
-        return self.proc_bytes
+        return self.proc_bytes + sum(
+            download.completed_length
+            for gid in self.__gids
+            if (download := aria2_downloads.get(gid))
+        )
 
     @property
     def speed(self):
-        return self.task.download_speed if self.task else 0
-
-    def download(self, contents):
-        self.is_downloading = True
-        for content in contents:
-            if self.__is_cancelled:
-                break
-            if content["path"]:
-                self.__a2c_opt["dir"] = f"{self.__path}/{content['path']}"
-            else:
-                self.__a2c_opt["dir"] = self.__path
-            filename = content["filename"]
-            self.__a2c_opt["out"] = filename
-            try:
-                self.task = aria2.add_uris(
-                    [content["url"]], self.__a2c_opt, position=0
-                )
-            except Exception as e:
+        return sum(
+            download.download_speed
+            for gid in self.__gids
+            if (download := aria2_downloads.get(gid))
+        )
+
+    @property
+    def is_waiting(self):
+        downloads = [aria2_downloads.get(gid) for gid in self.__gids]
+        return bool(downloads) and all(
+            download is not None and download.is_waiting for download in downloads
+        )
+
+    def on_download_finished(self, gid, failed=False):
+        self.__finished[gid] = failed
+        self.__wakeup.set()
+
+    async def __entries(self, contents, source):
+        if source is None:
+            for content in contents:
+                yield content
+            return
+        while (content := await contents.get()) is not None:
+            if isinstance(content, Exception):
+                raise content
+            self.total_size = source["total_size"]
+            yield content
+        self.total_size = source["total_size"]
+
+    def __options(self, content):
+        a2c_opt = {**self.__a2c_opt}
+        if content["path"]:
+            a2c_opt["dir"] = f"{self.__path}/{content['path']}"
+        else:
+            a2c_opt["dir"] = self.__path
+        a2c_opt["out"] = content["filename"]
+        return a2c_opt
+
+    async def __add_window(self, window):
+        # one round trip for the whole window, appended to the aria2 queue in
+        # order so other tasks' waiting downloads keep their place
+        client = aria2.client
+        calls = [
+            (client.ADD_URI, [[content["url"]], self.__options(content)])
+            for content in window
+        ]
+        self.added += len(window)
+        try:
+            results = await sync_to_async(client.multicall2, calls)
+        except Exception as e:
+            self.failed += len(window)
+            LOGGER.error(f"Unable to add {len(window)} files of {self.name}: {e}")
+            return
+        for content, result in zip(window, results):
+            if isinstance(result, dict):
                 self.failed += 1
-                LOGGER.error(f"Unable to download {filename} due to: {e}")
+                error = result.get("faultString", result)
+                LOGGER.error(
+                    f"Unable to download {content['filename']} due to: {error}"
+                )
                 continue
-            self.task = self.task.live
-            while True:
+            direct_gids[result[0]] = self
+            self.__gids[result[0]] = content["filename"]
+        start_aria2_poller()
+
+    async def __remove(self, gid, files):
+        if (download := await sync_to_async(get_download, gid)) is None:
+            return None
+        with contextlib.suppress(Exception):
+            await sync_to_async(aria2.remove, [download], force=True, files=files)
+        return download
+
+    async def __settle(self, gid, failed):
+        direct_gids.pop(gid, None)
+        self.__finished.pop(gid, None)
+        if (filename := self.__gids.pop(gid, None)) is None:
+            return
+        download = await self.__remove(gid, failed)
+        if failed:
+            self.failed += 1
+            error = download.error_message if download else "None"
+            LOGGER.error(f"Unable to download {filename} due to: {error}")
+        elif download is not None:
+            self.proc_bytes += download.total_length
+
+    async def __wait(self):
+        with contextlib.suppress(Exception):
+            await wait_for(self.__wakeup.wait(), DIRECT_RECHECK)
+        self.__wakeup.clear()
+        for gid in list(self.__gids):
+            if gid in self.__finished:
+                await self.__settle(gid, self.__finished[gid])
+            elif (download := aria2_downloads.get(gid)) and (
+                download.is_complete or download.has_failed
+            ):
+                await self.__settle(gid, download.has_failed)
+
+    async def __remove_all(self):
+        for gid in list(self.__gids):
+            direct_gids.pop(gid, None)
+            if self.__gids.pop(gid, None) is not None:
+                await self.__remove(gid, True)
+
+    async def download(self, contents, source=None):
+        # source is the resolver's live details when contents is a stream
+        workers = config_dict["DIRECT_DOWNLOAD_WORKERS"] or DIRECT_WORKERS
+        window = []
+        try:
+            async for content in self.__entries(contents, source):
                 if self.__is_cancelled:
-                    if self.task:
-                        self.task.remove(True, True)
                     break
-                self.task = self.task.live
-                if error_message := self.task.error_message:
-                    self.failed += 1
-                    LOGGER.error(
-                        f"Unable to download {self.task.name} due to: {error_message}"
+                window.append(content)
+                # fill every free slot at once, a stream is not waited on
+                if len(self.__gids) + len(window) < workers and (
+                    source is None or not contents.empty()
+                ):
+                    continue
+                await self.__add_window(window)
+                window = []
+                while len(self.__gids) >= workers and not self.__is_cancelled:
+                    await self.__wait()
+            if window and not self.__is_cancelled:
+                await self.__add_window(window)
+            # the full size is only known once the crawl is over
+            if (
+                source is not None
+                and not self.__is_cancelled
+                and (
+                    limit_exceeded := await limit_checker(
+                        self.total_size, self.__listener
                     )
-                    self.task.remove(True, True)
-                    break
-                if self.task.is_complete:
-                    self.proc_bytes += self.task.total_length
-                    self.task.remove(True)
-                    break
-                sleep(1)
-            self.task = None
+                )
+            ):
+                await self.__remove_all()
+                await self.__listener.onDownloadError(limit_exceeded)
+                return
+            while self.__gids and not self.__is_cancelled:
+                await self.__wait()
+        except Exception as e:
+            await self.__remove_all()
+            if not self.__is_cancelled:
+                await self.__listener.onDownloadError(str(e).replace("ERROR: ", ""))
+            return
         if self.__is_cancelled:
+            await self.__remove_all()
             return
-        if self.failed == len(contents):
-            async_to_sync(
-                self.__listener.onDownloadError, "All files are failed to download!"
+        if self.failed == self.added:
+            await self.__listener.onDownloadError(
+                "All files are failed to download!"
             )
             return
-        async_to_sync(self.__listener.on_download_complete)
+        await self.__listener.on_download_complete()
 
     async def cancel_download(self):
         self.__is_cancelled = True
         LOGGER.info(f"Cancelling Download: {self.name}")
         await self.__listener.onDownloadError("Download Cancelled by User!")
-        if self.task:
-            await sync_to_async(self.task.remove, force=True, files=True)
+        await self.__remove_all()
+        self.__wakeup.set()
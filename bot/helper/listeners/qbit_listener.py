@@ -21,7 +21,11 @@ from bot.helper.ext_utils.bot_utils import (
 from bot.helper.ext_utils.files_utils import clean_unwanted
 from bot.helper.ext_utils.task_manager import limit_checker, stop_duplicate_check
 from bot.helper.telegram_helper.message_utils import update_all_messages
-from bot.helper.mirror_leech_utils.status_utils.qbit_status import QbittorrentStatus
+from bot.helper.mirror_leech_utils.status_utils.qbit_status import (
+    QbittorrentStatus,
+    qb_sync,
+    sync_qb_torrents,
+)
 
 
 async def __remove_torrent(hash_, tag):
@@ -114,94 +118,102 @@ async def __on_download_complete(tor):
         await __remove_torrent(ext_hash, tag)
 
 
+async def __check_torrents():
+    for tor_info in list(qb_sync["torrents"].values()):
+        tag = tor_info.tags
+        if tag not in QbTorrents:
+            continue
+        state = tor_info.state
+        if state == "metaDL":
+            TORRENT_TIMEOUT = config_dict["TORRENT_TIMEOUT"]
+            QbTorrents[tag]["stalled_time"] = time()
+            if (
+                TORRENT_TIMEOUT
+                and time() - tor_info.added_on >= TORRENT_TIMEOUT
+            ):
+                __on_download_error("Dead Torrent!", tor_info)
+            else:
+                await sync_to_async(
+                    xnox_client.torrents_reannounce,
+                    torrent_hashes=tor_info.hash,
+                )
+        elif state == "downloading":
+            QbTorrents[tag]["stalled_time"] = time()
+            if (
+                config_dict["STOP_DUPLICATE"]
+                and not QbTorrents[tag]["stop_dup_check"]
+            ):
+                QbTorrents[tag]["stop_dup_check"] = True
+                __stop_duplicate(tor_info)
+            if not QbTorrents[tag]["size_checked"]:
+                QbTorrents[tag]["size_checked"] = True
+                __size_checked(tor_info)
+        elif state == "stalledDL":
+            TORRENT_TIMEOUT = config_dict["TORRENT_TIMEOUT"]
+            if (
+                not QbTorrents[tag]["rechecked"]
+                and 0.99989999999999999 < tor_info.progress < 1
+            ):
+                msg = f"Force recheck - Name: {tor_info.name} Hash: "
+                msg += f"{tor_info.hash} Downloaded Bytes: {tor_info.downloaded} "
+                msg += f"Size: {tor_info.size} Total Size: {tor_info.total_size}"
+                LOGGER.warning(msg)
+                await sync_to_async(
+                    xnox_client.torrents_recheck,
+                    torrent_hashes=tor_info.hash,
+                )
+                QbTorrents[tag]["rechecked"] = True
+            elif (
+                TORRENT_TIMEOUT
+                and time() - QbTorrents[tag]["stalled_time"]
+                >= TORRENT_TIMEOUT
+            ):
+                __on_download_error("Dead Torrent!", tor_info)
+            else:
+                await sync_to_async(
+                    xnox_client.torrents_reannounce,
+                    torrent_hashes=tor_info.hash,
+                )
+        elif state == "missingFiles":
+            await sync_to_async(
+                xnox_client.torrents_recheck,
+                torrent_hashes=tor_info.hash,
+            )
+        elif state == "error":
+            __on_download_error(
+                "No enough space for this torrent on device", tor_info
+            )
+        elif (
+            tor_info.completion_on != 0
+            and not QbTorrents[tag]["uploaded"]
+            and state
+            not in ["checkingUP", "checkingDL", "checkingResumeData"]
+        ):
+            QbTorrents[tag]["uploaded"] = True
+            __on_download_complete(tor_info)
+        elif (
+            state in ["pausedUP", "pausedDL"]
+            and QbTorrents[tag]["seeding"]
+        ):
+            QbTorrents[tag]["seeding"] = False
+            __on_seed_finish(tor_info)
+
+
 async def __qb_listener():
+    last_check = 0
     while True:
         async with qb_listener_lock:
             try:
-                if len(await sync_to_async(xnox_client.torrents_info)) == 0:
+                await sync_qb_torrents()
+                if len(qb_sync["torrents"]) == 0:
                     QbInterval.clear()
                     break
-                for tor_info in await sync_to_async(xnox_client.torrents_info):
-                    tag = tor_info.tags
-                    if tag not in QbTorrents:
-                        continue
-                    state = tor_info.state
-                    if state == "metaDL":
-                        TORRENT_TIMEOUT = config_dict["TORRENT_TIMEOUT"]
-                        QbTorrents[tag]["stalled_time"] = time()
-                        if (
-                            TORRENT_TIMEOUT
-                            and time() - tor_info.added_on >= TORRENT_TIMEOUT
-                        ):
-                            __on_download_error("Dead Torrent!", tor_info)
-                        else:
-                            await sync_to_async(
-                                xnox_client.torrents_reannounce,
-                                torrent_hashes=tor_info.hash,
-                            )
-                    elif state == "downloading":
-                        QbTorrents[tag]["stalled_time"] = time()
-                        if (
-                            config_dict["STOP_DUPLICATE"]
-                            and not QbTorrents[tag]["stop_dup_check"]
-                        ):
-                            QbTorrents[tag]["stop_dup_check"] = True
-                            __stop_duplicate(tor_info)
-                        if not QbTorrents[tag]["size_checked"]:
-                            QbTorrents[tag]["size_checked"] = True
-                            __size_checked(tor_info)
-                    elif state == "stalledDL":
-                        TORRENT_TIMEOUT = config_dict["TORRENT_TIMEOUT"]
-                        if (
-                            not QbTorrents[tag]["rechecked"]
-                            and 0.99989999999999999 < tor_info.progress < 1
-                        ):
-                            msg = f"Force recheck - Name: {tor_info.name} Hash: "
-                            msg += f"{tor_info.hash} Downloaded Bytes: {tor_info.downloaded} "
-                            msg += f"Size: {tor_info.size} Total Size: {tor_info.total_size}"
-                            LOGGER.warning(msg)
-                            await sync_to_async(
-                                xnox_client.torrents_recheck,
-                                torrent_hashes=tor_info.hash,
-                            )
-                            QbTorrents[tag]["rechecked"] = True
-                        elif (
-                            TORRENT_TIMEOUT
-                            and time() - QbTorrents[tag]["stalled_time"]
-                            >= TORRENT_TIMEOUT
-                        ):
-                            __on_download_error("Dead Torrent!", tor_info)
-                        else:
-                            await sync_to_async(
-                                xnox_client.torrents_reannounce,
-                                torrent_hashes=tor_info.hash,
-                            )
-                    elif state == "missingFiles":
-                        await sync_to_async(
-                            xnox_client.torrents_recheck,
-                            torrent_hashes=tor_info.hash,
-                        )
-                    elif state == "error":
-                        __on_download_error(
-                            "No enough space for this torrent on device", tor_info
-                        )
-                    elif (
-                        tor_info.completion_on != 0
-                        and not QbTorrents[tag]["uploaded"]
-                        and state
-                        not in ["checkingUP", "checkingDL", "checkingResumeData"]
-                    ):
-                        QbTorrents[tag]["uploaded"] = True
-                        __on_download_complete(tor_info)
-                    elif (
-                        state in ["pausedUP", "pausedDL"]
-                        and QbTorrents[tag]["seeding"]
-                    ):
-                        QbTorrents[tag]["seeding"] = False
-                        __on_seed_finish(tor_info)
+                if time() - last_check >= 3:
+                    last_check = time()
+                    await __check_torrents()
             except Exception as e:
                 LOGGER.error(str(e))
-        await sleep(3)
+        await sleep(1)
 
 
 async def on_download_start(tag):
@@ -0,0 +1,232 @@
+from json import loads
+from secrets import token_hex
+
+from aiofiles.os import path as aiopath
+from aiofiles.os import listdir
+
+from bot import (
+    LOGGER,
+    bot,
+    user,
+    aria2,
+    bot_loop,
+    xnox_client,
+    download_dict,
+    non_queued_dl,
+    queue_dict_lock,
+    download_dict_lock,
+)
+from bot.helper.ext_utils.bot_utils import sync_to_async
+from bot.helper.ext_utils.files_utils import clean_target, get_path_size
+from bot.helper.ext_utils.task_journal import journal_remove, journal_entries
+from bot.helper.listeners.qbit_listener import on_download_start
+from bot.helper.listeners.tasks_listener import MirrorLeechListener
+from bot.helper.telegram_helper.message_utils import send_message, sendStatusMessage
+from bot.helper.mirror_leech_utils.status_utils.qbit_status import QbittorrentStatus
+from bot.helper.mirror_leech_utils.status_utils.aria2_status import Aria2Status
+from bot.helper.mirror_leech_utils.status_utils.queue_status import QueueStatus
+from bot.helper.mirror_leech_utils.download_utils.telegram_download import (
+    TG_PARTIAL_DIR,
+    TelegramDownloadHelper,
+)
+
+
+async def __get_listener(entry):
+    try:
+        message = await bot.get_messages(entry["chat_id"], entry["uid"])
+    except Exception as e:
+        LOGGER.error(f"Task Resume: {e}")
+        return None
+    if message is None or message.empty or message.from_user is None:
+        return None
+    return MirrorLeechListener(message, **entry["options"])
+
+
+async def __resume_qbit(listener, ext_hash):
+    tor_info = await sync_to_async(
+        xnox_client.torrents_info, torrent_hashes=ext_hash
+    )
+    if not tor_info:
+        return False
+    async with download_dict_lock:
+        download_dict[listener.uid] = QbittorrentStatus(listener)
+    async with queue_dict_lock:
+        non_queued_dl.add(listener.uid)
+    await on_download_start(f"{listener.uid}")
+    return True
+
+
+async def __resume_aria2(listener, gid):
+    try:
+        download = await sync_to_async(aria2.get_download, gid)
+    except Exception:
+        return False
+    if download.is_removed or download.has_failed:
+        return False
+    async with download_dict_lock:
+        download_dict[listener.uid] = Aria2Status(gid, listener)
+    async with queue_dict_lock:
+        non_queued_dl.add(listener.uid)
+    if download.is_complete:
+        # finished while the bot was down, the listener missed the event
+        bot_loop.create_task(listener.on_download_complete())
+    return True
+
+
+async def __resume_telegram(listener, ref):
+    ref = loads(ref)
+    client = user if ref["session"] == "user" else bot
+    try:
+        message = await client.get_messages(ref["chat_id"], ref["msg_id"])
+    except Exception as e:
+        LOGGER.error(f"Task Resume: {e}")
+        return False
+    if message is None or message.empty:
+        return False
+    # finished segments are picked up again from the partial file checkpoint
+    bot_loop.create_task(
+        TelegramDownloadHelper(listener).add_download(
+            message, ref["path"], ref["name"], ref["session"]
+        )
+    )
+    return True
+
+
+async def __resume_upload(listener, entry):
+    if not await aiopath.isdir(listener.dir) or not await listdir(listener.dir):
+        return False
+    name = entry["name"]
+    if not name or not await aiopath.exists(f"{listener.dir}/{name}"):
+        name = "None"
+        size = 0
+    else:
+        size = await get_path_size(f"{listener.dir}/{name}")
+    if entry["stage"] == "upload":
+        # processing already finished, the directory holds the upload input
+        listener.extract = False
+        listener.compress = False
+        listener.join = False
+    async with download_dict_lock:
+        download_dict[listener.uid] = QueueStatus(
+            name, size, token_hex(4), listener, "dl"
+        )
+    bot_loop.create_task(listener.on_download_complete())
+    return True
+
+
+async def __drop_engine_task(entry):
+    try:
+        if entry["engine"] == "qbit":
+            await sync_to_async(
+                xnox_client.torrents_delete,
+                torrent_hashes=entry["ref"],
+                delete_files=True,
+            )
+        elif entry["engine"] == "aria2":
+            download = await sync_to_async(aria2.get_download, entry["ref"])
+            await sync_to_async(aria2.remove, [download], force=True, files=True)
+        elif entry["engine"] == "telegram":
+            partial = f"{TG_PARTIAL_DIR}/{loads(entry['ref'])['file']}"
+            await clean_target(partial)
+            await clean_target(f"{partial}.json")
+        # direct folders add one aria2 download per file without journaling gids
+        uid = str(entry["uid"])
+        if downloads := [
+            download
+            for download in await sync_to_async(aria2.get_downloads)
+            if download.dir.replace("/usr/src/app/downloads/", "").split("/")[0]
+            == uid
+        ]:
+            await sync_to_async(aria2.remove, downloads, force=True, files=True)
+    except Exception as e:
+        LOGGER.error(f"Task Resume: {e}")
+
+
+async def __resume_task(entry):
+    if (listener := await __get_listener(entry)) is None:
+        LOGGER.info(f"Task Resume: source message of {entry['uid']} is gone")
+        same_dir = entry["options"].get("same_dir")
+        if same_dir and entry["uid"] in same_dir["tasks"]:
+            same_dir["tasks"].remove(entry["uid"])
+            same_dir["total"] -= 1
+        await journal_remove(entry["uid"])
+        await __drop_engine_task(entry)
+        await clean_target(f"/usr/src/app/downloads/{entry['uid']}")
+        return
+    stage = entry["stage"]
+    if stage == "download":
+        if entry["engine"] == "qbit":
+            resumed = await __resume_qbit(listener, entry["ref"])
+        elif entry["engine"] == "aria2":
+            resumed = await __resume_aria2(listener, entry["ref"])
+        elif entry["engine"] == "telegram":
+            resumed = await __resume_telegram(listener, entry["ref"])
+        else:
+            resumed = False
+        if not resumed:
+            await __drop_engine_task(entry)
+            await listener.onDownloadError(
+                "Task was interrupted by a restart and can't be resumed, "
+                "please add it again."
+            )
+            return
+    elif stage in ["process", "upload"]:
+        if not await __resume_upload(listener, entry):
+            await listener.onUploadError(
+                "Task was interrupted by a restart and its files are gone."
+            )
+            return
+    else:
+        # queued before the download started, nothing to re-attach to
+        await journal_remove(entry["uid"])
+        await __drop_engine_task(entry)
+        await clean_target(listener.dir)
+        await send_message(
+            listener.message,
+            f"{listener.tag} Task was dropped by a restart while queued, "
+            "please add it again.",
+        )
+        return
+    LOGGER.info(f"Task Resume: {entry['uid']} resumed at {stage} stage")
+    await send_message(
+        listener.message, f"{listener.tag} Task resumed after restart."
+    )
+    await sendStatusMessage(listener.message)
+
+
+def __share_same_dirs(entries):
+    # tasks of one multi-link folder must wait on a single shared dict again
+    groups = []
+    for entry in entries:
+        options = entry["options"]
+        if not (same_dir := options.get("same_dir")):
+            continue
+        if entry["stage"] != "download":
+            # already moved its files into the folder task
+            options["same_dir"] = None
+            continue
+        tasks = set(same_dir["tasks"]) | {entry["uid"]}
+        for group in groups:
+            if group["name"] == same_dir["name"] and group["known"] & tasks:
+                group["known"] |= tasks
+                break
+        else:
+            group = {"name": same_dir["name"], "known": tasks, "tasks": set()}
+            groups.append(group)
+        group["tasks"].add(entry["uid"])
+        options["same_dir"] = group
+    for group in groups:
+        group["total"] = len(group["tasks"])
+        del group["known"]
+
+
+async def resume_tasks():
+    entries = await sync_to_async(journal_entries)
+    __share_same_dirs(entries)
+    for entry in entries:
+        try:
+            await __resume_task(entry)
+        except Exception as e:
+            LOGGER.error(f"Task Resume: {entry['uid']} {e}")
+            await journal_remove(entry["uid"])
+            await __drop_engine_task(entry)
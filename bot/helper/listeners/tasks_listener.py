@@ -2,7 +2,9 @@ from os import path as ospath
 from os import walk
 from html import escape
 from time import time
-from asyncio import Event, sleep, create_subprocess_exec
+from signal import SIGCONT, SIGSTOP
+from asyncio import Queue, sleep, create_task, create_subprocess_exec
+from asyncio.subprocess import PIPE
 
 from requests import utils as rutils
 from aioshutil import move
@@ -27,6 +29,12 @@ from bot import (
     download_dict_lock,
     status_reply_dict_lock,
 )
+from bot.helper.ext_utils.metrics import (
+    measure_stage,
+    stage_started,
+    stage_finished,
+    subprocess_started,
+)
 from bot.helper.ext_utils.bot_utils import (
     extra_btns,
     sync_to_async,
@@ -46,7 +54,14 @@ from bot.helper.ext_utils.files_utils import (
     is_archive_split,
     is_first_archive_split,
 )
-from bot.helper.ext_utils.task_manager import start_from_queued
+from bot.helper.ext_utils.task_journal import journal_task, journal_remove
+from bot.helper.ext_utils.task_manager import (
+    queue_meta,
+    add_to_queue,
+    start_disk_stage,
+    finish_disk_stage,
+    start_from_queued,
+)
 from bot.helper.telegram_helper.button_build import ButtonMaker
 from bot.helper.telegram_helper.message_utils import (
     delete_links,
@@ -114,6 +129,7 @@ class MirrorLeechListener:
         ]
         self.isPrivate = message.chat.type == ChatType.BOT
         self.suproc = None
+        self.virtual_parts = {}
         self.same_dir = same_dir
         self.rc_flags = rc_flags
         self.upPath = upPath
@@ -137,6 +153,8 @@ class MirrorLeechListener:
             pass
 
     async def on_download_start(self):
+        stage_started(self.uid, "download")
+        await journal_task(self, stage="download")
         if config_dict["LEECH_LOG_ID"]:
             msg = "<b>Task Started</b>\n\n"
             msg += f"<b>• Task by:</b> {self.tag}\n"
@@ -200,164 +218,194 @@ class MirrorLeechListener:
         dl_path = f"{self.dir}/{name}"
         up_path = ""
         size = await get_path_size(dl_path)
+        await journal_task(self, stage="process", name=name)
+        stage_finished(self.uid, "download", size)
         async with queue_dict_lock:
             if self.uid in non_queued_dl:
                 non_queued_dl.remove(self.uid)
         await start_from_queued()
 
-        if self.join and await aiopath.isdir(dl_path):
-            await join_files(dl_path)
+        if pipeline := await self.__pipeline_path(dl_path):
+            up_path = pipeline
 
-        if self.extract:
-            pswd = self.extract if isinstance(self.extract, str) else ""
-            try:
-                if await aiopath.isfile(dl_path):
-                    up_path = get_base_name(dl_path)
-                LOGGER.info(f"Extracting: {name}")
+        try:
+            if (self.join or self.extract or self.compress) and not pipeline:
+                await start_disk_stage(self.uid)
                 async with download_dict_lock:
-                    download_dict[self.uid] = ExtractStatus(name, size, gid, self)
-                if await aiopath.isdir(dl_path):
-                    if self.seed:
-                        self.newDir = f"{self.dir}10000"
-                        up_path = f"{self.newDir}/{name}"
-                    else:
-                        up_path = dl_path
-                    for dirpath, _, files in await sync_to_async(
-                        walk, dl_path, topdown=False
-                    ):
-                        for file_ in files:
-                            if is_first_archive_split(file_) or (
-                                is_archive(file_) and not file_.endswith(".rar")
-                            ):
-                                f_path = ospath.join(dirpath, file_)
-                                t_path = (
-                                    dirpath.replace(self.dir, self.newDir)
-                                    if self.seed
-                                    else dirpath
-                                )
-                                cmd = [
-                                    "7z",
-                                    "x",
-                                    f"-p{pswd}",
-                                    f_path,
-                                    f"-o{t_path}",
-                                    "-aot",
-                                    "-xr!@PaxHeader",
-                                ]
-                                if not pswd:
-                                    del cmd[2]
-                                if self.suproc == "cancelled" or (
-                                    self.suproc is not None
-                                    and self.suproc.returncode == -9
-                                ):
-                                    return
-                                self.suproc = await create_subprocess_exec(*cmd)
-                                code = await self.suproc.wait()
-                                if code == -9:
-                                    return
-                                if code != 0:
-                                    LOGGER.error("Unable to extract archive splits!")
-                        if (
-                            not self.seed
-                            and self.suproc is not None
-                            and self.suproc.returncode == 0
+                    if self.uid not in download_dict:
+                        return
+
+            if self.join and await aiopath.isdir(dl_path):
+                with measure_stage(self.uid, "join", size):
+                    await join_files(dl_path)
+
+            if self.extract and not pipeline:
+                stage_started(self.uid, "extract")
+                pswd = self.extract if isinstance(self.extract, str) else ""
+                try:
+                    if await aiopath.isfile(dl_path):
+                        up_path = get_base_name(dl_path)
+                    LOGGER.info(f"Extracting: {name}")
+                    async with download_dict_lock:
+                        download_dict[self.uid] = ExtractStatus(
+                            name, size, gid, self
+                        )
+                    if await aiopath.isdir(dl_path):
+                        if self.seed:
+                            self.newDir = f"{self.dir}10000"
+                            up_path = f"{self.newDir}/{name}"
+                        else:
+                            up_path = dl_path
+                        for dirpath, _, files in await sync_to_async(
+                            walk, dl_path, topdown=False
                         ):
                             for file_ in files:
-                                if is_archive_split(file_) or is_archive(file_):
-                                    del_path = ospath.join(dirpath, file_)
-                                    try:
-                                        await aioremove(del_path)
-                                    except Exception:
+                                if is_first_archive_split(file_) or (
+                                    is_archive(file_) and not file_.endswith(".rar")
+                                ):
+                                    f_path = ospath.join(dirpath, file_)
+                                    t_path = (
+                                        dirpath.replace(self.dir, self.newDir)
+                                        if self.seed
+                                        else dirpath
+                                    )
+                                    cmd = [
+                                        "7z",
+                                        "x",
+                                        f"-p{pswd}",
+                                        f_path,
+                                        f"-o{t_path}",
+                                        "-aot",
+                                        "-xr!@PaxHeader",
+                                    ]
+                                    if not pswd:
+                                        del cmd[2]
+                                    if self.suproc == "cancelled" or (
+                                        self.suproc is not None
+                                        and self.suproc.returncode == -9
+                                    ):
                                         return
-                else:
-                    if self.seed:
-                        self.newDir = f"{self.dir}10000"
-                        up_path = up_path.replace(self.dir, self.newDir)
-                    cmd = [
-                        "7z",
-                        "x",
-                        f"-p{pswd}",
-                        dl_path,
-                        f"-o{up_path}",
-                        "-aot",
-                        "-xr!@PaxHeader",
-                    ]
-                    if not pswd:
-                        del cmd[2]
-                    if self.suproc == "cancelled":
-                        return
-                    self.suproc = await create_subprocess_exec(*cmd)
-                    code = await self.suproc.wait()
-                    if code == -9:
-                        return
-                    if code == 0:
-                        LOGGER.info(f"Extracted Path: {up_path}")
-                        if not self.seed:
-                            try:
-                                await aioremove(dl_path)
-                            except Exception:
-                                return
+                                    subprocess_started()
+                                    self.suproc = await create_subprocess_exec(*cmd)
+                                    code = await self.suproc.wait()
+                                    if code == -9:
+                                        return
+                                    if code != 0:
+                                        LOGGER.error(
+                                            "Unable to extract archive splits!"
+                                        )
+                            if (
+                                not self.seed
+                                and self.suproc is not None
+                                and self.suproc.returncode == 0
+                            ):
+                                for file_ in files:
+                                    if is_archive_split(file_) or is_archive(file_):
+                                        del_path = ospath.join(dirpath, file_)
+                                        try:
+                                            await aioremove(del_path)
+                                        except Exception:
+                                            return
                     else:
-                        LOGGER.error("Unable to extract archive! Uploading anyway")
-                        self.newDir = ""
-                        up_path = dl_path
-            except ExtractionArchiveError:
-                LOGGER.info("Not any valid archive, uploading file as it is.")
-                self.newDir = ""
-                up_path = dl_path
+                        if self.seed:
+                            self.newDir = f"{self.dir}10000"
+                            up_path = up_path.replace(self.dir, self.newDir)
+                        cmd = [
+                            "7z",
+                            "x",
+                            f"-p{pswd}",
+                            dl_path,
+                            f"-o{up_path}",
+                            "-aot",
+                            "-xr!@PaxHeader",
+                        ]
+                        if not pswd:
+                            del cmd[2]
+                        if self.suproc == "cancelled":
+                            return
+                        subprocess_started()
+                        self.suproc = await create_subprocess_exec(*cmd)
+                        code = await self.suproc.wait()
+                        if code == -9:
+                            return
+                        if code == 0:
+                            LOGGER.info(f"Extracted Path: {up_path}")
+                            if not self.seed:
+                                try:
+                                    await aioremove(dl_path)
+                                except Exception:
+                                    return
+                        else:
+                            LOGGER.error(
+                                "Unable to extract archive! Uploading anyway"
+                            )
+                            self.newDir = ""
+                            up_path = dl_path
+                except ExtractionArchiveError:
+                    LOGGER.info("Not any valid archive, uploading file as it is.")
+                    self.newDir = ""
+                    up_path = dl_path
+                stage_finished(self.uid, "extract", size)
 
-        if self.compress:
-            pswd = self.compress if isinstance(self.compress, str) else ""
-            if up_path:
-                dl_path = up_path
-                up_path = f"{up_path}.zip"
-            elif self.seed and self.is_leech:
-                self.newDir = f"{self.dir}10000"
-                up_path = f"{self.newDir}/{name}.zip"
-            else:
-                up_path = f"{dl_path}.zip"
-            async with download_dict_lock:
-                download_dict[self.uid] = ZipStatus(name, size, gid, self)
-            LEECH_SPLIT_SIZE = MAX_SPLIT_SIZE
-            cmd = [
-                "7z",
-                f"-v{LEECH_SPLIT_SIZE}b",
-                "a",
-                "-mx=0",
-                f"-p{pswd}",
-                up_path,
-                dl_path,
-            ]
-            for ext in GLOBAL_EXTENSION_FILTER:
-                ex_ext = f"-xr!*.{ext}"
-                cmd.append(ex_ext)
-            if self.is_leech and int(size) > LEECH_SPLIT_SIZE:
-                if not pswd:
-                    del cmd[4]
-                LOGGER.info(f"Zip: orig_path: {dl_path}, zip_path: {up_path}.0*")
-            else:
-                del cmd[1]
-                if not pswd:
-                    del cmd[3]
-                LOGGER.info(f"Zip: orig_path: {dl_path}, zip_path: {up_path}")
-            if self.suproc == "cancelled":
-                return
-            self.suproc = await create_subprocess_exec(*cmd)
-            code = await self.suproc.wait()
-            if code == -9:
-                return
-            if not self.seed:
-                await clean_target(dl_path)
+            if self.compress:
+                stage_started(self.uid, "zip")
+                pswd = self.compress if isinstance(self.compress, str) else ""
+                if up_path:
+                    dl_path = up_path
+                    up_path = f"{up_path}.zip"
+                elif self.seed and self.is_leech:
+                    self.newDir = f"{self.dir}10000"
+                    up_path = f"{self.newDir}/{name}.zip"
+                else:
+                    up_path = f"{dl_path}.zip"
+                async with download_dict_lock:
+                    download_dict[self.uid] = ZipStatus(name, size, gid, self)
+                LEECH_SPLIT_SIZE = MAX_SPLIT_SIZE
+                cmd = [
+                    "7z",
+                    f"-v{LEECH_SPLIT_SIZE}b",
+                    "a",
+                    "-mx=0",
+                    f"-p{pswd}",
+                    up_path,
+                    dl_path,
+                ]
+                for ext in GLOBAL_EXTENSION_FILTER:
+                    ex_ext = f"-xr!*.{ext}"
+                    cmd.append(ex_ext)
+                if self.is_leech and int(size) > LEECH_SPLIT_SIZE:
+                    if not pswd:
+                        del cmd[4]
+                    LOGGER.info(f"Zip: orig_path: {dl_path}, zip_path: {up_path}.0*")
+                else:
+                    del cmd[1]
+                    if not pswd:
+                        del cmd[3]
+                    LOGGER.info(f"Zip: orig_path: {dl_path}, zip_path: {up_path}")
+                if self.suproc == "cancelled":
+                    return
+                subprocess_started()
+                self.suproc = await create_subprocess_exec(*cmd)
+                code = await self.suproc.wait()
+                if code == -9:
+                    return
+                if not self.seed:
+                    await clean_target(dl_path)
+                stage_finished(self.uid, "zip", size)
 
-        if not self.compress and not self.extract:
-            up_path = dl_path
+            if not self.compress and not self.extract:
+                up_path = dl_path
+        finally:
+            # early returns above must not keep the QUEUE_DISK slot
+            await finish_disk_stage(self.uid)
 
         up_dir, up_name = up_path.rsplit("/", 1)
         size = await get_path_size(up_dir)
         if self.is_leech:
             m_size = []
             o_files = []
-            if not self.compress:
+            if not self.compress and not pipeline:
+                stage_started(self.uid, "split")
                 checked = False
                 LEECH_SPLIT_SIZE = MAX_SPLIT_SIZE
                 for dirpath, _, files in await sync_to_async(
@@ -381,9 +429,12 @@ class MirrorLeechListener:
                                 dirpath,
                                 LEECH_SPLIT_SIZE,
                                 self,
+                                virtual=config_dict["LEECH_VIRTUAL_SPLIT"],
                             )
-                            if not res:
+                            if res is False:
                                 return
+                            if res == "virtual":
+                                continue
                             if res == "errored":
                                 if f_size <= MAX_SPLIT_SIZE:
                                     continue
@@ -399,7 +450,9 @@ class MirrorLeechListener:
                             else:
                                 m_size.append(f_size)
                                 o_files.append(file_)
+                stage_finished(self.uid, "split", size)
 
+        await journal_task(self, stage="upload", name=up_name)
         up_limit = config_dict["QUEUE_UPLOAD"]
         all_limit = config_dict["QUEUE_ALL"]
         added_to_queue = False
@@ -413,8 +466,7 @@ class MirrorLeechListener:
             ) or (up_limit and up >= up_limit):
                 added_to_queue = True
                 LOGGER.info(f"Added to Queue/Upload: {name}")
-                event = Event()
-                queued_up[self.uid] = event
+                event = add_to_queue(queued_up, self, size)
         if added_to_queue:
             async with download_dict_lock:
                 download_dict[self.uid] = QueueStatus(name, size, gid, self, "Up")
@@ -425,7 +477,9 @@ class MirrorLeechListener:
             LOGGER.info(f"Start from Queued/Upload: {name}")
         async with queue_dict_lock:
             non_queued_up.add(self.uid)
-        if self.is_leech:
+        if pipeline:
+            await self.__pipelined_leech(dl_path, up_path, size, gid)
+        elif self.is_leech:
             size = await get_path_size(up_dir)
             for s in m_size:
                 size = size - s
@@ -435,7 +489,8 @@ class MirrorLeechListener:
             async with download_dict_lock:
                 download_dict[self.uid] = tg_upload_status
             await update_all_messages()
-            await tg.upload(o_files, m_size, size)
+            with measure_stage(self.uid, "upload", size):
+                await tg.upload(o_files, m_size, size)
         elif self.upPath == "gd":
             size = await get_path_size(up_path)
             LOGGER.info(f"Upload Name: {up_name}")
@@ -444,7 +499,10 @@ class MirrorLeechListener:
             async with download_dict_lock:
                 download_dict[self.uid] = upload_status
             await update_all_messages()
-            await sync_to_async(drive.upload, up_name, size, self.drive_id)
+            with measure_stage(self.uid, "upload", size):
+                await sync_to_async(
+                    drive.upload, up_name, size, self.drive_id, purpose="transfer"
+                )
         else:
             size = await get_path_size(up_path)
             LOGGER.info(f"Upload Name: {up_name} via RClone")
@@ -454,11 +512,154 @@ class MirrorLeechListener:
                     RCTransfer, self.message, gid, "up"
                 )
             await update_all_messages()
-            await RCTransfer.upload(up_path, size)
+            with measure_stage(self.uid, "upload", size):
+                await RCTransfer.upload(up_path, size)
+
+    async def __pipeline_path(self, dl_path):
+        if not (
+            self.extract
+            and self.is_leech
+            and not self.compress
+            and not self.seed
+            and config_dict["LEECH_PIPELINE_BUFFER"]
+            and await aiopath.isfile(dl_path)
+        ):
+            return ""
+        try:
+            return get_base_name(dl_path)
+        except ExtractionArchiveError:
+            return ""
+
+    async def __pipelined_leech(self, dl_path, up_path, size, gid):
+        # extraction still counts against QUEUE_DISK, the upload does not
+        await start_disk_stage(self.uid)
+        try:
+            async with download_dict_lock:
+                if self.uid not in download_dict:
+                    return
+            with measure_stage(self.uid, "extract_upload", size):
+                await self.__extract_and_leech(dl_path, up_path, size, gid)
+        finally:
+            await finish_disk_stage(self.uid)
+
+    async def __extract_and_leech(self, dl_path, up_path, size, gid):
+        up_dir, up_name = up_path.rsplit("/", 1)
+        pswd = self.extract if isinstance(self.extract, str) else ""
+        await makedirs(up_path, exist_ok=True)
+        LOGGER.info(f"Extracting and leeching: {up_name}")
+        files = Queue()
+        tg = TgUploader(up_name, up_dir, self)
+        tg_upload_status = TelegramStatus(tg, size, self.message, gid, "up")
+        async with download_dict_lock:
+            download_dict[self.uid] = tg_upload_status
+        await update_all_messages()
+        uploader = create_task(tg.upload([], [], size, files))
+        cmd = [
+            "7z",
+            "x",
+            f"-p{pswd}",
+            dl_path,
+            f"-o{up_path}",
+            "-aot",
+            "-xr!@PaxHeader",
+            "-bb1",
+            "-bso1",
+            "-bsp0",
+        ]
+        if not pswd:
+            del cmd[2]
+        ready = []
+        oversized = []
+        released = 0
+
+        async def release(f_path):
+            nonlocal released
+            if not await aiopath.isfile(f_path):
+                return
+            released += 1
+            if await aiopath.getsize(f_path) > MAX_SPLIT_SIZE:
+                oversized.append(f_path)
+                return
+            ready.append(f_path)
+            await files.put(f_path.rsplit("/", 1))
+
+        try:
+            subprocess_started()
+            self.suproc = await create_subprocess_exec(*cmd, stdout=PIPE)
+            guard = create_task(self.__pipeline_guard(up_path, ready))
+            current = None
+            async for output in self.suproc.stdout:
+                line = output.decode().rstrip("\r\n")
+                if not line.startswith("- "):
+                    continue
+                if current is not None:
+                    await release(ospath.join(up_path, current))
+                current = line[2:]
+            code = await self.suproc.wait()
+            await guard
+            if code == -9:
+                return
+            if code == 0:
+                if current is not None:
+                    await release(ospath.join(up_path, current))
+                await aioremove(dl_path)
+            elif released == 0:
+                LOGGER.error("Unable to extract archive! Uploading anyway")
+                await release(dl_path)
+            else:
+                LOGGER.error(f"Archive partially extracted! Path: {dl_path}")
+            for f_path in oversized:
+                async with download_dict_lock:
+                    if self.uid not in download_dict:
+                        return
+                dirpath, file_ = f_path.rsplit("/", 1)
+                res = await split_file(
+                    f_path,
+                    await aiopath.getsize(f_path),
+                    file_,
+                    dirpath,
+                    MAX_SPLIT_SIZE,
+                    self,
+                )
+                if res is False:
+                    return
+                await aioremove(f_path)
+                if res == "errored":
+                    continue
+                # only the parts split_file wrote, the uploader renames others
+                for part in res:
+                    await files.put(part.rsplit("/", 1))
+        finally:
+            # uploads of the remaining files must not hold the disk slot
+            await finish_disk_stage(self.uid)
+            await files.put(None)
+            await uploader
+
+    async def __pipeline_guard(self, up_path, ready):
+        budget = config_dict["LEECH_PIPELINE_BUFFER"] * 1024**3
+        paused = False
+        while self.suproc.returncode is None:
+            async with download_dict_lock:
+                cancelled = self.uid not in download_dict
+            if cancelled:
+                if paused:
+                    self.suproc.send_signal(SIGCONT)
+                self.suproc.kill()
+                return
+            ready[:] = [f_path for f_path in ready if await aiopath.exists(f_path)]
+            buffered = await get_path_size(up_path)
+            if not paused and ready and buffered > budget:
+                self.suproc.send_signal(SIGSTOP)
+                paused = True
+            elif paused and (not ready or buffered <= budget):
+                self.suproc.send_signal(SIGCONT)
+                paused = False
+            await sleep(1)
 
     async def onUploadComplete(
         self, link, size, files, folders, mime_type, name, rclonePath=""
     ):
+        await journal_remove(self.uid)
         user_id = self.message.from_user.id
         name, _ = await process_file(name, user_id, is_mirror=not self.is_leech)
         msg = f"{escape(name)}\n\n"
@@ -587,6 +788,7 @@ class MirrorLeechListener:
         await delete_links(self.message)
 
     async def onDownloadError(self, error, button=None):
+        await journal_remove(self.uid)
         async with download_dict_lock:
             if self.uid in download_dict:
                 del download_dict[self.uid]
@@ -594,6 +796,20 @@ class MirrorLeechListener:
             if self.same_dir and self.uid in self.same_dir["tasks"]:
                 self.same_dir["tasks"].remove(self.uid)
                 self.same_dir["total"] -= 1
+        async with queue_dict_lock:
+            if self.uid in queued_dl:
+                queued_dl[self.uid].set()
+                del queued_dl[self.uid]
+            if self.uid in queued_up:
+                queued_up[self.uid].set()
+                del queued_up[self.uid]
+            if self.uid in non_queued_dl:
+                non_queued_dl.remove(self.uid)
+            if self.uid in non_queued_up:
+                non_queued_up.remove(self.uid)
+            queue_meta.pop(self.uid, None)
+        await finish_disk_stage(self.uid)
+        await start_from_queued()
         msg = f"Hey, {self.tag}!\n"
         msg += "Your download has been stopped!\n\n"
         msg += f"<blockquote><b>Reason:</b> {escape(error)}\n"
@@ -612,6 +828,17 @@ class MirrorLeechListener:
             await send_message(self.botpmmsg, msg, button)
         await five_minute_del(x)
 
+        await sleep(3)
+        await clean_download(self.dir)
+        if self.newDir:
+            await clean_download(self.newDir)
+
+    async def onUploadError(self, error):
+        await journal_remove(self.uid)
+        async with download_dict_lock:
+            if self.uid in download_dict:
+                del download_dict[self.uid]
+            count = len(download_dict)
         async with queue_dict_lock:
             if self.uid in queued_dl:
                 queued_dl[self.uid].set()
@@ -623,18 +850,9 @@ class MirrorLeechListener:
                 non_queued_dl.remove(self.uid)
             if self.uid in non_queued_up:
                 non_queued_up.remove(self.uid)
-
+            queue_meta.pop(self.uid, None)
+        await finish_disk_stage(self.uid)
         await start_from_queued()
-        await sleep(3)
-        await clean_download(self.dir)
-        if self.newDir:
-            await clean_download(self.newDir)
-
-    async def onUploadError(self, error):
-        async with download_dict_lock:
-            if self.uid in download_dict:
-                del download_dict[self.uid]
-            count = len(download_dict)
         msg = f"Hey, {self.tag}!\n"
         msg += "Your upload has been stopped!\n\n"
         msg += f"<blockquote><b>Reason:</b> {escape(error)}\n"
@@ -653,19 +871,6 @@ class MirrorLeechListener:
             await send_message(self.botpmmsg, msg)
         await five_minute_del(x)
 
-        async with queue_dict_lock:
-            if self.uid in queued_dl:
-                queued_dl[self.uid].set()
-                del queued_dl[self.uid]
-            if self.uid in queued_up:
-                queued_up[self.uid].set()
-                del queued_up[self.uid]
-            if self.uid in non_queued_dl:
-                non_queued_dl.remove(self.uid)
-            if self.uid in non_queued_up:
-                non_queued_up.remove(self.uid)
-
-        await start_from_queued()
         await sleep(3)
         await clean_download(self.dir)
         if self.newDir:
@@ -13,6 +13,7 @@ from bot import (
     download_dict_lock,
 )
 from bot.helper.ext_utils.bot_utils import sync_to_async, bt_selection_buttons
+from bot.helper.ext_utils.task_journal import journal_task
 from bot.helper.ext_utils.task_manager import is_queued
 from bot.helper.telegram_helper.message_utils import send_message, sendStatusMessage
 from bot.helper.mirror_leech_utils.status_utils.aria2_status import Aria2Status
@@ -34,7 +35,7 @@ async def add_aria2c_download(
         a2c_opt["seed-time"] = seed_time
     if TORRENT_TIMEOUT := config_dict["TORRENT_TIMEOUT"]:
         a2c_opt["bt-stop-timeout"] = f"{TORRENT_TIMEOUT}"
-    added_to_queue, event = await is_queued(listener.uid)
+    added_to_queue, event = await is_queued(listener)
     if added_to_queue:
         if link.startswith("magnet:"):
             a2c_opt["pause-metadata"] = "true"
@@ -56,6 +57,7 @@ async def add_aria2c_download(
 
     gid = download.gid
     name = download.name
+    await journal_task(listener, engine="aria2", ref=gid)
     async with download_dict_lock:
         download_dict[listener.uid] = Aria2Status(
             gid, listener, queued=added_to_queue
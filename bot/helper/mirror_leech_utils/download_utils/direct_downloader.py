@@ -1,7 +1,9 @@
+from asyncio import FIRST_COMPLETED, Event, Queue, wait
 from secrets import token_hex
 
 from bot import (
     LOGGER,
+    bot_loop,
     aria2_options,
     aria2c_global,
     download_dict,
@@ -25,6 +27,50 @@ from bot.helper.telegram_helper.message_utils import (
 )
 from bot.helper.mirror_leech_utils.status_utils.queue_status import QueueStatus
 from bot.helper.mirror_leech_utils.status_utils.direct_status import DirectStatus
+from bot.helper.mirror_leech_utils.download_utils.direct_link_generator import (
+    direct_link_generator,
+)
+
+# a folder is streamed once this many files are known, so it can't collapse
+# into the single link result of the resolver anymore
+STREAM_MIN_FILES = 2
+
+
+async def resolve_direct_link(link):
+    feed = Queue()
+    streaming = Event()
+    state = {"details": None, "found": 0}
+
+    def __found(details, item):
+        state["details"] = details
+        state["found"] += 1
+        feed.put_nowait(item)
+        if state["found"] == STREAM_MIN_FILES:
+            streaming.set()
+
+    def sink(details, item):
+        bot_loop.call_soon_threadsafe(__found, details, dict(item))
+
+    # folder crawls can run for minutes, keep them off the short io pool
+    resolver = await sync_to_async(
+        direct_link_generator, link, sink, wait=False, purpose="transfer"
+    )
+    started = bot_loop.create_task(streaming.wait())
+    await wait([resolver, started], return_when=FIRST_COMPLETED)
+    if resolver.done():
+        started.cancel()
+        return resolver.result()
+    # the crawl goes on in the background and closes the feed when it ends
+    resolver.add_done_callback(lambda future: feed.put_nowait(future.exception()))
+    details = state["details"]
+    return {
+        "title": details["title"],
+        "header": details.get("header", ""),
+        "total_size": details["total_size"],
+        "contents": details["contents"],
+        "feed": feed,
+        "source": details,
+    }
 
 
 async def add_direct_download(details, path, listener, foldername):
@@ -52,7 +98,7 @@ async def add_direct_download(details, path, listener, foldername):
         return
 
     gid = token_hex(4)
-    added_to_queue, event = await is_queued(listener.uid)
+    added_to_queue, event = await is_queued(listener, size)
     if added_to_queue:
         LOGGER.info(f"Added to Queue/Download: {foldername}")
         async with download_dict_lock:
@@ -90,4 +136,8 @@ async def add_direct_download(details, path, listener, foldername):
         await sendStatusMessage(listener.message)
 
     await delete_links(listener.message)
-    await sync_to_async(directListener.download, contents)
+    if feed := details.get("feed"):
+        LOGGER.info(f"Streaming folder contents while resolving: {foldername}")
+        await directListener.download(feed, details["source"])
+    else:
+        await directListener.download(contents)
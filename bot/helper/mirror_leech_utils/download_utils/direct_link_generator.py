@@ -4,22 +4,33 @@ from json import loads
 from time import sleep
 from uuid import uuid4
 from hashlib import sha256
+from functools import partial
+from threading import local
+from collections import deque
 from urllib.parse import parse_qs, urlparse
+from concurrent.futures import FIRST_COMPLETED, wait
 
 from bs4 import BeautifulSoup
-from requests import Session, get, post
-from requests import session as req_session
+from requests import Session, get
 from lxml.etree import HTML
 from cloudscraper import create_scraper
-from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
 
 from bot import config_dict
 from bot.helper.ext_utils.bot_utils import text_to_bytes
+from bot.helper.ext_utils.executors import submit
+from bot.helper.ext_utils.http_pool import (
+    cached_resolve,
+    pooled_scraper,
+    pooled_session,
+    shared_session,
+    mediafire_scraper,
+)
 from bot.helper.ext_utils.exceptions import DirectDownloadLinkError
 from bot.helper.ext_utils.help_strings import PASSWORD_ERROR_MESSAGE
 
 _caches = {}
+CRAWL_FANOUT = 8
+stream_sink = local()
 user_agent = "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:122.0) Gecko/20100101 Firefox/122.0"
 domain_dict = {
     "mediafire": ["mediafire.com"],
@@ -110,7 +121,17 @@ domain_dict = {
 }
 
 
-def direct_link_generator(link):
+def direct_link_generator(link, sink=None):
+    # sink(details, item) is called from this thread for every file a folder
+    # crawl finds, so downloads can start before the crawl is over
+    stream_sink.func = sink
+    try:
+        return cached_resolve(link, __resolve)
+    finally:
+        stream_sink.func = None
+
+
+def __resolve(link):
     domain = urlparse(link).hostname
     if not domain:
         raise DirectDownloadLinkError("ERROR: Invalid URL")
@@ -123,6 +144,35 @@ def direct_link_generator(link):
     raise DirectDownloadLinkError(f"No Direct link function found for {link}")
 
 
+def crawl_folders(details, root, list_node):
+    """Walk a remote folder tree, listing up to CRAWL_FANOUT nodes at once.
+
+    list_node(node) returns (child_nodes, items); items are appended to
+    details["contents"] as soon as their folder is listed. Listings run on
+    the shared transfer executor, each crawl keeps CRAWL_FANOUT in flight.
+    """
+    sink = getattr(stream_sink, "func", None)
+    nodes = deque([root])
+    pending = set()
+    try:
+        while nodes or pending:
+            while nodes and len(pending) < CRAWL_FANOUT:
+                pending.add(submit("transfer", partial(list_node, nodes.popleft())))
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                children, items = future.result()
+                for item in items:
+                    details["total_size"] += item.pop("size", 0)
+                    details["contents"].append(item)
+                    if sink is not None:
+                        sink(details, item)
+                nodes.extend(children)
+    except BaseException:
+        for future in pending:
+            future.cancel()
+        raise
+
+
 def get_captcha_token(session, params):
     recaptcha_api = "https://www.google.com/recaptcha/api2"
     res = session.get(f"{recaptcha_api}/anchor", params=params)
@@ -147,28 +197,24 @@ def mediafire(url, session=None):
     ):
         return final_link[0]
     if session is None:
-        session = Session()
         parsed_url = urlparse(url)
         url = f"{parsed_url.scheme}://{parsed_url.netloc}{parsed_url.path}"
+        return mediafire(url, shared_session())
     try:
         html = HTML(session.get(url).text)
     except Exception as e:
-        session.close()
         raise DirectDownloadLinkError(f"ERROR: {e.__class__.__name__}")
     if error := html.xpath('//p[@class="notranslate"]/text()'):
-        session.close()
         raise DirectDownloadLinkError(f"ERROR: {error[0]}")
     if not (final_link := html.xpath("//a[@id='downloadButton']/@href")):
-        session.close()
         raise DirectDownloadLinkError("ERROR: No links found in this page Try Again")
     if final_link[0].startswith("//"):
         return mediafire(f"https://{final_link[0][2:]}", session)
-    session.close()
     return final_link[0]
 
 
 def osdn(url):
-    with create_scraper() as session:
+    with pooled_scraper() as session:
         try:
             html = HTML(session.get(url).text)
         except Exception as e:
@@ -183,7 +229,7 @@ def github(url):
         findall(r"\bhttps?://.*github\.com.*releases\S+", url)[0]
     except IndexError:
         raise DirectDownloadLinkError("No GitHub Releases links found")
-    with create_scraper() as session:
+    with pooled_scraper() as session:
         _res = session.get(url, stream=True, allow_redirects=False)
         if "location" in _res.headers:
             return _res.headers["location"]
@@ -191,7 +237,7 @@ def github(url):
 
 
 def hxfile(url):
-    with create_scraper() as session:
+    with pooled_scraper() as session:
         try:
             file_code = url.split("/")[-1]
             html = HTML(
@@ -205,7 +251,7 @@ def hxfile(url):
 
 
 def filepress(url):
-    with create_scraper() as session:
+    with pooled_scraper() as session:
         try:
             url = session.get(url).url
             raw = urlparse(url)
@@ -237,7 +283,7 @@ def filepress(url):
 
 
 def onedrive(link):
-    with create_scraper() as session:
+    with pooled_scraper() as session:
         try:
             link = session.get(link).url
             parsed_link = urlparse(link)
@@ -279,7 +325,7 @@ def pixeldrain(url):
     else:
         info_link = f"https://pixeldrain.com/api/file/{file_id}/info"
         dl_link = f"https://pixeldrain.com/api/file/{file_id}?download"
-    with create_scraper() as session:
+    with pooled_scraper() as session:
         try:
             resp = session.get(info_link).json()
         except Exception as e:
@@ -293,7 +339,7 @@ def streamtape(url):
     splitted_url = url.split("/")
     _id = splitted_url[4] if len(splitted_url) >= 6 else splitted_url[-1]
     try:
-        with Session() as session:
+        with pooled_session() as session:
             html = HTML(session.get(url).text)
     except Exception as e:
         raise DirectDownloadLinkError(f"ERROR: {e.__class__.__name__}")
@@ -305,7 +351,7 @@ def streamtape(url):
 
 
 def racaty(url):
-    with create_scraper() as session:
+    with pooled_scraper() as session:
         try:
             url = session.get(url).url
             json_data = {"op": "download2", "id": url.split("/")[-1]}
@@ -386,7 +432,7 @@ def fichier(link):
 
 
 def solidfiles(url):
-    with create_scraper() as session:
+    with pooled_scraper() as session:
         try:
             headers = {
                 "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_9_4) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/36.0.1985.125 Safari/537.36"
@@ -401,7 +447,7 @@ def solidfiles(url):
 
 
 def krakenfiles(url):
-    with Session() as session:
+    with pooled_session() as session:
         try:
             _res = session.get(url)
         except Exception as e:
@@ -429,7 +475,7 @@ def krakenfiles(url):
 
 
 def uploadee(url):
-    with create_scraper() as session:
+    with pooled_scraper() as session:
         try:
             html = HTML(session.get(url).text)
         except Exception as e:
@@ -472,10 +518,13 @@ def terabox(url, video_quality="HD Video", save_dir="HD_Video"):
 
     for base_url in urls:
         try:
-            if "api/v1" in base_url:
-                response = post(base_url, headers=headers, json={"url": terabox_url})
-            else:
-                response = get(base_url)
+            with pooled_session() as session:
+                if "api/v1" in base_url:
+                    response = session.post(
+                        base_url, headers=headers, json={"url": terabox_url}
+                    )
+                else:
+                    response = session.get(base_url)
 
             if response.status_code == 200:
                 break
@@ -566,7 +615,7 @@ def appflix(url):
 
 
 def wetransfer(url):
-    with create_scraper() as session:
+    with pooled_scraper() as session:
         try:
             url = session.get(url).url
             splited_url = url.split("/")
@@ -590,7 +639,7 @@ def wetransfer(url):
 
 
 def akmfiles(url):
-    with create_scraper() as session:
+    with pooled_scraper() as session:
         try:
             html = HTML(
                 session.post(
@@ -605,7 +654,7 @@ def akmfiles(url):
 
 
 def shrdsk(url):
-    with create_scraper() as session:
+    with pooled_scraper() as session:
         try:
             _json = session.get(
                 f"https://us-central1-affiliate2apk.cloudfunctions.net/get_data?shortid={url.split('/')[-1]}"
@@ -665,10 +714,11 @@ def linkBox(url: str):
             size = itemInfo["size"]
             if isinstance(size, str) and size.isdigit():
                 size = float(size)
-            details["total_size"] += size
-        details["contents"].append(item)
+            item["size"] = size
+        return [], [item]
 
-    def __fetch_links(session, _id=0, folderPath=""):
+    def __fetch_links(session, node):
+        _id, folder_path = node
         params = {
             "shareToken": shareToken,
             "pageSize": 1000,
@@ -689,28 +739,26 @@ def linkBox(url: str):
             return __singleItem(session, data["itemId"])
         if not details["title"]:
             details["title"] = data["dirName"]
-        contents = data["list"]
-        if not contents:
-            return None
-        for content in contents:
+        folders, items = [], []
+        for content in data["list"] or []:
             if content["type"] == "dir" and "url" not in content:
-                if not folderPath:
-                    newFolderPath = path.join(details["title"], content["name"])
+                if not folder_path:
+                    new_folder_path = path.join(details["title"], content["name"])
                 else:
-                    newFolderPath = path.join(folderPath, content["name"])
+                    new_folder_path = path.join(folder_path, content["name"])
                 if not details["title"]:
                     details["title"] = content["name"]
-                __fetch_links(session, content["id"], newFolderPath)
+                folders.append((content["id"], new_folder_path))
             elif "url" in content:
-                if not folderPath:
-                    folderPath = details["title"]
+                if not folder_path:
+                    folder_path = details["title"]
                 filename = content["name"]
                 if (sub_type := content.get("sub_type")) and not filename.endswith(
                     sub_type
                 ):
                     filename += f".{sub_type}"
                 item = {
-                    "path": path.join(folderPath),
+                    "path": path.join(folder_path),
                     "filename": filename,
                     "url": content["url"],
                 }
@@ -718,13 +766,15 @@ def linkBox(url: str):
                     size = content["size"]
                     if isinstance(size, str) and size.isdigit():
                         size = float(size)
-                    details["total_size"] += size
-                details["contents"].append(item)
-        return None
+                    item["size"] = size
+                items.append(item)
+        return folders, items
 
     try:
-        with Session() as session:
-            __fetch_links(session)
+        with pooled_session() as session:
+            crawl_folders(
+                details, (0, ""), lambda node: __fetch_links(session, node)
+            )
     except DirectDownloadLinkError as e:
         raise e
     return details
@@ -758,7 +808,8 @@ def gofile(url):
         except Exception as e:
             raise e
 
-    def __fetch_links(session, _id, folderPath=""):
+    def __fetch_links(session, node):
+        _id, folder_path = node
         _url = f"https://api.gofile.io/contents/{_id}?wt=4fd6sg89d7s6&cache=true"
         headers = {
             "User-Agent": user_agent,
@@ -789,21 +840,21 @@ def gofile(url):
         if not details["title"]:
             details["title"] = data["name"] if data["type"] == "folder" else _id
 
-        contents = data["children"]
-        for content in contents.values():
+        folders, items = [], []
+        for content in data["children"].values():
             if content["type"] == "folder":
                 if not content["public"]:
                     continue
-                if not folderPath:
-                    newFolderPath = path.join(details["title"], content["name"])
+                if not folder_path:
+                    new_folder_path = path.join(details["title"], content["name"])
                 else:
-                    newFolderPath = path.join(folderPath, content["name"])
-                __fetch_links(session, content["id"], newFolderPath)
+                    new_folder_path = path.join(folder_path, content["name"])
+                folders.append((content["id"], new_folder_path))
             else:
-                if not folderPath:
-                    folderPath = details["title"]
+                if not folder_path:
+                    folder_path = details["title"]
                 item = {
-                    "path": path.join(folderPath),
+                    "path": path.join(folder_path),
                     "filename": content["name"],
                     "url": content["link"],
                 }
@@ -811,18 +862,21 @@ def gofile(url):
                     size = content["size"]
                     if isinstance(size, str) and size.isdigit():
                         size = float(size)
-                    details["total_size"] += size
-                details["contents"].append(item)
+                    item["size"] = size
+                items.append(item)
+        return folders, items
 
     details = {"contents": [], "title": "", "total_size": 0}
-    with Session() as session:
+    with pooled_session() as session:
         try:
             token = __get_token(session)
         except Exception as e:
             raise DirectDownloadLinkError(f"ERROR: {e.__class__.__name__}")
         details["header"] = f"Cookie: accountToken={token}"
         try:
-            __fetch_links(session, _id)
+            crawl_folders(
+                details, (_id, ""), lambda node: __fetch_links(session, node)
+            )
         except Exception as e:
             raise DirectDownloadLinkError(e)
 
@@ -842,17 +896,7 @@ def mediafireFolder(url):
         folderkey = folderkey[0]
     details = {"contents": [], "title": "", "total_size": 0, "header": ""}
 
-    session = req_session()
-    adapter = HTTPAdapter(
-        max_retries=Retry(total=10, read=10, connect=10, backoff_factor=0.3)
-    )
-    session.mount("http://", adapter)
-    session.mount("https://", adapter)
-    session = create_scraper(
-        browser={"browser": "firefox", "platform": "windows", "mobile": False},
-        delay=10,
-        sess=session,
-    )
+    session = mediafire_scraper()
     folder_infos = []
 
     def __get_info(folderkey):
@@ -897,11 +941,29 @@ def mediafireFolder(url):
             return final_link[0]
         return None
 
-    def __get_content(folderKey, folderPath="", content_type="folders"):
+    def __get_file(file, folder_path):
+        if not (_url := __scraper(file["links"]["normal_download"])):
+            return [], []
+        item = {
+            "filename": file["filename"],
+            "path": path.join(folder_path or details["title"]),
+            "url": _url,
+        }
+        if "size" in file:
+            size = file["size"]
+            if isinstance(size, str) and size.isdigit():
+                size = float(size)
+            item["size"] = size
+        return [], [item]
+
+    def __get_content(node):
+        if node[0] == "file":
+            return __get_file(*node[1:])
+        content_type, folder_key, folder_path = node
         try:
             params = {
                 "content_type": content_type,
-                "folder_key": folderKey,
+                "folder_key": folder_key,
                 "response_format": "json",
             }
             _json = session.get(
@@ -917,39 +979,24 @@ def mediafireFolder(url):
             raise DirectDownloadLinkError(f"ERROR: {_res['message']}")
         _folder_content = _res["folder_content"]
         if content_type == "folders":
-            folders = _folder_content["folders"]
-            for folder in folders:
-                if folderPath:
-                    newFolderPath = path.join(folderPath, folder["name"])
+            nodes = []
+            for folder in _folder_content["folders"]:
+                if folder_path:
+                    new_folder_path = path.join(folder_path, folder["name"])
                 else:
-                    newFolderPath = path.join(folder["name"])
-                __get_content(folder["folderkey"], newFolderPath)
-            __get_content(folderKey, folderPath, "files")
-        else:
-            files = _folder_content["files"]
-            for file in files:
-                item = {}
-                if not (_url := __scraper(file["links"]["normal_download"])):
-                    continue
-                item["filename"] = file["filename"]
-                if not folderPath:
-                    folderPath = details["title"]
-                item["path"] = path.join(folderPath)
-                item["url"] = _url
-                if "size" in file:
-                    size = file["size"]
-                    if isinstance(size, str) and size.isdigit():
-                        size = float(size)
-                    details["total_size"] += size
-                details["contents"].append(item)
+                    new_folder_path = path.join(folder["name"])
+                nodes.append(("folders", folder["folderkey"], new_folder_path))
+            nodes.append(("files", folder_key, folder_path))
+            return nodes, []
+        # every file needs its own download page, scrape them in parallel
+        return [("file", file, folder_path) for file in _folder_content["files"]], []
 
     try:
         for folder in folder_infos:
-            __get_content(folder["folderkey"], folder["name"])
+            root = ("folders", folder["folderkey"], folder["name"])
+            crawl_folders(details, root, __get_content)
     except Exception as e:
         raise DirectDownloadLinkError(e)
-    finally:
-        session.close()
     if len(details["contents"]) == 1:
         return (details["contents"][0]["url"], details["header"])
     return details
@@ -959,11 +1006,15 @@ def cf_bypass(url):
     "DO NOT ABUSE THIS"
     try:
         data = {"cmd": "request.get", "url": url, "maxTimeout": 60000}
-        _json = post(
-            "https://cf.jmdkh.eu.org/v1",
-            headers={"Content-Type": "application/json"},
-            json=data,
-        ).json()
+        _json = (
+            shared_session()
+            .post(
+                "https://cf.jmdkh.eu.org/v1",
+                headers={"Content-Type": "application/json"},
+                json=data,
+            )
+            .json()
+        )
         if _json["status"] == "ok":
             return _json["solution"]["response"]
     except Exception as e:
@@ -978,7 +1029,7 @@ def send_cm_file(url, file_id=None):
     else:
         _password = ""
     _passwordNeed = False
-    with create_scraper() as session:
+    with pooled_scraper() as session:
         if file_id is None:
             try:
                 html = HTML(session.get(url).text)
@@ -1024,7 +1075,7 @@ def send_cm(url):
         details["title"] = splitted_url[5]
     else:
         details["title"] = splitted_url[-1]
-    session = Session()
+    session = shared_session()
 
     def __collectFolders(html):
         folders = []
@@ -1066,40 +1117,46 @@ def send_cm(url):
             )
         return files
 
-    def __writeContents(html_text, folderPath=""):
-        folders = __collectFolders(html_text)
-        for folder in folders:
-            _html = HTML(cf_bypass(folder["folder_link"]))
-            __writeContents(_html, path.join(folderPath, folder["folder_name"]))
-        files = __getFiles(html_text)
-        for file in files:
-            if not (link := __getFile_link(file["file_id"])):
-                continue
-            item = {"url": link, "filename": file["filename"], "path": folderPath}
-            details["total_size"] += file["size"]
-            details["contents"].append(item)
+    def __writeContents(node):
+        kind, source, folder_path = node
+        if kind == "file":
+            if not (link := __getFile_link(source["file_id"])):
+                return [], []
+            item = {
+                "url": link,
+                "filename": source["file_name"],
+                "path": folder_path,
+                "size": source["size"],
+            }
+            return [], [item]
+        html_text = source if kind == "html" else HTML(cf_bypass(source))
+        nodes = [
+            (
+                "folder",
+                folder["folder_link"],
+                path.join(folder_path, folder["folder_name"]),
+            )
+            for folder in __collectFolders(html_text)
+        ]
+        nodes.extend(("file", file, folder_path) for file in __getFiles(html_text))
+        return nodes, []
 
     try:
         mainHtml = HTML(cf_bypass(url))
     except DirectDownloadLinkError as e:
-        session.close()
         raise e
     except Exception as e:
-        session.close()
         raise DirectDownloadLinkError(
             f"ERROR: {e.__class__.__name__} While getting mainHtml"
         )
     try:
-        __writeContents(mainHtml, details["title"])
+        crawl_folders(details, ("html", mainHtml, details["title"]), __writeContents)
     except DirectDownloadLinkError as e:
-        session.close()
         raise e
     except Exception as e:
-        session.close()
         raise DirectDownloadLinkError(
             f"ERROR: {e.__class__.__name__} While writing Contents"
         )
-    session.close()
     if len(details["contents"]) == 1:
         return (details["contents"][0]["url"], details["header"])
     return details
@@ -1242,7 +1299,7 @@ def filewish(url):
         quality = spited_file_code[1]
         file_code = spited_file_code[0]
     url = f"{scheme}://{hostname}/{file_code}"
-    with Session() as session:
+    with pooled_session() as session:
         try:
             _res = session.get(
                 f"{apiUrl}/api/file/direct_link",
@@ -1276,7 +1333,7 @@ def streamvid(url):
     parsed_url = urlparse(url)
     url = f"{parsed_url.scheme}://{parsed_url.hostname}/d/{file_code}"
     quality_defined = bool(url.endswith(("_o", "_h", "_n", "_l")))
-    with create_scraper() as session:
+    with pooled_scraper() as session:
         try:
             html = HTML(session.get(url).text)
         except Exception as e:
@@ -1350,7 +1407,7 @@ def streamhub(url):
 
 
 def pcloud(url):
-    with create_scraper() as session:
+    with pooled_scraper() as session:
         try:
             res = session.get(url)
         except Exception as e:
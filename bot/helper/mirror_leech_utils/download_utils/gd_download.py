@@ -22,7 +22,9 @@ from bot.helper.mirror_leech_utils.status_utils.gdrive_status import GdriveStatu
 
 async def add_gd_download(link, path, listener, newname):
     drive = GoogleDriveHelper()
-    name, mime_type, size, _, _ = await sync_to_async(drive.count, link)
+    name, mime_type, size, _, _ = await sync_to_async(
+        drive.count, link, purpose="transfer"
+    )
     if mime_type is None:
         await listener.onDownloadError(name)
         return
@@ -42,7 +44,7 @@ async def add_gd_download(link, path, listener, newname):
     if limit_exceeded := await limit_checker(size, listener, is_drive_link=True):
         await listener.onDownloadError(limit_exceeded)
         return
-    added_to_queue, event = await is_queued(listener.uid)
+    added_to_queue, event = await is_queued(listener, size)
     if added_to_queue:
         LOGGER.info(f"Added to Queue/Download: {name}")
         async with download_dict_lock:
@@ -75,4 +77,4 @@ async def add_gd_download(link, path, listener, newname):
         await listener.on_download_start()
         await sendStatusMessage(listener.message)
 
-    await sync_to_async(drive.download, link)
+    await sync_to_async(drive.download, link, purpose="transfer")
@@ -13,6 +13,7 @@ from bot import (
     download_dict_lock,
 )
 from bot.helper.ext_utils.bot_utils import sync_to_async, bt_selection_buttons
+from bot.helper.ext_utils.task_journal import journal_task
 from bot.helper.ext_utils.task_manager import is_queued
 from bot.helper.listeners.qbit_listener import on_download_start
 from bot.helper.telegram_helper.message_utils import (
@@ -31,7 +32,7 @@ async def add_qb_torrent(link, path, listener, ratio, seed_time):
         if await aiopath.exists(link):
             url = None
             tpath = link
-        added_to_queue, event = await is_queued(listener.uid)
+        added_to_queue, event = await is_queued(listener)
         op = await sync_to_async(
             xnox_client.torrents_add,
             url,
@@ -61,6 +62,7 @@ async def add_qb_torrent(link, path, listener, ratio, seed_time):
                         return
             tor_info = tor_info[0]
             ext_hash = tor_info.hash
+            await journal_task(listener, engine="qbit", ref=ext_hash)
         else:
             await listener.onDownloadError(
                 "This Torrent already added or unsupported/invalid link/file."
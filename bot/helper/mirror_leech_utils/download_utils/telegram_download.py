@@ -1,19 +1,35 @@
 import contextlib
+from os import O_RDWR, O_CREAT, pwrite, ftruncate
+from os import open as osopen
+from os import path as ospath
+from os import close as osclose
+from os import replace as osreplace
+from json import JSONDecodeError, dumps, loads
 from time import time
-from asyncio import Lock
+from asyncio import Lock, sleep, gather
 from logging import ERROR, getLogger
 from secrets import token_hex
 
+from aiofiles import open as aiopen
+from aiofiles.os import path as aiopath
+from aiofiles.os import remove as aioremove
+from aiofiles.os import rename as aiorename
+from aiofiles.os import makedirs
+from pyrogram.errors import FloodWait
+
 from bot import (
     LOGGER,
     IS_PREMIUM_USER,
     bot,
     user,
+    config_dict,
     download_dict,
     non_queued_dl,
     queue_dict_lock,
     download_dict_lock,
 )
+from bot.helper.ext_utils.bot_utils import sync_to_async
+from bot.helper.ext_utils.task_journal import journal_task
 from bot.helper.ext_utils.task_manager import (
     is_queued,
     limit_checker,
@@ -29,6 +45,13 @@ from bot.helper.mirror_leech_utils.status_utils.telegram_status import TelegramS
 
 global_lock = Lock()
 GLOBAL_GID = set()
+TG_CHUNK = 1024 * 1024
+TG_SEGMENT_CHUNKS = 64
+TG_SEGMENT_WORKERS = 4
+TG_CHUNKED_MIN_SIZE = 20 * TG_CHUNK
+TG_RETRIES = 5
+# partial files outlive their task directory so a re-added link can resume
+TG_PARTIAL_DIR = "/usr/src/app/downloads/.tgdl"
 getLogger("pyrogram").setLevel(ERROR)
 
 
@@ -40,6 +63,8 @@ class TelegramDownloadHelper:
         self.__listener = listener
         self.__id = ""
         self.__is_cancelled = False
+        self.__client = bot
+        self.__checkpoint_lock = Lock()
 
     @property
     def speed(self):
@@ -87,12 +112,164 @@ class TelegramDownloadHelper:
         async with global_lock:
             GLOBAL_GID.remove(self.__id)
 
-    async def __download(self, message, path):
+    def __partial_path(self):
+        return f"{TG_PARTIAL_DIR}/{self.__id}"
+
+    async def __load_checkpoint(self, partial, size):
+        try:
+            async with aiopen(f"{partial}.json") as f:
+                state = loads(await f.read())
+        except (OSError, JSONDecodeError):
+            return set()
+        if state.get("id") != self.__id or state.get("size") != size:
+            return set()
+        if not await aiopath.exists(partial):
+            return set()
+        return set(state.get("done", []))
+
+    async def __save_checkpoint(self, partial, size, done):
+        checkpoint = f"{partial}.json"
+        async with self.__checkpoint_lock:
+            async with aiopen(f"{checkpoint}.tmp", "w") as f:
+                await f.write(
+                    dumps({"id": self.__id, "size": size, "done": sorted(done)})
+                )
+            await sync_to_async(osreplace, f"{checkpoint}.tmp", checkpoint)
+
+    async def __fetch_segment(self, lane, fd, index, size):
+        first = index * TG_SEGMENT_CHUNKS
+        chunks = min(TG_SEGMENT_CHUNKS, -(-size // TG_CHUNK) - first)
+        fetched = 0
+        fetched_bytes = 0
+        failures = 0
+        while fetched < chunks:
+            try:
+                async for chunk in lane["client"].stream_media(
+                    lane["message"], offset=first + fetched, limit=chunks - fetched
+                ):
+                    if self.__is_cancelled:
+                        return False
+                    await sync_to_async(
+                        pwrite, fd, chunk, (first + fetched) * TG_CHUNK
+                    )
+                    fetched += 1
+                    fetched_bytes += len(chunk)
+                    self.__processed_bytes += len(chunk)
+                if fetched < chunks:
+                    raise ValueError("Telegram stream ended early")
+            except FloodWait as f:
+                LOGGER.warning(f"Telegram download: {f}")
+                await sleep(f.value * 1.2)
+            except Exception as e:
+                failures += 1
+                if failures > TG_RETRIES or self.__is_cancelled:
+                    self.__processed_bytes -= fetched_bytes
+                    raise
+                LOGGER.warning(
+                    f"Telegram download segment {index} failed, retrying: {e}"
+                )
+                await sleep(2**failures)
+                # refreshes an expired file reference
+                with contextlib.suppress(Exception):
+                    lane["message"] = await lane["client"].get_messages(
+                        lane["message"].chat.id, lane["message"].id
+                    )
+        return True
+
+    async def __download_lanes(self, message):
+        lanes = [{"client": self.__client, "message": message}]
+        if not IS_PREMIUM_USER:
+            return lanes
+        other = bot if self.__client == user else user
         try:
-            download = await message.download(
-                file_name=path, progress=self.__onDownloadProgress
+            other_msg = await other.get_messages(message.chat.id, message.id)
+        except Exception:
+            return lanes
+        media = (
+            getattr(other_msg, other_msg.media.value, None)
+            if other_msg.media
+            else None
+        )
+        if media is not None and media.file_unique_id == self.__id:
+            lanes.append({"client": other, "message": other_msg})
+        return lanes
+
+    async def __drop_partial(self):
+        partial = self.__partial_path()
+        for f_path in (partial, f"{partial}.json"):
+            with contextlib.suppress(OSError):
+                await aioremove(f_path)
+
+    async def __chunked_download(self, message, file_path, size):
+        await makedirs(TG_PARTIAL_DIR, exist_ok=True)
+        partial = self.__partial_path()
+        done = await self.__load_checkpoint(partial, size)
+        segment_size = TG_SEGMENT_CHUNKS * TG_CHUNK
+        segments = -(-size // segment_size)
+        pending = [index for index in range(segments) if index not in done]
+        if done:
+            LOGGER.info(
+                f"Resuming Telegram download: {self.name} ({len(done)}/{segments})"
             )
+        self.__processed_bytes = sum(
+            min(segment_size, size - index * segment_size) for index in done
+        )
+        lanes = await self.__download_lanes(message)
+        connections = config_dict["TG_DOWNLOAD_WORKERS"] or TG_SEGMENT_WORKERS
+        if len(lanes) > 1:
+            LOGGER.info(f"Downloading {self.name} with bot and user sessions")
+        fd = await sync_to_async(osopen, partial, O_RDWR | O_CREAT)
+        failed = []
+        workers = [len(lanes) * connections]
+
+        async def worker(lane):
+            try:
+                while pending and not self.__is_cancelled and not failed:
+                    index = pending.pop(0)
+                    try:
+                        if not await self.__fetch_segment(lane, fd, index, size):
+                            return
+                    except Exception as e:
+                        # another session can still finish this segment
+                        if workers[0] > 1:
+                            LOGGER.warning(f"Telegram download worker stopped: {e}")
+                            pending.insert(0, index)
+                        else:
+                            failed.append(e)
+                        return
+                    done.add(index)
+                    await self.__save_checkpoint(partial, size, done)
+            finally:
+                workers[0] -= 1
+
+        try:
+            await sync_to_async(ftruncate, fd, size)
+            await gather(
+                *(worker(lane) for lane in lanes for _ in range(connections))
+            )
+        finally:
+            await sync_to_async(osclose, fd)
+        if failed:
+            raise failed[0]
+        if self.__is_cancelled or len(done) != segments:
+            return None
+        await makedirs(ospath.dirname(file_path), exist_ok=True)
+        await aiorename(partial, file_path)
+        with contextlib.suppress(OSError):
+            await aioremove(f"{partial}.json")
+        return file_path
+
+    async def __download(self, message, path, size, chunked):
+        try:
+            if chunked:
+                download = await self.__chunked_download(message, path, size)
+            else:
+                download = await message.download(
+                    file_name=path, progress=self.__onDownloadProgress
+                )
             if self.__is_cancelled:
+                if chunked:
+                    await self.__drop_partial()
                 await self.__on_download_error("Cancelled by user!")
                 return
         except Exception as e:
@@ -114,6 +291,7 @@ class TelegramDownloadHelper:
             message = await user.get_messages(
                 chat_id=message.chat.id, message_ids=message.id
             )
+            self.__client = user
 
         media = (
             message.document
@@ -132,8 +310,14 @@ class TelegramDownloadHelper:
                 download = media.file_unique_id not in GLOBAL_GID
 
             if download:
+                orig_path = path
+                chunked = media.file_size >= TG_CHUNKED_MIN_SIZE
                 if filename == "":
                     name = media.file_name if hasattr(media, "file_name") else "None"
+                    if chunked and getattr(media, "file_name", None):
+                        path = ospath.join(path, name)
+                    else:
+                        chunked = False
                 else:
                     name = filename
                     path = path + name
@@ -149,7 +333,22 @@ class TelegramDownloadHelper:
                     await self.__listener.onDownloadError(limit_exceeded)
                     await delete_links(self.__listener.message)
                     return
-                added_to_queue, event = await is_queued(self.__listener.uid)
+                # lets a restart fetch the same message again and resume
+                await journal_task(
+                    self.__listener,
+                    engine="telegram",
+                    ref=dumps(
+                        {
+                            "chat_id": message.chat.id,
+                            "msg_id": message.id,
+                            "session": session,
+                            "path": orig_path,
+                            "name": filename,
+                            "file": gid,
+                        }
+                    ),
+                )
+                added_to_queue, event = await is_queued(self.__listener, size)
                 if added_to_queue:
                     LOGGER.info(f"Added to Queue/Download: {name}")
                     async with download_dict_lock:
@@ -166,7 +365,7 @@ class TelegramDownloadHelper:
                 else:
                     from_queue = False
                 await self.__on_download_start(name, size, gid, from_queue)
-                await self.__download(message, path)
+                await self.__download(message, path, size, chunked)
             else:
                 await self.__on_download_error("File already being downloaded!")
         else:
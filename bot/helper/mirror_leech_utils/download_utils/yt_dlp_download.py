@@ -2,8 +2,13 @@ import contextlib
 from os import path as ospath
 from os import listdir
 from re import search as re_search
+from copy import deepcopy
+from json import dumps
+from time import time
 from logging import getLogger
 from secrets import token_hex
+from threading import Lock
+from collections import OrderedDict
 
 from yt_dlp import YoutubeDL, DownloadError
 
@@ -21,6 +26,103 @@ from bot.helper.mirror_leech_utils.status_utils.ytdlp_status import (
 )
 
 LOGGER = getLogger(__name__)
+YTDLP_INFO_TTL = 300
+YTDLP_INFO_LIMIT = 64
+YTDLP_INFO_BYTES = 64 * 1024 * 1024
+# options that only change format selection, naming or post processing
+# don't change what the extractor returns
+YTDLP_LOCAL_OPTIONS = {
+    "format",
+    "logger",
+    "outtmpl",
+    "overwrites",
+    "noprogress",
+    "ignoreerrors",
+    "progress_hooks",
+    "postprocessors",
+    "trim_file_name",
+    "writethumbnail",
+    "ffmpeg_location",
+    "external_downloader",
+    "allow_playlist_files",
+    "retry_sleep_functions",
+    "allow_multiple_video_streams",
+    "allow_multiple_audio_streams",
+}
+info_cache = OrderedDict()
+info_cache_state = {"bytes": 0}
+info_cache_lock = Lock()
+
+
+def __info_key(link, options):
+    return (
+        link,
+        repr(
+            sorted(
+                (key, repr(value))
+                for key, value in options.items()
+                if key not in YTDLP_LOCAL_OPTIONS
+            )
+        ),
+    )
+
+
+def cached_info(link, options):
+    key = __info_key(link, options)
+    with info_cache_lock:
+        if (cached := info_cache.get(key)) is None:
+            return None
+        expiry, info, size = cached
+        if expiry < time():
+            del info_cache[key]
+            info_cache_state["bytes"] -= size
+            return None
+        info_cache.move_to_end(key)
+    return deepcopy(info)
+
+
+def __drop_selection(info):
+    # the format choice of the extracting run must not leak into the next one
+    for key in ["requested_formats", "requested_subtitles", "requested_downloads"]:
+        info.pop(key, None)
+    for entry in info.get("entries") or []:
+        if entry:
+            __drop_selection(entry)
+    return info
+
+
+def __cache_info(link, options, info):
+    try:
+        info = __drop_selection(YoutubeDL.sanitize_info(info))
+        size = len(dumps(info))
+    except Exception as e:
+        LOGGER.warning(f"Unable to cache info of {link}: {e}")
+        return
+    if size > YTDLP_INFO_BYTES:
+        return
+    key = __info_key(link, options)
+    with info_cache_lock:
+        if (old := info_cache.pop(key, None)) is not None:
+            info_cache_state["bytes"] -= old[2]
+        info_cache[key] = (time() + YTDLP_INFO_TTL, info, size)
+        info_cache_state["bytes"] += size
+        while (
+            len(info_cache) > YTDLP_INFO_LIMIT
+            or info_cache_state["bytes"] > YTDLP_INFO_BYTES
+        ):
+            info_cache_state["bytes"] -= info_cache.popitem(last=False)[1][2]
+
+
+def extract_info_cached(ydl, link, options):
+    # a cached info dict only needs format selection with this ydl's options
+    if (info := cached_info(link, options)) is not None:
+        try:
+            return ydl.process_ie_result(info, download=False)
+        except Exception as e:
+            LOGGER.warning(f"Cached info failed for {link}: {e}. Extracting again")
+    if (info := ydl.extract_info(link, download=False)) is not None:
+        __cache_info(link, options, info)
+    return info
 
 
 class MyLogger:
@@ -146,7 +248,7 @@ class YoutubeDLHelper:
             self.opts["external_downloader"] = "ffmpeg"
         with YoutubeDL(self.opts) as ydl:
             try:
-                result = ydl.extract_info(link, download=False)
+                result = extract_info_cached(ydl, link, self.opts)
                 if result is None:
                     raise ValueError("Info result is None")
             except Exception as e:
@@ -184,11 +286,24 @@ class YoutubeDLHelper:
                 return None
             return None
 
+    def __download_info(self, ydl, link):
+        if (info := cached_info(link, self.opts)) is None:
+            ydl.download([link])
+            return
+        try:
+            ydl.process_ie_result(info, download=True)
+        except DownloadError as e:
+            if self.__is_cancelled:
+                raise
+            # media urls of the cached info may have expired already
+            LOGGER.warning(f"Cached info failed for {link}: {e}. Extracting again")
+            ydl.download([link])
+
     def __download(self, link, path):
         try:
             with YoutubeDL(self.opts) as ydl:
                 try:
-                    ydl.download([link])
+                    self.__download_info(ydl, link)
                 except DownloadError as e:
                     if not self.__is_cancelled:
                         self.__on_download_error(str(e))
@@ -248,7 +363,7 @@ class YoutubeDLHelper:
         if options:
             self.__set_options(options)
 
-        await sync_to_async(self.extractMetaData, link, name)
+        await sync_to_async(self.extractMetaData, link, name, purpose="transfer")
         if self.__is_cancelled:
             return
 
@@ -332,7 +447,7 @@ class YoutubeDLHelper:
         ):
             await self.__listener.onDownloadError(limit_exceeded)
             return
-        added_to_queue, event = await is_queued(self.__listener.uid)
+        added_to_queue, event = await is_queued(self.__listener, self.__size)
         if added_to_queue:
             LOGGER.info(f"Added to Queue/Download: {self.name}")
             async with download_dict_lock:
@@ -351,7 +466,7 @@ class YoutubeDLHelper:
         async with queue_dict_lock:
             non_queued_dl.add(self.__listener.uid)
 
-        await sync_to_async(self.__download, link, path)
+        await sync_to_async(self.__download, link, path, purpose="transfer")
 
     async def cancel_download(self):
         self.__is_cancelled = True
@@ -12,8 +12,9 @@ from aiofiles.os import path as aiopath
 from aiofiles.os import mkdir, listdir
 
 from bot import GLOBAL_EXTENSION_FILTER, config_dict
-from bot.helper.ext_utils.bot_utils import cmd_exec, sync_to_async
-from bot.helper.ext_utils.files_utils import get_mime_type, count_files_and_folders
+from bot.helper.ext_utils.bot_utils import run_cpu, cmd_exec
+from bot.helper.ext_utils.cpu_workers import mime_type as get_mime_type
+from bot.helper.ext_utils.files_utils import count_files_and_folders
 
 LOGGER = getLogger(__name__)
 
@@ -293,7 +294,7 @@ class RcloneTransferHelper:
                     "This file extension is excluded by extension filter!"
                 )
                 return
-            mime_type = await sync_to_async(get_mime_type, path)
+            mime_type = await run_cpu(get_mime_type, path)
             folders = 0
             files = 1
 
@@ -1,12 +1,20 @@
 from time import time
+from asyncio import Lock, sleep
 
-from bot import LOGGER, aria2
+from aria2p import Download
+
+from bot import LOGGER, aria2, bot_loop
 from bot.helper.ext_utils.bot_utils import (
     MirrorStatus,
     sync_to_async,
     get_readable_time,
 )
 
+ARIA2_RESULTS_LIMIT = 1000
+aria2_downloads = {}
+aria2_sync_lock = Lock()
+aria2_poller = {"task": None, "requests": 0}
+
 
 def get_download(gid):
     try:
@@ -16,24 +24,75 @@ def get_download(gid):
         return None
 
 
+def __tell_all():
+    client = aria2.client
+    # multicall2 wraps the calls in the methodName/params structs aria2 expects
+    results = client.multicall2(
+        [
+            (client.TELL_ACTIVE, []),
+            (client.TELL_WAITING, [0, ARIA2_RESULTS_LIMIT]),
+            (client.TELL_STOPPED, [0, ARIA2_RESULTS_LIMIT]),
+        ]
+    )
+    structs = []
+    for result in results:
+        if isinstance(result, dict):
+            raise Exception(result.get("faultString", result))
+        structs.append(result[0])
+    return structs
+
+
+async def sync_aria2_downloads():
+    async with aria2_sync_lock:
+        try:
+            active, waiting, stopped = await sync_to_async(__tell_all)
+        except Exception as e:
+            LOGGER.error(f"{e}: Aria2c, while syncing downloads")
+            return None
+        snapshot = {
+            struct["gid"]: Download(aria2, struct)
+            for struct in (*stopped, *waiting, *active)
+        }
+        aria2_downloads.update(snapshot)
+        for gid in list(aria2_downloads):
+            if gid not in snapshot:
+                aria2_downloads.pop(gid, None)
+        return len(active) + len(waiting)
+
+
+async def __aria2_poll():
+    while True:
+        requests = aria2_poller["requests"]
+        pending = await sync_aria2_downloads()
+        if pending == 0 and requests == aria2_poller["requests"]:
+            aria2_poller["task"] = None
+            break
+        await sleep(1)
+
+
+def start_aria2_poller():
+    aria2_poller["requests"] += 1
+    if aria2_poller["task"] is None:
+        aria2_poller["task"] = bot_loop.create_task(__aria2_poll())
+
+
 class Aria2Status:
     def __init__(self, gid, listener, seeding=False, queued=False):
         self.__gid = gid
-        self.__download = get_download(gid)
+        self.__download = aria2_downloads.get(gid) or get_download(gid)
         self.__listener = listener
         self.queued = queued
         self.start_time = 0
         self.seeding = seeding
         self.message = self.__listener.message
+        start_aria2_poller()
 
     def __update(self):
-        if self.__download is None:
-            self.__download = get_download(self.__gid)
-        else:
-            self.__download = self.__download.live
+        if download := aria2_downloads.get(self.__gid):
+            self.__download = download
         if self.__download.followed_by_ids:
             self.__gid = self.__download.followed_by_ids[0]
-            self.__download = get_download(self.__gid)
+            self.__download = aria2_downloads.get(self.__gid, self.__download)
 
     def progress(self):
         return self.__download.progress_string()
@@ -95,8 +154,8 @@ class Aria2Status:
         return self.__gid
 
     async def cancel_download(self):
+        await sync_aria2_downloads()
         self.__update()
-        await sync_to_async(self.__update)
         if self.__download.seeder and self.seeding:
             LOGGER.info(f"Cancelling Seed: {self.name()}")
             await self.__listener.onUploadError(
@@ -43,7 +43,7 @@ class DirectStatus:
             return "-"
 
     def status(self):
-        if self.__obj.task and self.__obj.task.is_waiting:
+        if self.__obj.is_waiting:
             return MirrorStatus.STATUS_QUEUEDL
         return MirrorStatus.STATUS_DOWNLOADING
 
@@ -1,4 +1,6 @@
-from asyncio import sleep
+from asyncio import Lock, sleep
+
+from qbittorrentapi import TorrentDictionary
 
 from bot import LOGGER, QbTorrents, xnox_client, qb_listener_lock
 from bot.helper.ext_utils.bot_utils import (
@@ -8,8 +10,36 @@ from bot.helper.ext_utils.bot_utils import (
     get_readable_file_size,
 )
 
+qb_sync = {"rid": 0, "torrents": {}, "tags": {}}
+qb_sync_lock = Lock()
+
+
+async def sync_qb_torrents():
+    async with qb_sync_lock:
+        try:
+            data = await sync_to_async(xnox_client.sync_maindata, rid=qb_sync["rid"])
+        except Exception as e:
+            LOGGER.error(f"{e}: Qbittorrent, while syncing main data")
+            return
+        torrents = qb_sync["torrents"]
+        if data.get("full_update"):
+            torrents.clear()
+        for hash_, fields in (data.get("torrents") or {}).items():
+            if hash_ in torrents:
+                torrents[hash_].update(fields)
+            else:
+                torrents[hash_] = TorrentDictionary(
+                    data={"hash": hash_, **fields}, client=xnox_client
+                )
+        for hash_ in data.get("torrents_removed") or []:
+            torrents.pop(hash_, None)
+        qb_sync["tags"] = {tor.get("tags"): tor for tor in torrents.values()}
+        qb_sync["rid"] = data.get("rid", 0)
+
 
 def get_download(client, tag):
+    if (tor := qb_sync["tags"].get(tag)) is not None:
+        return tor
     try:
         return client.torrents_info(tag=tag)[0]
     except Exception as e:
@@ -27,7 +57,7 @@ class QbittorrentStatus:
         self.message = listener.message
 
     def __update(self):
-        new_info = get_download(self.__client, f"{self.__listener.uid}")
+        new_info = qb_sync["tags"].get(f"{self.__listener.uid}")
         if new_info is not None:
             self.__info = new_info
 
@@ -4,12 +4,16 @@ from os import path as ospath
 from os import remove as osremove
 from os import listdir, makedirs
 from re import search as re_search
-from time import time
+from json import JSONDecodeError, loads
+from time import time, sleep, monotonic
+from queue import Empty, Queue
 from pickle import load as pload
 from random import randrange
 from logging import ERROR, getLogger
+from threading import Lock
 from urllib.parse import quote as rquote
 from urllib.parse import parse_qs, urlparse
+from concurrent.futures import FIRST_EXCEPTION, ThreadPoolExecutor, wait
 
 from tenacity import (
     RetryError,
@@ -36,6 +40,43 @@ from bot.helper.ext_utils.files_utils import process_file, get_mime_type
 LOGGER = getLogger(__name__)
 getLogger("googleapiclient.discovery").setLevel(ERROR)
 
+CLONE_BATCH_SIZE = 20
+CLONE_RATE_PER_ACCOUNT = 10
+CLONE_MAX_BACKOFF = 64
+sa_buckets = {}
+sa_buckets_lock = Lock()
+
+
+class TokenBucket:
+    def __init__(self, rate, capacity):
+        self.__rate = rate
+        self.__capacity = capacity
+        self.__tokens = capacity
+        self.__updated = monotonic()
+        self.__lock = Lock()
+
+    def consume(self, tokens=1):
+        tokens = min(tokens, self.__capacity)
+        with self.__lock:
+            while True:
+                now = monotonic()
+                self.__tokens = min(
+                    self.__capacity,
+                    self.__tokens + (now - self.__updated) * self.__rate,
+                )
+                self.__updated = now
+                if self.__tokens >= tokens:
+                    self.__tokens -= tokens
+                    return
+                sleep((tokens - self.__tokens) / self.__rate)
+
+
+def get_sa_bucket(key):
+    with sa_buckets_lock:
+        if key not in sa_buckets:
+            sa_buckets[key] = TokenBucket(CLONE_RATE_PER_ACCOUNT, CLONE_BATCH_SIZE)
+        return sa_buckets[key]
+
 
 class GoogleDriveHelper:
     def __init__(self, name=None, path=None, listener=None):
@@ -71,18 +112,22 @@ class GoogleDriveHelper:
         self.__service = self.__authorize()
         self.__file_processed_bytes = 0
         self.__processed_bytes = 0
+        self.__lanes = []
+        self.__backoff = 1
         self.name = name
 
     @property
     def speed(self):
         try:
-            return self.__processed_bytes / self.__total_time
+            return self.processed_bytes / self.__total_time
         except Exception:
             return 0
 
     @property
     def processed_bytes(self):
-        return self.__processed_bytes
+        return self.__processed_bytes + sum(
+            lane.processed_bytes for lane in self.__lanes
+        )
 
     def __authorize(self):
         credentials = None
@@ -210,6 +255,10 @@ class GoogleDriveHelper:
             )
             self.__processed_bytes += chunk_size
             self.__total_time += self.__update_interval
+        elif self.__lanes:
+            for lane in self.__lanes:
+                await lane.__progress()
+            self.__total_time += self.__update_interval
 
     def deletefile(self, link: str):
         try:
@@ -264,7 +313,11 @@ class GoogleDriveHelper:
                 dir_id = self.__create_directory(
                     ospath.basename(ospath.abspath(file_name)), gdrive_id
                 )
-                result = self.__upload_dir(item_path, dir_id)
+                workers = config_dict["GDRIVE_UPLOAD_WORKERS"]
+                if workers and workers > 1:
+                    result = self.__upload_dir_parallel(item_path, dir_id, workers)
+                else:
+                    result = self.__upload_dir(item_path, dir_id)
                 if result is None:
                     raise Exception("Upload has been manually cancelled!")
                 link = self.__G_DRIVE_DIR_BASE_DOWNLOAD_URL.format(dir_id)
@@ -322,6 +375,59 @@ class GoogleDriveHelper:
                 break
         return new_id
 
+    def __create_upload_tree(self, input_directory, dest_id, jobs):
+        for item in listdir(input_directory):
+            current_file_name = ospath.join(input_directory, item)
+            if ospath.isdir(current_file_name):
+                current_dir_id = self.__create_directory(item, dest_id)
+                self.__create_upload_tree(current_file_name, current_dir_id, jobs)
+                self.__total_folders += 1
+            elif not item.lower().endswith(tuple(GLOBAL_EXTENSION_FILTER)):
+                jobs.put((current_file_name, item, dest_id))
+            else:
+                osremove(current_file_name)
+            if self.__is_cancelled:
+                break
+
+    def __upload_worker(self, lane, jobs):
+        while not lane.__is_cancelled:
+            try:
+                file_path, file_name, dest_id = jobs.get_nowait()
+            except Empty:
+                return
+            mime_type = get_mime_type(file_path)
+            lane.__upload_file(file_path, file_name, mime_type, dest_id)
+            if not lane.__is_cancelled:
+                lane.__total_files += 1
+
+    def __upload_dir_parallel(self, input_directory, dest_id, workers):
+        jobs = Queue()
+        self.__create_upload_tree(input_directory, dest_id, jobs)
+        if self.__is_cancelled:
+            return None
+        if jobs.empty():
+            return dest_id
+        workers = min(workers, jobs.qsize())
+        LOGGER.info(f"Uploading {jobs.qsize()} files with {workers} workers")
+        self.__lanes = [
+            GoogleDriveHelper(self.name, self.__path, self.__listener)
+            for _ in range(workers)
+        ]
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = [
+                pool.submit(self.__upload_worker, lane, jobs) for lane in self.__lanes
+            ]
+            done, _ = wait(futures, return_when=FIRST_EXCEPTION)
+            if errors := [f.exception() for f in done if f.exception()]:
+                for lane in self.__lanes:
+                    lane.__is_cancelled = True
+        self.__total_files += sum(lane.__total_files for lane in self.__lanes)
+        if errors:
+            raise errors[0]
+        if self.__is_cancelled:
+            return None
+        return dest_id
+
     @retry(
         wait=wait_exponential(multiplier=2, min=3, max=6),
         stop=stop_after_attempt(3),
@@ -369,7 +475,8 @@ class GoogleDriveHelper:
         if dest_id is not None:
             file_metadata["parents"] = [dest_id]
 
-        if ospath.getsize(file_path) == 0:
+        file_size = ospath.getsize(file_path)
+        if file_size == 0:
             media_body = MediaFileUpload(
                 file_path, mimetype=mime_type, resumable=False
             )
@@ -434,6 +541,7 @@ class GoogleDriveHelper:
         if not self.__listener.seed or self.__listener.newDir:
             with contextlib.suppress(Exception):
                 osremove(file_path)
+        self.__processed_bytes += file_size - self.__file_processed_bytes
         self.__file_processed_bytes = 0
         if not is_dir:
             drive_file = (
@@ -462,16 +570,20 @@ class GoogleDriveHelper:
             mime_type = meta.get("mimeType")
             if mime_type == self.__G_DRIVE_DIR_MIME_TYPE:
                 dir_id = self.__create_directory(meta.get("name"), gdrive_id)
-                self.__cloneFolder(
-                    meta.get("name"), meta.get("name"), meta.get("id"), dir_id
-                )
+                workers = config_dict["GDRIVE_CLONE_WORKERS"]
+                if workers and workers > 1:
+                    self.__clone_folder_parallel(meta.get("id"), dir_id, workers)
+                else:
+                    self.__cloneFolder(
+                        meta.get("name"), meta.get("name"), meta.get("id"), dir_id
+                    )
                 durl = self.__G_DRIVE_DIR_BASE_DOWNLOAD_URL.format(dir_id)
                 if self.__is_cancelled:
                     LOGGER.info("Deleting cloned data from Drive...")
                     self.deletefile(durl)
                     return None, None, None, None, None
                 mime_type = "Folder"
-                size = self.__processed_bytes
+                size = self.processed_bytes
             else:
                 file = self.__copyFile(meta.get("id"), gdrive_id, meta.get("name"))
                 msg += f"<b>Name: </b><code>{file.get('name')}</code>"
@@ -524,6 +636,145 @@ class GoogleDriveHelper:
                 break
         return None
 
+    def __create_clone_tree(self, folder_id, dest_id, jobs):
+        for file in self.getFilesByFolderId(folder_id):
+            if self.__is_cancelled:
+                break
+            if file.get("mimeType") == self.__G_DRIVE_DIR_MIME_TYPE:
+                self.__total_folders += 1
+                current_dir_id = self.__create_directory(file.get("name"), dest_id)
+                self.__create_clone_tree(file.get("id"), current_dir_id, jobs)
+            elif (
+                not file.get("name").lower().endswith(tuple(GLOBAL_EXTENSION_FILTER))
+            ):
+                file_name, _ = async_to_sync(
+                    process_file, file.get("name"), self.__user_id, is_mirror=True
+                )
+                jobs.put(
+                    (file.get("id"), dest_id, file_name, int(file.get("size", 0)))
+                )
+
+    def __clone_folder_parallel(self, folder_id, dest_id, workers):
+        jobs = Queue()
+        self.__create_clone_tree(folder_id, dest_id, jobs)
+        if self.__is_cancelled or jobs.empty():
+            return
+        workers = min(workers, -(-jobs.qsize() // CLONE_BATCH_SIZE))
+        LOGGER.info(f"Cloning {jobs.qsize()} files with {workers} workers")
+        self.__lanes = [
+            GoogleDriveHelper(self.name, listener=self.__listener)
+            for _ in range(workers)
+        ]
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = [
+                pool.submit(self.__clone_worker, lane, jobs) for lane in self.__lanes
+            ]
+            done, _ = wait(futures, return_when=FIRST_EXCEPTION)
+            if errors := [f.exception() for f in done if f.exception()]:
+                for lane in self.__lanes:
+                    lane.__is_cancelled = True
+        self.__total_files += sum(lane.__total_files for lane in self.__lanes)
+        if errors:
+            raise errors[0]
+
+    def __clone_worker(self, lane, jobs):
+        while not lane.__is_cancelled:
+            try:
+                batch_jobs = [jobs.get(timeout=1)]
+            except Empty:
+                # a rate limited batch of another lane can still be put back
+                if not jobs.unfinished_tasks:
+                    return
+                continue
+            while len(batch_jobs) < CLONE_BATCH_SIZE:
+                try:
+                    batch_jobs.append(jobs.get_nowait())
+                except Empty:
+                    break
+            try:
+                lane.__copy_batch(batch_jobs, jobs)
+            finally:
+                # retries are queued before their batch is marked done
+                for _ in batch_jobs:
+                    jobs.task_done()
+            self.__total_time = int(time() - self.__start_time)
+
+    def __copy_batch(self, batch_jobs, jobs):
+        retry_jobs = []
+        errors = []
+
+        def callback(request_id, _, exception):
+            job = batch_jobs[int(request_id)]
+            if exception is None:
+                self.__total_files += 1
+                self.__processed_bytes += job[3]
+                return
+            if not isinstance(exception, HttpError):
+                errors.append(exception)
+                return
+            reason = self.__get_error_reason(exception)
+            if reason == "cannotCopyFile":
+                LOGGER.error(exception)
+            elif reason in [
+                "userRateLimitExceeded",
+                "dailyLimitExceeded",
+                "rateLimitExceeded",
+            ] or exception.resp.status in [429, 500, 502, 503, 504]:
+                retry_jobs.append((job, reason))
+            else:
+                errors.append(exception)
+
+        sa_key = self.__sa_index if config_dict["USE_SERVICE_ACCOUNTS"] else "token"
+        get_sa_bucket(sa_key).consume(len(batch_jobs))
+        batch = self.__service.new_batch_http_request(callback=callback)
+        for index, (file_id, dest_id, file_name, _) in enumerate(batch_jobs):
+            batch.add(
+                self.__service.files().copy(
+                    fileId=file_id,
+                    body={"name": file_name, "parents": [dest_id]},
+                    supportsAllDrives=True,
+                    fields="id",
+                ),
+                request_id=str(index),
+            )
+        try:
+            batch.execute()
+        except HttpError as err:
+            if err.resp.status not in [429, 500, 502, 503, 504]:
+                raise err
+            retry_jobs = [(job, None) for job in batch_jobs]
+        if errors:
+            raise errors[0]
+        if not retry_jobs:
+            self.__backoff = 1
+            return
+        reasons = {reason for _, reason in retry_jobs}
+        if {"userRateLimitExceeded", "dailyLimitExceeded"} & reasons:
+            if not config_dict["USE_SERVICE_ACCOUNTS"]:
+                raise Exception(f"Got: {', '.join(filter(None, reasons))}")
+            if self.__sa_count >= self.__sa_number:
+                raise Exception(
+                    f"Reached maximum number of service accounts switching, which is {self.__sa_count}"
+                )
+            self.__switchServiceAccount()
+        else:
+            if self.__backoff > CLONE_MAX_BACKOFF:
+                raise Exception("Drive kept rate limiting the clone, try again later")
+            LOGGER.info(f"Rate limited, backing off {self.__backoff}s")
+            sleep(self.__backoff + randrange(1000) / 1000)
+            self.__backoff *= 2
+        for job, _ in retry_jobs:
+            jobs.put(job)
+
+    @staticmethod
+    def __get_error_reason(err):
+        if not err.resp.get("content-type", "").startswith("application/json"):
+            return None
+        try:
+            return loads(err.content).get("error").get("errors")[0].get("reason")
+        except (JSONDecodeError, AttributeError, IndexError, TypeError):
+            return None
+
     @retry(
         wait=wait_exponential(multiplier=2, min=3, max=6),
         stop=stop_after_attempt(3),
@@ -958,6 +1209,8 @@ class GoogleDriveHelper:
 
     async def cancel_download(self):
         self.__is_cancelled = True
+        for lane in self.__lanes:
+            lane.__is_cancelled = True
         if self.__is_downloading:
             LOGGER.info(f"Cancelling Download: {self.name}")
             await self.__listener.onDownloadError("Download stopped by user!")
@@ -3,11 +3,11 @@ from os import path as ospath
 from os import walk
 from re import match as re_match
 from time import time
-from asyncio import sleep
+from asyncio import Lock, sleep, gather
 from logging import ERROR, getLogger
+from itertools import count
 from traceback import format_exc
 
-from PIL import Image
 from natsort import natsorted
 from tenacity import (
     RetryError,
@@ -37,23 +37,30 @@ from bot import (
     user_data,
     config_dict,
 )
+from bot.helper.ext_utils.metrics import measure_stage
 from bot.helper.aeon_utils.metadata import add_attachment
 from bot.helper.ext_utils.bot_utils import (
     is_mkv,
     is_url,
+    run_cpu,
     sync_to_async,
     is_telegram_link,
     download_image_url,
 )
+from bot.helper.ext_utils.thumbnails import (
+    get_cover_thumb,
+    get_video_thumb,
+    is_cached_thumb,
+)
+from bot.helper.ext_utils.cpu_workers import image_size, convert_image
 from bot.helper.ext_utils.files_utils import (
+    FilePart,
     get_ss,
-    take_ss,
     is_archive,
     process_file,
     get_base_name,
     clean_unwanted,
     get_media_info,
-    get_audio_thumb,
     get_document_type,
     get_mediainfo_link,
 )
@@ -89,6 +96,8 @@ class TgUploader:
         self.__prm_media = False
         self.__client = bot
         self.__up_path = ""
+        self.__part = None
+        self.__parts = {}
         self.__ldump = ""
         self.__mediainfo = False
         self.__as_doc = False
@@ -96,6 +105,12 @@ class TgUploader:
         self.__bot_pm = False
         self.__user_id = listener.message.from_user.id
         self.__leechmsg = {}
+        self.__start_msg_deleted = False
+        self.__lane = False
+        self.__lanes = []
+        self.__prefer_user = False
+        self.__commit_lock = Lock()
+        self.__next_commit = 0
         self.__files_utils = self.__listener.files_utils
         self.__thumb = f"Thumbnails/{listener.message.from_user.id}.jpg"
 
@@ -121,9 +136,7 @@ class TgUploader:
             if not await aiopath.isdir(path):
                 await mkdir(path)
             des_dir = ospath.join(path, f"{time()}.jpg")
-            await sync_to_async(
-                Image.open(photo_dir).convert("RGB").save, des_dir, "JPEG"
-            )
+            await run_cpu(convert_image, photo_dir, des_dir)
             await aioremove(photo_dir)
             return des_dir
         return None
@@ -253,23 +266,14 @@ class TgUploader:
         return True
 
     async def __prepare_file(self, prefile_, dirpath):
-        file_, cap_mono = await process_file(prefile_, self.__user_id, dirpath)
+        with measure_stage(self.__listener.uid, "metadata"):
+            file_, cap_mono = await process_file(
+                prefile_, self.__user_id, dirpath, part=self.__part
+            )
         if (atc := self.__listener.attachment) and is_mkv(prefile_):
             file_ = await add_attachment(prefile_, dirpath, atc)
         if prefile_ != file_:
-            if (
-                self.__listener.seed
-                and not self.__listener.newDir
-                and not dirpath.endswith("/splited_files")
-            ):
-                dirpath = f"{dirpath}/copied"
-                await makedirs(dirpath, exist_ok=True)
-                new_path = ospath.join(dirpath, file_)
-                self.__up_path = await copy(self.__up_path, new_path)
-            else:
-                new_path = ospath.join(dirpath, file_)
-                await aiorename(self.__up_path, new_path)
-                self.__up_path = new_path
+            await self.__move_file(dirpath, file_)
         if len(file_) > 64:
             if is_archive(file_):
                 name = get_base_name(file_)
@@ -286,21 +290,37 @@ class TgUploader:
             extn = len(ext)
             remain = 64 - extn
             name = name[:remain]
-            if (
-                self.__listener.seed
-                and not self.__listener.newDir
-                and not dirpath.endswith("/splited_files")
-            ):
-                dirpath = f"{dirpath}/copied"
-                await makedirs(dirpath, exist_ok=True)
-                new_path = ospath.join(dirpath, f"{name}{ext}")
-                self.__up_path = await copy(self.__up_path, new_path)
-            else:
-                new_path = ospath.join(dirpath, f"{name}{ext}")
-                await aiorename(self.__up_path, new_path)
-                self.__up_path = new_path
+            await self.__move_file(dirpath, f"{name}{ext}")
         return cap_mono, file_
 
+    async def __move_file(self, dirpath, file_):
+        if self.__part is not None:
+            # virtual parts only exist as a name until they are uploaded
+            self.__up_path = ospath.join(dirpath, file_)
+        elif (
+            self.__listener.seed
+            and not self.__listener.newDir
+            and not dirpath.endswith("/splited_files")
+        ):
+            dirpath = f"{dirpath}/copied"
+            await makedirs(dirpath, exist_ok=True)
+            new_path = ospath.join(dirpath, file_)
+            self.__up_path = await copy(self.__up_path, new_path)
+        else:
+            new_path = ospath.join(dirpath, file_)
+            await aiorename(self.__up_path, new_path)
+            self.__up_path = new_path
+
+    async def __file_size(self):
+        if self.__part is not None:
+            return self.__part[2]
+        return await aiopath.getsize(self.__up_path)
+
+    def __document(self):
+        if self.__part is None:
+            return contextlib.nullcontext(self.__up_path)
+        return FilePart(*self.__part, ospath.basename(self.__up_path))
+
     def __get_input_media(self, subkey, key):
         rlist = []
         for msg in self.__media_dict[key][subkey]:
@@ -316,10 +336,29 @@ class TgUploader:
         return rlist
 
     async def __switching_client(self):
+        use_user = IS_PREMIUM_USER and (self.__prm_media or self.__prefer_user)
         LOGGER.info(
-            f"Uploading Media {'>' if self.__prm_media else '<'} 2GB by {'User' if self.__prm_media else 'Bot'} Client"
+            f"Uploading Media {'>' if self.__prm_media else '<'} 2GB by {'User' if use_user else 'Bot'} Client"
         )
-        self.__client = user if (self.__prm_media and IS_PREMIUM_USER) else bot
+        self.__client = user if use_user else bot
+
+    async def __flush_media_groups(self):
+        group_lists = [x for v in self.__media_dict.values() for x in v]
+        if (
+            match := re_match(r".+(?=\.0*\d+$)|.+(?=\.part\d+\..+)", self.__up_path)
+        ) and match.group(0) not in group_lists:
+            for key, value in list(self.__media_dict.items()):
+                for subkey, msgs in list(value.items()):
+                    if len(msgs) > 1:
+                        await self.__send_media_group(subkey, key, msgs)
+
+    async def __delete_start_msg(self):
+        if self.__start_msg_deleted:
+            return
+        values_list = list(self.__leechmsg.values())
+        if values_list:
+            await delete_message(values_list[0])
+        self.__start_msg_deleted = True
 
     async def __send_media_group(self, subkey, key, msgs):
         msgs_list = await msgs[0].reply_to_message.reply_media_group(
@@ -361,96 +400,25 @@ class TgUploader:
             if not self.__is_cancelled:
                 LOGGER.error(f"Failed To Send in {destination}:\n{err!s}")
 
-    async def upload(self, o_files, m_size, size):
+    async def upload(self, o_files, m_size, size, files=None):
         await self.__user_settings()
         res = await self.__msg_to_reply()
         if not res:
             return
-        isDeleted = False
-        for dirpath, _, files in sorted(await sync_to_async(walk, self.__path)):
-            if dirpath.endswith("/yt-dlp-thumb"):
-                continue
-            for file_ in natsorted(files):
-                self.__up_path = ospath.join(dirpath, file_)
-                if file_.lower().endswith(tuple(GLOBAL_EXTENSION_FILTER)):
-                    await aioremove(self.__up_path)
-                    continue
-                try:
-                    f_size = await aiopath.getsize(self.__up_path)
-                    if (
-                        self.__listener.seed
-                        and file_ in o_files
-                        and f_size in m_size
-                    ):
-                        continue
-                    self.__total_files += 1
-                    if f_size == 0:
-                        LOGGER.error(
-                            f"{self.__up_path} size is zero, telegram don't upload zero size files"
-                        )
-                        self.__corrupted += 1
-                        continue
-                    if self.__is_cancelled:
-                        return
-                    self.__prm_media = f_size > 2097152000
-                    cap_mono, file_ = await self.__prepare_file(file_, dirpath)
-                    if self.__last_msg_in_group:
-                        group_lists = [
-                            x for v in self.__media_dict.values() for x in v
-                        ]
-                        if (
-                            match := re_match(
-                                r".+(?=\.0*\d+$)|.+(?=\.part\d+\..+)", self.__up_path
-                            )
-                        ) and match.group(0) not in group_lists:
-                            for key, value in list(self.__media_dict.items()):
-                                for subkey, msgs in list(value.items()):
-                                    if len(msgs) > 1:
-                                        await self.__send_media_group(
-                                            subkey, key, msgs
-                                        )
-                    self.__last_msg_in_group = False
-                    self.__last_uploaded = 0
-                    await self.__switching_client()
-                    await self.__upload_file(cap_mono, file_)
-                    if not isDeleted:
-                        values_list = list(self.__leechmsg.values())
-                        if values_list:
-                            await delete_message(values_list[0])
-                        isDeleted = True
-                    if self.__is_cancelled:
-                        return
-                    if not self.__is_corrupted and (
-                        self.__listener.isSuperGroup or config_dict["LEECH_DUMP_ID"]
-                    ):
-                        self.__msgs_dict[self.__sent_msg.link] = file_
-                    await sleep(1)
-                except Exception as err:
-                    if isinstance(err, RetryError):
-                        LOGGER.info(
-                            f"Total Attempts: {err.last_attempt.attempt_number}"
-                        )
-                    else:
-                        LOGGER.error(f"{format_exc()}. Path: {self.__up_path}")
-                    if self.__is_cancelled:
-                        return
-                    continue
-                finally:
-                    if (
-                        not self.__is_cancelled
-                        and await aiopath.exists(self.__up_path)
-                        and (
-                            not self.__listener.seed
-                            or self.__listener.newDir
-                            or dirpath.endswith("/splited_files")
-                            or "/copied/" in self.__up_path
-                        )
-                    ):
-                        await aioremove(self.__up_path)
+        source = self.__stream_files(files) if files else self.__walk_files()
+        workers = config_dict["LEECH_UPLOAD_WORKERS"]
+        if workers and workers > 1:
+            await self.__upload_concurrently(workers, source, o_files, m_size)
+        else:
+            await self.__upload_serially(source, o_files, m_size)
+        if self.__is_cancelled:
+            return
         for key, value in list(self.__media_dict.items()):
             for subkey, msgs in list(value.items()):
                 if len(msgs) > 1:
                     await self.__send_media_group(subkey, key, msgs)
+        # lanes reply to the start message, so it stays until they are done
+        await self.__delete_start_msg()
         if self.__is_cancelled:
             return
         if self.__listener.seed and not self.__listener.newDir:
@@ -475,6 +443,191 @@ class TgUploader:
             self.name,
         )
 
+    async def __walk_files(self):
+        for dirpath, _, files in sorted(await sync_to_async(walk, self.__path)):
+            if dirpath.endswith("/yt-dlp-thumb"):
+                continue
+            for file_ in natsorted(files):
+                f_path = ospath.join(dirpath, file_)
+                if parts := self.__listener.virtual_parts.get(f_path):
+                    for part, offset, length in parts:
+                        self.__parts[ospath.join(dirpath, part)] = (
+                            f_path,
+                            offset,
+                            length,
+                        )
+                        yield dirpath, part
+                    continue
+                yield dirpath, file_
+
+    @staticmethod
+    async def __stream_files(files):
+        while (item := await files.get()) is not None:
+            yield item
+
+    async def __upload_serially(self, source, o_files, m_size):
+        async for dirpath, file_ in source:
+            self.__up_path = ospath.join(dirpath, file_)
+            self.__part = self.__parts.get(self.__up_path)
+            if file_.lower().endswith(tuple(GLOBAL_EXTENSION_FILTER)):
+                await aioremove(self.__up_path)
+                continue
+            try:
+                f_size = await self.__file_size()
+                if (
+                    self.__listener.seed
+                    and file_ in o_files
+                    and f_size in m_size
+                ):
+                    continue
+                self.__total_files += 1
+                if f_size == 0:
+                    LOGGER.error(
+                        f"{self.__up_path} size is zero, telegram don't upload zero size files"
+                    )
+                    self.__corrupted += 1
+                    continue
+                if self.__is_cancelled:
+                    return
+                self.__prm_media = f_size > 2097152000
+                cap_mono, file_ = await self.__prepare_file(file_, dirpath)
+                if self.__last_msg_in_group:
+                    await self.__flush_media_groups()
+                self.__last_msg_in_group = False
+                self.__last_uploaded = 0
+                await self.__switching_client()
+                await self.__upload_file(cap_mono, file_)
+                await self.__delete_start_msg()
+                if self.__is_cancelled:
+                    return
+                if not self.__is_corrupted and (
+                    self.__listener.isSuperGroup or config_dict["LEECH_DUMP_ID"]
+                ):
+                    self.__msgs_dict[self.__sent_msg.link] = file_
+                await sleep(1)
+            except Exception as err:
+                if isinstance(err, RetryError):
+                    LOGGER.info(
+                        f"Total Attempts: {err.last_attempt.attempt_number}"
+                    )
+                else:
+                    LOGGER.error(f"{format_exc()}. Path: {self.__up_path}")
+                if self.__is_cancelled:
+                    return
+                continue
+            finally:
+                if (
+                    not self.__is_cancelled
+                    and await aiopath.exists(self.__up_path)
+                    and (
+                        not self.__listener.seed
+                        or self.__listener.newDir
+                        or dirpath.endswith("/splited_files")
+                        or "/copied/" in self.__up_path
+                    )
+                ):
+                    await aioremove(self.__up_path)
+
+    def __new_lane(self, index):
+        lane = TgUploader(self.name, self.__path, self.__listener)
+        lane.__lane = True
+        lane.__prefer_user = bool(index % 2)
+        lane.__as_doc = self.__as_doc
+        lane.__mediainfo = self.__mediainfo
+        lane.__has_buttons = self.__has_buttons
+        lane.__leechmsg = self.__leechmsg
+        lane.__thumb = self.__thumb
+        return lane
+
+    async def __upload_concurrently(self, workers, source, o_files, m_size):
+        self.__lanes = [self.__new_lane(i) for i in range(workers)]
+        fetch_lock = Lock()
+        indexes = count()
+        results = {}
+        # a reply chain would serialize the lanes, they all answer the start
+        # message instead and only the bookkeeping below keeps file order
+        anchor = self.__sent_msg
+
+        async def worker(lane):
+            while not self.__is_cancelled:
+                async with fetch_lock:
+                    if (item := await anext(source, None)) is None:
+                        break
+                    index = next(indexes)
+                dirpath, file_ = item
+                results[index] = await self.__lane_upload(
+                    lane, anchor, dirpath, file_, o_files, m_size
+                )
+                await self.__commit_uploads(results)
+
+        await gather(*(worker(lane) for lane in self.__lanes))
+
+    async def __lane_upload(self, lane, anchor, dirpath, file_, o_files, m_size):
+        lane.__up_path = ospath.join(dirpath, file_)
+        lane.__part = self.__parts.get(lane.__up_path)
+        try:
+            if file_.lower().endswith(tuple(GLOBAL_EXTENSION_FILTER)):
+                await aioremove(lane.__up_path)
+                return None
+            f_size = await lane.__file_size()
+            if self.__listener.seed and file_ in o_files and f_size in m_size:
+                return None
+            self.__total_files += 1
+            if f_size == 0:
+                LOGGER.error(
+                    f"{lane.__up_path} size is zero, telegram don't upload zero size files"
+                )
+                self.__corrupted += 1
+                return None
+            if self.__is_cancelled:
+                return None
+            lane.__prm_media = f_size > 2097152000
+            cap_mono, file_ = await lane.__prepare_file(file_, dirpath)
+            lane.__last_uploaded = 0
+            lane.__sent_msg = anchor
+            await lane.__switching_client()
+            await lane.__upload_file(cap_mono, file_)
+            if lane.__is_cancelled or lane.__sent_msg is anchor:
+                return None
+            return lane.__sent_msg, file_, lane.__up_path
+        except Exception as err:
+            if isinstance(err, RetryError):
+                LOGGER.info(f"Total Attempts: {err.last_attempt.attempt_number}")
+            else:
+                LOGGER.error(f"{format_exc()}. Path: {lane.__up_path}")
+            return None
+        finally:
+            if (
+                not self.__is_cancelled
+                and await aiopath.exists(lane.__up_path)
+                and (
+                    not self.__listener.seed
+                    or self.__listener.newDir
+                    or dirpath.endswith("/splited_files")
+                    or "/copied/" in lane.__up_path
+                )
+            ):
+                await aioremove(lane.__up_path)
+
+    async def __commit_uploads(self, results):
+        async with self.__commit_lock:
+            while self.__next_commit in results:
+                result = results.pop(self.__next_commit)
+                self.__next_commit += 1
+                if result is None or self.__is_cancelled:
+                    continue
+                sent_msg, file_, self.__up_path = result
+                try:
+                    if self.__last_msg_in_group:
+                        await self.__flush_media_groups()
+                    self.__last_msg_in_group = False
+                    self.__sent_msg = sent_msg
+                    await self.__finalize_upload()
+                    if self.__listener.isSuperGroup or config_dict["LEECH_DUMP_ID"]:
+                        self.__msgs_dict[self.__sent_msg.link] = file_
+                except Exception:
+                    LOGGER.error(f"{format_exc()}. Path: {self.__up_path}")
+
     @retry(
         wait=wait_exponential(multiplier=2, min=4, max=8),
         stop=stop_after_attempt(3),
@@ -486,7 +639,12 @@ class TgUploader:
         thumb = self.__thumb
         self.__is_corrupted = False
         try:
-            is_video, is_audio, is_image = await get_document_type(self.__up_path)
+            if self.__part is not None:
+                is_video, is_audio, is_image = False, False, False
+            else:
+                is_video, is_audio, is_image = await get_document_type(
+                    self.__up_path
+                )
 
             if self.__files_utils["thumb"]:
                 thumb = await self.get_custom_thumb(self.__files_utils["thumb"])
@@ -496,7 +654,8 @@ class TgUploader:
                 if await aiopath.isfile(thumb_path):
                     thumb = thumb_path
                 elif is_audio and not is_video:
-                    thumb = await get_audio_thumb(self.__up_path)
+                    with measure_stage(self.__listener.uid, "thumbnail"):
+                        thumb = await get_cover_thumb(self.__up_path)
 
             if (
                 self.__as_doc
@@ -505,23 +664,29 @@ class TgUploader:
             ):
                 key = "documents"
                 if is_video and thumb is None:
-                    thumb = await take_ss(self.__up_path, None)
+                    with measure_stage(self.__listener.uid, "thumbnail"):
+                        thumb = await get_video_thumb(self.__up_path)
                 if self.__is_cancelled:
                     return None
-                buttons = await self.__buttons(self.__up_path, is_video)
-                nrml_media = await self.__client.send_document(
-                    chat_id=self.__sent_msg.chat.id,
-                    reply_to_message_id=self.__sent_msg.id,
-                    document=self.__up_path,
-                    thumb=thumb,
-                    caption=cap_mono,
-                    force_document=True,
-                    disable_notification=True,
-                    progress=self.__upload_progress,
-                    reply_markup=buttons,
+                buttons = await self.__buttons(
+                    self.__part[0] if self.__part else self.__up_path, is_video
                 )
+                with self.__document() as document:
+                    nrml_media = await self.__client.send_document(
+                        chat_id=self.__sent_msg.chat.id,
+                        reply_to_message_id=self.__sent_msg.id,
+                        document=document,
+                        thumb=thumb,
+                        caption=cap_mono,
+                        force_document=True,
+                        disable_notification=True,
+                        progress=self.__upload_progress,
+                        reply_markup=buttons,
+                    )
 
-                if self.__prm_media and (self.__has_buttons or not self.__leechmsg):
+                if self.__client != bot and (
+                    self.__has_buttons or not self.__leechmsg
+                ):
                     try:
                         self.__sent_msg = await bot.copy_message(
                             nrml_media.chat.id,
@@ -540,10 +705,10 @@ class TgUploader:
                 key = "videos"
                 duration = (await get_media_info(self.__up_path))[0]
                 if thumb is None:
-                    thumb = await take_ss(self.__up_path, duration)
+                    with measure_stage(self.__listener.uid, "thumbnail"):
+                        thumb = await get_video_thumb(self.__up_path, duration)
                 if thumb is not None:
-                    with Image.open(thumb) as img:
-                        width, height = img.size
+                    width, height = await run_cpu(image_size, thumb)
                 else:
                     width = 480
                     height = 320
@@ -581,7 +746,9 @@ class TgUploader:
                     progress=self.__upload_progress,
                     reply_markup=buttons,
                 )
-                if self.__prm_media and (self.__has_buttons or not self.__leechmsg):
+                if self.__client != bot and (
+                    self.__has_buttons or not self.__leechmsg
+                ):
                     try:
                         self.__sent_msg = await bot.copy_message(
                             nrml_media.chat.id,
@@ -628,30 +795,13 @@ class TgUploader:
                     reply_markup=await self.__buttons(self.__up_path),
                 )
 
-            if (
-                not self.__is_cancelled
-                and self.__media_group
-                and (self.__sent_msg.video or self.__sent_msg.document)
-            ):
-                key = "documents" if self.__sent_msg.document else "videos"
-                if match := re_match(
-                    r".+(?=\.0*\d+$)|.+(?=\.part\d+\..+)", self.__up_path
-                ):
-                    pname = match.group(0)
-                    if pname in self.__media_dict[key]:
-                        self.__media_dict[key][pname].append(self.__sent_msg)
-                    else:
-                        self.__media_dict[key][pname] = [self.__sent_msg]
-                    msgs = self.__media_dict[key][pname]
-                    if len(msgs) == 10:
-                        await self.__send_media_group(pname, key, msgs)
-                    else:
-                        self.__last_msg_in_group = True
-            await self.__copy_file()
+            if not self.__lane:
+                await self.__finalize_upload()
 
             if (
                 self.__thumb is None
                 and thumb is not None
+                and not is_cached_thumb(thumb)
                 and await aiopath.exists(thumb)
             ):
                 await aioremove(thumb)
@@ -662,6 +812,7 @@ class TgUploader:
             if (
                 self.__thumb is None
                 and thumb is not None
+                and not is_cached_thumb(thumb)
                 and await aiopath.exists(thumb)
             ):
                 await aioremove(thumb)
@@ -671,18 +822,44 @@ class TgUploader:
                 return await self.__upload_file(cap_mono, file, True)
             raise err
 
+    async def __finalize_upload(self):
+        if (
+            not self.__is_cancelled
+            and self.__media_group
+            and (self.__sent_msg.video or self.__sent_msg.document)
+        ):
+            key = "documents" if self.__sent_msg.document else "videos"
+            if match := re_match(
+                r".+(?=\.0*\d+$)|.+(?=\.part\d+\..+)", self.__up_path
+            ):
+                pname = match.group(0)
+                if pname in self.__media_dict[key]:
+                    self.__media_dict[key][pname].append(self.__sent_msg)
+                else:
+                    self.__media_dict[key][pname] = [self.__sent_msg]
+                msgs = self.__media_dict[key][pname]
+                if len(msgs) == 10:
+                    await self.__send_media_group(pname, key, msgs)
+                else:
+                    self.__last_msg_in_group = True
+        await self.__copy_file()
+
     @property
     def speed(self):
         try:
-            return self.__processed_bytes / (time() - self.__start_time)
+            return self.processed_bytes / (time() - self.__start_time)
         except Exception:
             return 0
 
     @property
     def processed_bytes(self):
-        return self.__processed_bytes
+        return self.__processed_bytes + sum(
+            lane.processed_bytes for lane in self.__lanes
+        )
 
     async def cancel_download(self):
         self.__is_cancelled = True
+        for lane in self.__lanes:
+            lane.__is_cancelled = True
         LOGGER.info(f"Cancelling Upload: {self.name}")
         await self.__listener.onUploadError("Cancelled by user!")
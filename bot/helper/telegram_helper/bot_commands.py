@@ -25,6 +25,7 @@ class _BotCommands:
         self.StatsCommand = [f"stats{i}", "statsall"]
         self.HelpCommand = f"help{i}"
         self.LogCommand = f"log{i}"
+        self.ProfileCommand = f"profile{i}"
         self.ShellCommand = f"shell{i}"
         self.EvalCommand = f"eval{i}"
         self.ExecCommand = f"exec{i}"
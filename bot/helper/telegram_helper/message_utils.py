@@ -1,7 +1,7 @@
 from re import match as re_match
 from time import time
 from random import choice
-from asyncio import sleep
+from asyncio import sleep, gather
 from traceback import format_exc
 
 from aiofiles.os import remove as aioremove
@@ -34,11 +34,14 @@ from bot.helper.ext_utils.bot_utils import (
     SetInterval,
     sync_to_async,
     download_image_url,
+    get_status_snapshot,
     get_readable_message,
 )
 from bot.helper.ext_utils.exceptions import TgLinkError
 from bot.helper.telegram_helper.button_build import ButtonMaker
 
+status_edit_after = {}
+
 
 async def send_message(message, text, buttons=None, photo=None):
     try:
@@ -308,6 +311,31 @@ async def get_tg_link_content(link):
     raise TgLinkError("Bot can't download from GROUPS without joining!")
 
 
+async def __render_status():
+    async with download_dict_lock:
+        snapshot = get_status_snapshot()
+    return await sync_to_async(get_readable_message, snapshot, purpose="cpu")
+
+
+async def __edit_status(chat_id, message, text, buttons):
+    if time() < status_edit_after.get(chat_id, 0):
+        return None
+    try:
+        await message.edit(
+            text=text, disable_web_page_preview=True, reply_markup=buttons
+        )
+    except FloodWait as f:
+        LOGGER.warning(f"Status message in {chat_id}: {f}")
+        status_edit_after[chat_id] = time() + f.value * 1.2
+        return None
+    except (MessageNotModified, MessageEmpty):
+        pass
+    except Exception as e:
+        LOGGER.error(str(e))
+        return str(e)
+    return text
+
+
 async def update_all_messages(force=False):
     async with status_reply_dict_lock:
         if (
@@ -318,29 +346,38 @@ async def update_all_messages(force=False):
             return
         for chat_id in list(status_reply_dict.keys()):
             status_reply_dict[chat_id][1] = time()
-    async with download_dict_lock:
-        msg, buttons = await sync_to_async(get_readable_message)
+    msg, buttons = await __render_status()
     if msg is None:
         return
     async with status_reply_dict_lock:
-        for chat_id in list(status_reply_dict.keys()):
-            if (
-                status_reply_dict[chat_id]
-                and msg != status_reply_dict[chat_id][0].text
-            ):
-                rmsg = await edit_message(
-                    status_reply_dict[chat_id][0], msg, buttons
-                )
-                if isinstance(rmsg, str) and rmsg.startswith("Telegram says: [400"):
-                    del status_reply_dict[chat_id]
-                    continue
-                status_reply_dict[chat_id][0].text = msg
-                status_reply_dict[chat_id][1] = time()
+        targets = {
+            chat_id: data[0]
+            for chat_id, data in status_reply_dict.items()
+            if data and msg != data[0].text
+        }
+    if not targets:
+        return
+    results = await gather(
+        *(
+            __edit_status(chat_id, message, msg, buttons)
+            for chat_id, message in targets.items()
+        )
+    )
+    async with status_reply_dict_lock:
+        for (chat_id, message), result in zip(targets.items(), results):
+            data = status_reply_dict.get(chat_id)
+            if result is None or not data or data[0] is not message:
+                continue
+            if result.startswith("Telegram says: [400"):
+                del status_reply_dict[chat_id]
+                status_edit_after.pop(chat_id, None)
+                continue
+            message.text = msg
+            data[1] = time()
 
 
 async def sendStatusMessage(msg):
-    async with download_dict_lock:
-        progress, buttons = await sync_to_async(get_readable_message)
+    progress, buttons = await __render_status()
     if progress is None:
         return
     async with status_reply_dict_lock:
@@ -352,6 +389,7 @@ async def sendStatusMessage(msg):
         message = await send_message(msg, progress, buttons)
         message.text = progress
         status_reply_dict[chat_id] = [message, time()]
+        status_edit_after.pop(chat_id, None)
         if not Interval:
             Interval.append(SetInterval(1, update_all_messages))
 
@@ -52,11 +52,15 @@ default_values = {
     "SEARCH_LIMIT": 0,
     "UPSTREAM_BRANCH": "main",
     "TORRENT_TIMEOUT": 3000,
+    "LOOP_PROFILER_THRESHOLD": 200,
 }
 bool_vars = [
     "AS_DOCUMENT",
     "DELETE_LINKS",
     "STOP_DUPLICATE",
+    "QUEUE_SJF",
+    "LEECH_VIRTUAL_SPLIT",
+    "LOOP_PROFILER",
     "SET_COMMANDS",
     "SHOW_MEDIAINFO",
     "USE_SERVICE_ACCOUNTS",
@@ -208,6 +212,12 @@ async def load_config():
     QUEUE_UPLOAD = environ.get("QUEUE_UPLOAD", "")
     QUEUE_UPLOAD = "" if len(QUEUE_UPLOAD) == 0 else int(QUEUE_UPLOAD)
 
+    QUEUE_DISK = environ.get("QUEUE_DISK", "")
+    QUEUE_DISK = "" if len(QUEUE_DISK) == 0 else int(QUEUE_DISK)
+
+    QUEUE_SJF = environ.get("QUEUE_SJF", "")
+    QUEUE_SJF = QUEUE_SJF.lower() == "true"
+
     STREAMWISH_API = environ.get("STREAMWISH_API", "")
     if len(STREAMWISH_API) == 0:
         STREAMWISH_API = ""
@@ -215,6 +225,14 @@ async def load_config():
     STOP_DUPLICATE = environ.get("STOP_DUPLICATE", "")
     STOP_DUPLICATE = STOP_DUPLICATE.lower() == "true"
 
+    LOOP_PROFILER = environ.get("LOOP_PROFILER", "")
+    LOOP_PROFILER = LOOP_PROFILER.lower() == "true"
+
+    LOOP_PROFILER_THRESHOLD = environ.get("LOOP_PROFILER_THRESHOLD", "")
+    LOOP_PROFILER_THRESHOLD = (
+        200 if len(LOOP_PROFILER_THRESHOLD) == 0 else int(LOOP_PROFILER_THRESHOLD)
+    )
+
     USE_SERVICE_ACCOUNTS = environ.get("USE_SERVICE_ACCOUNTS", "")
     USE_SERVICE_ACCOUNTS = USE_SERVICE_ACCOUNTS.lower() == "true"
 
@@ -227,6 +245,29 @@ async def load_config():
     MEDIA_GROUP = environ.get("MEDIA_GROUP", "")
     MEDIA_GROUP = MEDIA_GROUP.lower() == "true"
 
+    LEECH_UPLOAD_WORKERS = environ.get("LEECH_UPLOAD_WORKERS", "")
+    LEECH_UPLOAD_WORKERS = (
+        "" if len(LEECH_UPLOAD_WORKERS) == 0 else int(LEECH_UPLOAD_WORKERS)
+    )
+
+    LEECH_PIPELINE_BUFFER = environ.get("LEECH_PIPELINE_BUFFER", "")
+    LEECH_PIPELINE_BUFFER = (
+        "" if len(LEECH_PIPELINE_BUFFER) == 0 else int(LEECH_PIPELINE_BUFFER)
+    )
+
+    LEECH_VIRTUAL_SPLIT = environ.get("LEECH_VIRTUAL_SPLIT", "")
+    LEECH_VIRTUAL_SPLIT = LEECH_VIRTUAL_SPLIT.lower() == "true"
+
+    TG_DOWNLOAD_WORKERS = environ.get("TG_DOWNLOAD_WORKERS", "")
+    TG_DOWNLOAD_WORKERS = (
+        "" if len(TG_DOWNLOAD_WORKERS) == 0 else int(TG_DOWNLOAD_WORKERS)
+    )
+
+    DIRECT_DOWNLOAD_WORKERS = environ.get("DIRECT_DOWNLOAD_WORKERS", "")
+    DIRECT_DOWNLOAD_WORKERS = (
+        "" if len(DIRECT_DOWNLOAD_WORKERS) == 0 else int(DIRECT_DOWNLOAD_WORKERS)
+    )
+
     await (await create_subprocess_exec("pkill", "-9", "-f", "gunicorn")).wait()
     BASE_URL = environ.get("BASE_URL", "").rstrip("/")
     if len(BASE_URL) == 0:
@@ -256,9 +297,19 @@ async def load_config():
     GDRIVE_LIMIT = environ.get("GDRIVE_LIMIT", "")
     GDRIVE_LIMIT = "" if len(GDRIVE_LIMIT) == 0 else float(GDRIVE_LIMIT)
 
+    GDRIVE_UPLOAD_WORKERS = environ.get("GDRIVE_UPLOAD_WORKERS", "")
+    GDRIVE_UPLOAD_WORKERS = (
+        "" if len(GDRIVE_UPLOAD_WORKERS) == 0 else int(GDRIVE_UPLOAD_WORKERS)
+    )
+
     CLONE_LIMIT = environ.get("CLONE_LIMIT", "")
     CLONE_LIMIT = "" if len(CLONE_LIMIT) == 0 else float(CLONE_LIMIT)
 
+    GDRIVE_CLONE_WORKERS = environ.get("GDRIVE_CLONE_WORKERS", "")
+    GDRIVE_CLONE_WORKERS = (
+        "" if len(GDRIVE_CLONE_WORKERS) == 0 else int(GDRIVE_CLONE_WORKERS)
+    )
+
     MEGA_LIMIT = environ.get("MEGA_LIMIT", "")
     MEGA_LIMIT = "" if len(MEGA_LIMIT) == 0 else float(MEGA_LIMIT)
 
@@ -365,8 +416,15 @@ async def load_config():
             "EXTENSION_FILTER": EXTENSION_FILTER,
             "ATTACHMENT_URL": ATTACHMENT_URL,
             "GDRIVE_ID": GDRIVE_ID,
+            "GDRIVE_UPLOAD_WORKERS": GDRIVE_UPLOAD_WORKERS,
+            "GDRIVE_CLONE_WORKERS": GDRIVE_CLONE_WORKERS,
             "INDEX_URL": INDEX_URL,
             "LEECH_LOG_ID": LEECH_LOG_ID,
+            "LEECH_UPLOAD_WORKERS": LEECH_UPLOAD_WORKERS,
+            "LEECH_PIPELINE_BUFFER": LEECH_PIPELINE_BUFFER,
+            "LEECH_VIRTUAL_SPLIT": LEECH_VIRTUAL_SPLIT,
+            "TG_DOWNLOAD_WORKERS": TG_DOWNLOAD_WORKERS,
+            "DIRECT_DOWNLOAD_WORKERS": DIRECT_DOWNLOAD_WORKERS,
             "TOKEN_TIMEOUT": TOKEN_TIMEOUT,
             "MEDIA_GROUP": MEDIA_GROUP,
             "MEGA_EMAIL": MEGA_EMAIL,
@@ -376,6 +434,8 @@ async def load_config():
             "QUEUE_ALL": QUEUE_ALL,
             "QUEUE_DOWNLOAD": QUEUE_DOWNLOAD,
             "QUEUE_UPLOAD": QUEUE_UPLOAD,
+            "QUEUE_DISK": QUEUE_DISK,
+            "QUEUE_SJF": QUEUE_SJF,
             "RCLONE_FLAGS": RCLONE_FLAGS,
             "RCLONE_PATH": RCLONE_PATH,
             "SEARCH_API_LINK": SEARCH_API_LINK,
@@ -383,6 +443,8 @@ async def load_config():
             "SET_COMMANDS": SET_COMMANDS,
             "SHOW_MEDIAINFO": SHOW_MEDIAINFO,
             "STOP_DUPLICATE": STOP_DUPLICATE,
+            "LOOP_PROFILER": LOOP_PROFILER,
+            "LOOP_PROFILER_THRESHOLD": LOOP_PROFILER_THRESHOLD,
             "STREAMWISH_API": STREAMWISH_API,
             "TELEGRAM_API": TELEGRAM_API,
             "TELEGRAM_HASH": TELEGRAM_HASH,
@@ -518,7 +580,12 @@ async def edit_variable(_, message, pre_message, key):
         await DbManager().update_config({key: value})
     if key == "SEARCH_API_LINK":
         await initiate_search_tools()
-    elif key in ["QUEUE_ALL", "QUEUE_DOWNLOAD", "QUEUE_UPLOAD"]:
+    elif key in [
+        "QUEUE_ALL",
+        "QUEUE_DOWNLOAD",
+        "QUEUE_UPLOAD",
+        "QUEUE_DISK",
+    ]:
         await start_from_queued()
 
 
@@ -694,7 +761,12 @@ async def edit_bot_settings(client, query):
             await DbManager().update_config({data[2]: value})
         if data[2] == "SEARCH_API_LINK":
             await initiate_search_tools()
-        elif data[2] in ["QUEUE_ALL", "QUEUE_DOWNLOAD", "QUEUE_UPLOAD"]:
+        elif data[2] in [
+            "QUEUE_ALL",
+            "QUEUE_DOWNLOAD",
+            "QUEUE_UPLOAD",
+            "QUEUE_DISK",
+        ]:
             await start_from_queued()
     elif data[1] == "private":
         handler_dict[message.chat.id] = False
@@ -187,7 +187,9 @@ async def gdcloneNode(message, link, listen_up):
             message, f"<b>Processing Link:</b> <code>{link}</code>"
         )
         try:
-            link = await sync_to_async(direct_link_generator, link)
+            link = await sync_to_async(
+                direct_link_generator, link, purpose="transfer"
+            )
             LOGGER.info(f"Generated link: {link}")
             await edit_message(
                 process_msg, f"<b>Generated Link:</b> <code>{link}</code>"
@@ -202,7 +204,9 @@ async def gdcloneNode(message, link, listen_up):
         await delete_message(process_msg)
     if is_gdrive_link(link):
         gd = GoogleDriveHelper()
-        name, mime_type, size, files, _ = await sync_to_async(gd.count, link)
+        name, mime_type, size, files, _ = await sync_to_async(
+            gd.count, link, purpose="transfer"
+        )
         if mime_type is None:
             await send_message(message, name)
             return
@@ -232,7 +236,7 @@ async def gdcloneNode(message, link, listen_up):
         if files <= 20:
             msg = await send_message(message, f"<b>Cloning:</b> <code>{link}</code>")
             link, size, mime_type, files, folders = await sync_to_async(
-                drive.clone, link, listener.drive_id
+                drive.clone, link, listener.drive_id, purpose="transfer"
             )
             await delete_message(msg)
         else:
@@ -243,7 +247,7 @@ async def gdcloneNode(message, link, listen_up):
                 )
             await sendStatusMessage(message)
             link, size, mime_type, files, folders = await sync_to_async(
-                drive.clone, link, listener.drive_id
+                drive.clone, link, listener.drive_id, purpose="transfer"
             )
         if not link:
             return
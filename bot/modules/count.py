@@ -43,7 +43,9 @@ async def countNode(_, message):
     if is_gdrive_link(link):
         msg = await send_message(message, f"<b>Counting:</b> <code>{link}</code>")
         gd = GoogleDriveHelper()
-        name, mime_type, size, files, folders = await sync_to_async(gd.count, link)
+        name, mime_type, size, files, folders = await sync_to_async(
+            gd.count, link, purpose="transfer"
+        )
         if mime_type is None:
             await send_message(message, name)
             await delete_message(msg)
@@ -1,7 +1,6 @@
 from os import path as ospath
 from os import getcwd
 from re import search as re_search
-from shlex import split as ssplit
 
 import aiohttp
 from aiofiles import open as aiopen
@@ -12,7 +11,7 @@ from pyrogram.filters import command
 from pyrogram.handlers import MessageHandler
 
 from bot import LOGGER, bot
-from bot.helper.ext_utils.bot_utils import cmd_exec
+from bot.helper.ext_utils.media_probe import probe_save, probe_lookup, get_mediainfo
 from bot.helper.telegram_helper.filters import CustomFilters
 from bot.helper.ext_utils.telegraph_helper import telegraph
 from bot.helper.telegram_helper.bot_commands import BotCommands
@@ -23,6 +22,7 @@ section_dict = {"General", "Video", "Audio", "Text", "Menu"}
 
 async def gen_mediainfo(message, link=None, media=None, msg=None):
     temp_send = await send_message(message, "Generating MediaInfo...")
+    stdout = None
     try:
         path = "Mediainfo/"
         if not await aiopath.isdir(path):
@@ -44,14 +44,19 @@ async def gen_mediainfo(message, link=None, media=None, msg=None):
                     break
         elif media:
             des_path = ospath.join(path, media.file_name)
-            if media.file_size <= 50000000:
-                await msg.download(ospath.join(getcwd(), des_path))
-            else:
-                async for chunk in bot.stream_media(media, limit=5):
-                    async with aiopen(des_path, "ab") as f:
-                        await f.write(chunk)
+            cache_key = f"mediainfo:tg:{media.file_unique_id}"
+            if (stdout := await probe_lookup(cache_key)) is None:
+                if media.file_size <= 50000000:
+                    await msg.download(ospath.join(getcwd(), des_path))
+                else:
+                    async for chunk in bot.stream_media(media, limit=5):
+                        async with aiopen(des_path, "ab") as f:
+                            await f.write(chunk)
 
-        stdout, _, _ = await cmd_exec(ssplit(f'mediainfo "{des_path}"'))
+        if stdout is None:
+            stdout = await get_mediainfo(des_path)
+            if media and stdout:
+                await probe_save(cache_key, stdout)
         tc = f"<h4>{ospath.basename(des_path)}</h4><br><br>"
         if stdout:
             tc += parseinfo(stdout)
@@ -60,7 +65,8 @@ async def gen_mediainfo(message, link=None, media=None, msg=None):
         LOGGER.error(e)
         await edit_message(temp_send, f"MediaInfo stopped due to {e!s}")
     finally:
-        await aioremove(des_path)
+        if await aiopath.exists(des_path):
+            await aioremove(des_path)
 
     link_id = (await telegraph.create_page(title="MediaInfo", content=tc))["path"]
     await temp_send.edit(
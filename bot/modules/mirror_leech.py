@@ -54,13 +54,11 @@ from bot.helper.mirror_leech_utils.download_utils.rclone_download import (
 )
 from bot.helper.mirror_leech_utils.download_utils.direct_downloader import (
     add_direct_download,
+    resolve_direct_link,
 )
 from bot.helper.mirror_leech_utils.download_utils.telegram_download import (
     TelegramDownloadHelper,
 )
-from bot.helper.mirror_leech_utils.download_utils.direct_link_generator import (
-    direct_link_generator,
-)
 
 
 @new_task
@@ -334,7 +332,7 @@ async def _mirror_leech(
                 message, f"<b>Processing:</b> <code>{link}</code>"
             )
             try:
-                link = await sync_to_async(direct_link_generator, link)
+                link = await resolve_direct_link(link)
                 if isinstance(link, tuple):
                     link, headers = link
                 elif isinstance(link, str):
@@ -3,7 +3,11 @@ from pyrogram.filters import command
 from pyrogram.handlers import MessageHandler
 
 from bot import LOGGER, bot
-from bot.helper.ext_utils.bot_utils import new_task, get_readable_file_size
+from bot.helper.ext_utils.bot_utils import (
+    new_task,
+    sync_to_async,
+    get_readable_file_size,
+)
 from bot.helper.telegram_helper.filters import CustomFilters
 from bot.helper.telegram_helper.bot_commands import BotCommands
 from bot.helper.telegram_helper.message_utils import (
@@ -24,7 +28,7 @@ async def speedtest(_, message):
         test.upload()
         return test.results
 
-    result = await bot.loop.run_in_executor(None, get_speedtest_results)
+    result = await sync_to_async(get_speedtest_results, purpose="transfer")
 
     if not result:
         await edit_message(speed, "Speedtest failed to complete.")
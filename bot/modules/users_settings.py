@@ -6,7 +6,6 @@ from time import time
 from asyncio import sleep
 from functools import partial
 
-from PIL import Image
 from aiofiles.os import path as aiopath
 from aiofiles.os import mkdir
 from aiofiles.os import remove as aioremove
@@ -15,12 +14,14 @@ from pyrogram.handlers import MessageHandler, CallbackQueryHandler
 
 from bot import DATABASE_URL, IS_PREMIUM_USER, bot, user_data, config_dict
 from bot.helper.ext_utils.bot_utils import (
+    run_cpu,
     new_thread,
     sync_to_async,
     is_gdrive_link,
     update_user_ldata,
 )
 from bot.helper.ext_utils.db_handler import DbManager
+from bot.helper.ext_utils.cpu_workers import convert_image
 from bot.helper.ext_utils.help_strings import uset_display_dict
 from bot.helper.telegram_helper.filters import CustomFilters
 from bot.helper.telegram_helper.bot_commands import BotCommands
@@ -341,7 +342,7 @@ async def set_thumb(_, message, pre_event, key):
         await mkdir(path)
     photo_dir = await message.download()
     des_dir = ospath.join(path, f"{user_id}.jpg")
-    await sync_to_async(Image.open(photo_dir).convert("RGB").save, des_dir, "JPEG")
+    await run_cpu(convert_image, photo_dir, des_dir)
     await aioremove(photo_dir)
     update_user_ldata(user_id, "thumb", des_dir)
     await message.delete()
@@ -43,6 +43,7 @@ from bot.helper.mirror_leech_utils.rclone_utils.list import RcloneList
 from bot.helper.mirror_leech_utils.upload_utils.gdriveTools import GoogleDriveHelper
 from bot.helper.mirror_leech_utils.download_utils.yt_dlp_download import (
     YoutubeDLHelper,
+    extract_info_cached,
 )
 
 
@@ -263,7 +264,7 @@ class YtSelection:
 
 def extract_info(link, options):
     with YoutubeDL(options) as ydl:
-        result = ydl.extract_info(link, download=False)
+        result = extract_info_cached(ydl, link, options)
         if result is None:
             raise ValueError("Info result is None")
         return result
@@ -528,7 +529,9 @@ async def _ytdl(client, message, is_leech=False, same_dir=None, bulk=[]):
         options["playlist_items"] = "0"
 
     try:
-        result = await sync_to_async(extract_info, link, options)
+        result = await sync_to_async(
+            extract_info, link, options, purpose="transfer"
+        )
     except Exception as e:
         msg = str(e).replace("<", " ").replace(">", " ")
         x = await send_message(message, f"{tag} {msg}")
@@ -787,6 +787,16 @@ def set_priority(id_):
     return list_torrent_contents(id_)
 
 
+@app.route("/metrics")
+def metrics():
+    try:
+        with open("metrics.prom") as f:
+            body = f.read()
+    except FileNotFoundError:
+        body = ""
+    return body, 200, {"Content-Type": "text/plain; version=0.0.4; charset=utf-8"}
+
+
 @app.route("/")
 def homepage():
     return "<h1>See WZML-X <a href='https://www.github.com/weebzone/WZML'>@GitHub</a> By <a href='https://github.com/weebzone'>Code With Weeb</a></h1>"